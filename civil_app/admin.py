@@ -8,4 +8,9 @@ admin.site.register(TeamRate)
 admin.site.register(CivilDailyWork)
 admin.site.register(DepartmentWork)
 admin.site.register(CivilAdvance)
-admin.site.register(Owner)
\ No newline at end of file
+admin.site.register(Owner)
+admin.site.register(Agent)
+admin.site.register(MaterialItem)
+admin.site.register(ExpenseCategory)
+admin.site.register(BillPayment)
+admin.site.register(Payable)
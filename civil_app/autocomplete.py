@@ -0,0 +1,217 @@
+"""In-process prefix index behind ``/api/autocomplete/``.
+
+One index per field: agent names, material item names, units and expense
+categories. Each suggestion carries how many ledger rows use it and the last
+date it was used; matches are ranked by that count, discounted by age.
+
+The index is built with one grouped query per field the first time a field is
+asked for, then kept current by signals: every committed material / expense
+write moves the counts by its delta, and a new or renamed master is offered
+under its current name.
+Other worker processes see those writes when their copy is rebuilt, after
+AUTOCOMPLETE_REFRESH seconds.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import (
+    Agent, ExpenseCategory, MaterialEntry, MaterialItem, OtherExpense, normalize_key,
+)
+
+
+FIELDS = ("agent", "material", "unit", "expense")
+LIMIT = 10
+RECENCY_DAYS = 30  # a suggestion last used this long ago counts half
+
+
+@dataclass
+class Suggestion:
+    value: str
+    count: int = 0
+    last_used: date = None
+
+    def score(self, today):
+        age = (today - self.last_used).days if self.last_used else 10 * 365
+        return self.count / (1 + max(age, 0) / RECENCY_DAYS)
+
+
+class PrefixIndex:
+    """Suggestions by key (master id, or the normalized unit), findable by the
+    start of any word of their name."""
+
+    def __init__(self):
+        self.suggestions = {}
+        self.words = []  # sorted (word suffix of a normalized name, key)
+
+    def _words(self, key, value):
+        parts = normalize_key(value).split()
+        return [(" ".join(parts[i:]), key) for i in range(len(parts))]
+
+    def put(self, key, value):
+        """Add a suggestion, or show an existing one under a new name."""
+        suggestion = self.suggestions.get(key)
+        if suggestion is None:
+            suggestion = self.suggestions[key] = Suggestion(value)
+        else:
+            self._unlink(key, suggestion.value)
+            suggestion.value = value
+        for word in self._words(key, value):
+            insort(self.words, word)
+        return suggestion
+
+    def add(self, key, count, day, value=None):
+        """Move a suggestion's use count; unknown keys need a ``value`` to be added."""
+        suggestion = self.suggestions.get(key)
+        if suggestion is None:
+            if value is None:
+                return
+            suggestion = self.put(key, value)
+        suggestion.count = max(suggestion.count + count, 0)
+        if count > 0 and day and (not suggestion.last_used or day > suggestion.last_used):
+            suggestion.last_used = day
+
+    def remove(self, key):
+        suggestion = self.suggestions.pop(key, None)
+        if suggestion is not None:
+            self._unlink(key, suggestion.value)
+
+    def _unlink(self, key, value):
+        for word in self._words(key, value):
+            i = bisect_left(self.words, word)
+            if i < len(self.words) and self.words[i] == word:
+                del self.words[i]
+
+    def complete(self, prefix, limit=LIMIT, today=None):
+        today = today or date.today()
+        prefix = normalize_key(prefix)
+        keys = set()
+        for word, key in self.words[bisect_left(self.words, (prefix,)):]:
+            if not word.startswith(prefix):
+                break
+            keys.add(key)
+        ranked = sorted(
+            (self.suggestions[k] for k in keys),
+            key=lambda s: (-s.score(today), s.value.casefold()),
+        )
+        return ranked[:limit]
+
+
+# =========================================================
+# BUILD
+# =========================================================
+
+def build(field):
+    """A fresh index for one field, from one grouped query."""
+    if field == "agent":
+        rows = Agent.objects.values_list("pk", "name").annotate(
+            n=Count("materialentry"), last=Max("materialentry__date"))
+    elif field == "material":
+        rows = MaterialItem.objects.values_list("pk", "name").annotate(
+            n=Count("materialentry"), last=Max("materialentry__date"))
+    elif field == "expense":
+        rows = ExpenseCategory.objects.values_list("pk", "name").annotate(
+            n=Count("otherexpense"), last=Max("otherexpense__date"))
+    else:
+        rows = (
+            (normalize_key(unit), unit, n, last)
+            for unit, n, last in MaterialEntry.objects.exclude(unit="")
+            .values_list("unit").annotate(n=Count("id"), last=Max("date"))
+            .order_by("-n")  # spelling variants collapse onto the commonest
+        )
+
+    index = PrefixIndex()
+    for key, value, n, last in rows:
+        if key:
+            index.add(key, n, last, value=value)
+    return index
+
+
+# =========================================================
+# PROCESS-WIDE INDEXES
+# =========================================================
+
+_lock = threading.Lock()
+_indexes = {}  # field -> (built_at, PrefixIndex)
+
+
+def get_index(field):
+    with _lock:
+        entry = _indexes.get(field)
+        if entry and time.monotonic() - entry[0] < settings.AUTOCOMPLETE_REFRESH:
+            return entry[1]
+    index = build(field)
+    with _lock:
+        _indexes[field] = (time.monotonic(), index)
+    return index
+
+
+def complete(field, prefix, limit=LIMIT):
+    index = get_index(field)
+    with _lock:
+        return index.complete(prefix, limit)
+
+
+def reset():
+    with _lock:
+        _indexes.clear()
+
+
+# =========================================================
+# INCREMENTAL UPDATES
+# =========================================================
+
+def contribution(instance):
+    """[(field, key, date)] a ledger row adds to the indexes; ids only, no queries."""
+    if isinstance(instance, MaterialEntry):
+        terms = [("material", instance.item_id, instance.date)]
+        if instance.agent_id:
+            terms.append(("agent", instance.agent_id, instance.date))
+        if normalize_key(instance.unit):
+            terms.append(("unit", (normalize_key(instance.unit), instance.unit.strip()), instance.date))
+        return terms
+
+    if isinstance(instance, OtherExpense):
+        return [("expense", instance.category_id, instance.date)]
+
+    return []
+
+
+def _apply(terms, count):
+    with _lock:
+        for field, key, day in terms:
+            entry = _indexes.get(field)
+            if not entry:
+                continue
+            # units have no master: a new spelling is added by its first use
+            key, value = key if field == "unit" else (key, None)
+            entry[1].add(key, count, day, value=value if count > 0 else None)
+
+
+def apply_change(old, new):
+    """Move a row's contribution from ``old`` to ``new`` once the write commits."""
+    def run():
+        _apply(old or [], -1)
+        _apply(new or [], +1)
+    transaction.on_commit(run)
+
+
+MASTER_FIELDS = {Agent: "agent", MaterialItem: "material", ExpenseCategory: "expense"}
+
+
+def master_changed(master, deleted=False):
+    """A renamed master shows its new name, a new one is offered straight away."""
+    def run():
+        with _lock:
+            entry = _indexes.get(MASTER_FIELDS[type(master)])
+            if entry and deleted:
+                entry[1].remove(master.pk)
+            elif entry:
+                entry[1].put(master.pk, master.name)
+    transaction.on_commit(run)
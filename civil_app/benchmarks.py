@@ -0,0 +1,161 @@
+"""Timing, environment capture and JSON result files for the benchmark commands.
+
+A result file is ``{"meta": {...}, "results": {case: {...}}}``; every case
+carries at least ``median_ms``, so any two files can be compared with
+:func:`compare`.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.db import connection
+
+from .models import (
+    CivilAdvance, CivilDailyWork, DepartmentWork, MaterialEntry, OtherExpense, Site, Team,
+)
+
+
+RESULTS_DIR = Path(settings.BASE_DIR) / "benchmarks"
+
+
+# =========================================================
+# TIMING
+# =========================================================
+
+def summarize(samples):
+    """min / median / p95 / max of a list of seconds, in milliseconds."""
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "runs": len(ms),
+        "min_ms": round(ms[0], 2),
+        "median_ms": round(statistics.median(ms), 2),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 2),
+        "max_ms": round(ms[-1], 2),
+    }
+
+
+def measure(fn, repeat=5, warmup=1):
+    """Call ``fn`` ``warmup + repeat`` times; return its timing and last result."""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+
+    return summarize(samples), result
+
+
+# =========================================================
+# REQUEST DATA
+# =========================================================
+
+def site_day_form(site_id, day):
+    """The site_detail form as it would be re-submitted for an existing day."""
+    data = {"date": day.isoformat()}
+    rows = {"site_id": site_id, "date": day}
+
+    advances = dict(CivilAdvance.objects.filter(**rows).values_list("team_id", "amount"))
+    for w in CivilDailyWork.objects.filter(**rows):
+        data[f"mason_full_{w.team_id}"] = w.mason_full
+        data[f"helper_full_{w.team_id}"] = w.helper_full
+        data[f"mason_half_{w.team_id}"] = w.mason_half
+        data[f"helper_half_{w.team_id}"] = w.helper_half
+        data[f"advance_{w.team_id}"] = advances.get(w.team_id, "")
+
+    for w in DepartmentWork.objects.filter(**rows):
+        data[f"dept_full_{w.department_id}"] = w.full_day_count
+        data[f"dept_half_{w.department_id}"] = w.half_day_count
+        data[f"dept_rate_{w.department_id}"] = w.full_day_rate
+        data[f"dept_advance_{w.department_id}"] = w.advance_amount
+
+    for i, m in enumerate(MaterialEntry.objects.filter(**rows).select_related("agent", "item")):
+        data[f"agent_name_{i}"] = m.agent.name if m.agent else ""
+        data[f"material_name_{i}"] = m.item.name
+        data[f"material_qty_{i}"] = m.quantity
+        data[f"material_unit_{i}"] = m.unit
+        data[f"material_rate_{i}"] = m.rate
+        data[f"material_advance_{i}"] = m.advance
+
+    for i, e in enumerate(OtherExpense.objects.filter(**rows).select_related("category")):
+        data[f"expense_title_{i}"] = e.category.name
+        data[f"expense_owner_{i}"] = e.owner_id or ""
+        data[f"expense_amount_{i}"] = e.amount
+        data[f"expense_notes_{i}"] = e.notes
+
+    return data
+
+
+# =========================================================
+# ENVIRONMENT
+# =========================================================
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "rows": {
+            "sites": Site.objects.count(),
+            "teams": Team.objects.count(),
+            "civil": CivilDailyWork.objects.count(),
+            "department": DepartmentWork.objects.count(),
+            "material": MaterialEntry.objects.count(),
+            "expense": OtherExpense.objects.count(),
+        },
+    }
+
+
+# =========================================================
+# RESULT FILES
+# =========================================================
+
+def write_results(name, results, meta=None, path=None):
+    """Save a run as JSON; the default path is ``benchmarks/<name>-<timestamp>.json``."""
+    meta = {**environment(), **(meta or {})}
+    if path is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"{name}-{stamp}.json"
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    return path
+
+
+def load_results(path):
+    return json.loads(Path(path).read_text())
+
+
+def compare(old, new, key="median_ms"):
+    """Lines of ``case  old  new  change%`` for the cases present in both runs."""
+    lines = []
+    for case, result in new["results"].items():
+        before = old["results"].get(case, {}).get(key)
+        after = result.get(key)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0
+        lines.append(f"{case:<28} {before:>10.2f} {after:>10.2f} {change:>+8.1f}%")
+    return lines
@@ -0,0 +1,174 @@
+"""Append-only journal of ledger writes.
+
+Signals add one LedgerChange per insert, update and delete of a ledger row,
+in the same transaction as the write. Its id is a cursor: everything written
+after a reader's last cursor is ``since(cursor)``.
+
+Bulk paths either journal the rows they touch themselves
+(:func:`record_updates`, used by the labour recompute and the verifier) or
+write no journal rows and call ``ledger_cache.invalidate_all()``
+(generate_scale_data, imports, restores). The version of the ``all`` tag is
+therefore the journal's *epoch*: a reader whose epoch is out of date starts
+again from a full copy.
+
+Ids are handed out when a write starts, not when it commits, so on
+databases with concurrent writers id 11 can become visible before id 10.
+:func:`settled` stops at such a gap until it is GAP_WAIT seconds old and
+then moves past it for good. The age is taken from ``at``, the time the
+row was journalled, not when its transaction committed. So every
+transaction that journals must commit well within GAP_WAIT, or feed
+readers can skip its changes for good. That is why the journalled writers
+are all short: one day sheet per transaction (site_detail, ``api/sync/``),
+CHUNK rows (labour recompute) or BATCH rows (verifier ``--fix``). Long bulk
+writes journal nothing and retire the epoch instead. (SQLite runs one writer at a
+time, so ids commit in order there and gaps never fill in later.)
+
+:func:`feed` is ``/api/changes/``: the settled changes after a cursor,
+collapsed to each row's latest state, one column list per kind. A new
+reader (or one told to reset) copies each kind with :func:`page` first,
+starting from the cursor and epoch it was handed.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from . import ledger_cache
+from .models import (
+    CivilAdvance, CivilDailyWork, DepartmentWork, LedgerChange, MaterialEntry,
+    OtherExpense, OwnerCashEntry, SiteDailyNote,
+)
+
+
+GAP_WAIT = timedelta(seconds=10)  # journalled transactions must commit well within this
+FEED_LIMIT = 1000
+FEED_MAX = 5000
+
+
+KIND_MODELS = {
+    "civil": CivilDailyWork,
+    "advance": CivilAdvance,
+    "department": DepartmentWork,
+    "material": MaterialEntry,
+    "expense": OtherExpense,
+    "note": SiteDailyNote,
+    "owner_cash": OwnerCashEntry,
+}
+MODEL_KINDS = {model: kind for kind, model in KIND_MODELS.items()}
+
+
+def record(instance, op):
+    LedgerChange.objects.create(
+        kind=MODEL_KINDS[type(instance)],
+        row_id=instance.pk,
+        op=op,
+        site_id=getattr(instance, "site_id", None),
+        date=instance.date,
+    )
+
+
+def record_updates(model, rows):
+    """Journal a queryset ``update()``: ``rows`` are (id, site_id, date)."""
+    LedgerChange.objects.bulk_create([
+        LedgerChange(kind=MODEL_KINDS[model], row_id=pk, op="u", site_id=site_id, date=day)
+        for pk, site_id, day in rows
+    ])
+
+
+def latest():
+    """The current cursor (0 before the first change)."""
+    return LedgerChange.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def since(cursor, limit=None):
+    """Changes after ``cursor``, oldest first."""
+    qs = LedgerChange.objects.filter(id__gt=cursor).order_by("id")
+    return qs[:limit] if limit else qs
+
+
+def settled(cursor, limit=None):
+    """``(id, kind, row_id, op)`` after ``cursor``, oldest first, up to the
+    first gap that may still fill in."""
+    entries = since(cursor, limit).values_list("id", "kind", "row_id", "op", "at")
+    recent = timezone.now() - GAP_WAIT
+    out = []
+    expected = cursor + 1
+    for change_id, kind, row_id, op, at in entries:
+        if change_id != expected and at > recent:
+            break
+        out.append((change_id, kind, row_id, op))
+        expected = change_id + 1
+    return out
+
+
+def day_version(site_id, day):
+    """Id of the last change to one site's day sheet (0 if none)."""
+    return (
+        LedgerChange.objects.filter(site_id=site_id, date=day)
+        .order_by("-id").values_list("id", flat=True).first() or 0
+    )
+
+
+def epoch():
+    return str(ledger_cache.versions({"all"}).get("all", 0))
+
+
+# =========================================================
+# FEED
+# =========================================================
+
+def fields(kind):
+    return [f.attname for f in KIND_MODELS[kind]._meta.concrete_fields]
+
+
+def rows(kind, ids):
+    """Current rows of one kind with the given ids, as lists in ``fields(kind)`` order."""
+    qs = KIND_MODELS[kind].objects.filter(id__in=ids).order_by("id")
+    return [list(r) for r in qs.values_list(*fields(kind))]
+
+
+def feed(cursor, limit=FEED_LIMIT):
+    """One compact batch of what changed after ``cursor``.
+
+    Several changes to one row collapse to its current values (or its id in
+    ``deleted``). ``cursor`` in the answer is the next ``since``; ``more``
+    says another batch is already waiting.
+    """
+    entries = settled(cursor, limit + 1)
+    more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for _, kind, row_id, op in entries:
+        latest[(kind, row_id)] = op  # later changes win
+
+    kinds = {}
+    for kind in KIND_MODELS:
+        ids = [row_id for (k, row_id), op in latest.items() if k == kind and op != "d"]
+        deleted = [row_id for (k, row_id), op in latest.items() if k == kind and op == "d"]
+        if not ids and not deleted:
+            continue
+        current = rows(kind, ids) if ids else []
+        # deleted after this batch's last entry: say so now, the delete follows later
+        found = {r[0] for r in current}
+        deleted += [row_id for row_id in ids if row_id not in found]
+        kinds[kind] = {"fields": fields(kind), "rows": current, "deleted": sorted(deleted)}
+
+    return {
+        "cursor": entries[-1][0] if entries else cursor,
+        "more": more,
+        "changes": len(entries),
+        "kinds": kinds,
+    }
+
+
+def page(kind, after=0, limit=FEED_LIMIT):
+    """A full copy, one page at a time: rows of ``kind`` with id > ``after``."""
+    qs = KIND_MODELS[kind].objects.filter(id__gt=after).order_by("id")
+    found = [list(r) for r in qs.values_list(*fields(kind))[:limit + 1]]
+    return {
+        "kind": kind,
+        "fields": fields(kind),
+        "rows": found[:limit],
+        "after": found[:limit][-1][0] if found else after,
+        "more": len(found) > limit,
+    }
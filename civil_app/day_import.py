@@ -0,0 +1,345 @@
+"""Streaming import of historical day sheets from CSV.
+
+One file per kind, one ledger line per row; headers are matched case- and
+space-insensitively, columns not listed are ignored:
+
+civil       site, team, date, mason_full, helper_full, mason_half, helper_half, advance
+department  site, department, date, full, half, [rate], advance
+material    site, date, item, quantity, [unit], rate, [agent], [advance]
+expense     site, date, category, amount, [owner], [notes]
+
+Dates are YYYY-MM-DD, DD-MM-YYYY or DD/MM/YYYY. Sites, teams, departments and
+owners must exist and are matched by name; agents, items and expense
+categories are created on first use, as on site_detail.
+
+Rows are read one at a time and written CHUNK at a time with bulk_create, so
+memory stays flat whatever the size of the file. Names resolve through
+lookups loaded once per import; a civil row's rate comes from every TeamRate
+loaded once, with get_team_rate's precedence (locked first, then the newest
+``from_date`` on or before the row's date). Wages are worked out as
+site_detail does.
+
+Civil work, civil advances and department work replace the row of the same
+site / team (department) / date; materials and expenses are appended. A bad
+row is reported with its line number and skipped, the rest is written.
+
+bulk_create fires no signals, so like generate_scale_data the import ends by
+rebuilding payables, dropping owner cash snapshots from each owner's earliest
+imported expense and invalidating every cached computation; new materials and
+expenses are indexed for search as they are written.
+"""
+import csv
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+
+from django.db import transaction
+
+from . import autocomplete, ledger_cache, payables, search
+from .models import (
+    Agent, CivilAdvance, CivilDailyWork, DefaultRate, Department, DepartmentWork,
+    ExpenseCategory, MaterialEntry, MaterialItem, OtherExpense, Owner, Site, Team,
+    TeamRate, normalize_key,
+)
+from .owner_cash import invalidate_from
+
+
+CHUNK = 1000
+MAX_ERRORS = 200  # kept for the response; the command prints every one
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y")
+
+REQUIRED = {
+    "civil": ["site", "team", "date"],
+    "department": ["site", "department", "date"],
+    "material": ["site", "date", "item", "quantity", "rate"],
+    "expense": ["site", "date", "category", "amount"],
+}
+KINDS = list(REQUIRED)
+
+# model -> (unique fields, fields an import overwrites); other models are appended
+UPSERT = {
+    CivilDailyWork: (
+        ["site", "team", "date"],
+        ["mason_full", "helper_full", "mason_half", "helper_half", "labour_amount", "total_amount"],
+    ),
+    CivilAdvance: (["site", "team", "date"], ["amount"]),
+    DepartmentWork: (
+        ["site", "department", "date"],
+        ["full_day_count", "half_day_count", "full_day_rate", "half_day_rate",
+         "labour_amount", "advance_amount", "total_amount"],
+    ),
+}
+
+
+class SheetError(Exception):
+    """The file as a whole cannot be imported (unknown kind, missing columns)."""
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    kind: str
+    rows: int = 0
+    written: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)  # [(line, message)], first MAX_ERRORS
+
+    def as_dict(self):
+        return {
+            "kind": self.kind,
+            "rows": self.rows,
+            "written": self.written,
+            "error_count": self.error_count,
+            "errors": [{"line": line, "error": message} for line, message in self.errors],
+        }
+
+
+# =========================================================
+# LOOKUPS (loaded once per import)
+# =========================================================
+
+class Names:
+    """Id of an existing site / team / department / owner by its typed name."""
+
+    def __init__(self, model):
+        self.label = model._meta.verbose_name
+        self.ids = {}
+        for pk, name in model.objects.values_list("pk", "name"):
+            self.ids.setdefault(normalize_key(name), []).append(pk)
+
+    def __call__(self, value):
+        ids = self.ids.get(normalize_key(value))
+        if not ids:
+            raise RowError(f"unknown {self.label} {value!r}")
+        if len(ids) > 1:
+            raise RowError(f"{len(ids)} {self.label}s are named {value!r}")
+        return ids[0]
+
+
+class Masters:
+    """Agent / item / category for a typed name, created on first use."""
+
+    def __init__(self, model):
+        self.model = model
+        self.rows = {}
+
+    def __call__(self, value, **defaults):
+        key = normalize_key(value)
+        if not key:
+            return None
+        if key not in self.rows:
+            self.rows[key] = self.model.resolve(value, **defaults)
+        return self.rows[key]
+
+
+class TeamRates:
+    """The TeamRate get_team_rate would pick for any (team, date)."""
+
+    def __init__(self):
+        groups = {}
+        for rate in TeamRate.objects.order_by("from_date", "id"):
+            groups.setdefault((rate.team_id, rate.is_locked), []).append(rate)
+        self.rates = {key: ([r.from_date for r in rates], rates) for key, rates in groups.items()}
+
+    def at(self, team_id, day):
+        for locked in (True, False):
+            days, rates = self.rates.get((team_id, locked), ((), ()))
+            i = bisect_right(days, day)
+            if i:
+                return rates[i - 1]
+        return None
+
+
+# =========================================================
+# CELLS
+# =========================================================
+
+def _number(row, column, cast=float):
+    value = (row.get(column) or "").strip()
+    if not value:
+        return cast(0)
+    try:
+        return cast(value.replace(",", ""))
+    except ValueError:
+        raise RowError(f"{column}: {value!r} is not a number")
+
+
+@lru_cache(maxsize=4096)  # a sheet repeats the same few dates many times
+def _parse_date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise RowError(f"date: {value!r} is not a date")
+
+
+def _date(row):
+    return _parse_date((row.get("date") or "").strip())
+
+
+def _header(name):
+    return "_".join((name or "").split()).casefold()
+
+
+# =========================================================
+# ROWS -> OBJECTS
+# =========================================================
+
+class Importer:
+
+    def __init__(self, kind):
+        if kind not in REQUIRED:
+            raise SheetError(f"kind must be one of {', '.join(KINDS)}")
+        self.kind = kind
+        self.site = Names(Site)
+        self.build = getattr(self, f"build_{kind}")
+        if kind == "civil":
+            self.team, self.team_rates = Names(Team), TeamRates()
+        elif kind == "department":
+            self.department = Names(Department)
+            self.default_rates = dict(DefaultRate.objects.values_list("department_id", "full_day_rate"))
+        elif kind == "material":
+            self.item, self.agent = Masters(MaterialItem), Masters(Agent)
+        else:
+            self.category, self.owner = Masters(ExpenseCategory), Names(Owner)
+        self.owner_dates = {}
+
+    def build_civil(self, row):
+        site_id, team_id, day = self.site(row["site"]), self.team(row["team"]), _date(row)
+        counts = [_number(row, c, int) for c in ("mason_full", "helper_full", "mason_half", "helper_half")]
+        advance = _number(row, "advance")
+
+        rate = self.team_rates.at(team_id, day)
+        if rate is None and any(counts):
+            raise RowError(f"team {row['team']!r} has no rate on {day}")
+        labour = rate.labour(*counts) if rate else 0
+
+        objs = []
+        if (row.get("advance") or "").strip():
+            objs.append(CivilAdvance(site_id=site_id, team_id=team_id, date=day, amount=advance))
+        if any(counts) or advance:
+            mf, hf, mh, hh = counts
+            objs.append(CivilDailyWork(
+                site_id=site_id, team_id=team_id, date=day,
+                mason_full=mf, helper_full=hf, mason_half=mh, helper_half=hh,
+                labour_amount=labour, total_amount=labour - advance,
+            ))
+        return objs
+
+    def build_department(self, row):
+        site_id, department_id, day = self.site(row["site"]), self.department(row["department"]), _date(row)
+        if department_id not in self.default_rates:
+            raise RowError(f"department {row['department']!r} has no default rate")
+        full, half = _number(row, "full", int), _number(row, "half", int)
+        advance = _number(row, "advance")
+        rate = _number(row, "rate") or self.default_rates[department_id]
+        if not (full or half or advance):
+            return []
+
+        labour = full * rate + half * rate / 2
+        return [DepartmentWork(
+            site_id=site_id, department_id=department_id, date=day,
+            full_day_count=full, half_day_count=half,
+            full_day_rate=rate, half_day_rate=int(rate) // 2,
+            labour_amount=labour, advance_amount=advance, total_amount=labour - advance,
+        )]
+
+    def build_material(self, row):
+        site_id, day = self.site(row["site"]), _date(row)
+        quantity, rate = _number(row, "quantity"), _number(row, "rate")
+        unit = (row.get("unit") or "").strip()
+        item = self.item(row["item"], unit=unit)
+        if item is None:
+            raise RowError("item is blank")
+        return [MaterialEntry(
+            site_id=site_id, date=day, item=item, agent=self.agent(row.get("agent")),
+            quantity=quantity, unit=unit, rate=rate,
+            advance=_number(row, "advance"), total=quantity * rate,
+        )]
+
+    def build_expense(self, row):
+        site_id, day = self.site(row["site"]), _date(row)
+        category = self.category(row["category"])
+        if category is None:
+            raise RowError("category is blank")
+        owner_id = self.owner(row["owner"]) if (row.get("owner") or "").strip() else None
+        if owner_id:
+            self.owner_dates[owner_id] = min(day, self.owner_dates.get(owner_id, day))
+        return [OtherExpense(
+            site_id=site_id, date=day, category=category, owner_id=owner_id,
+            amount=_number(row, "amount"), notes=(row.get("notes") or "").strip(),
+        )]
+
+    # =========================================================
+    # WRITE
+    # =========================================================
+
+    def write(self, chunk):
+        """Insert one chunk of objects; returns how many rows were written."""
+        upserts, appends = {}, {}
+        for obj in chunk:
+            model = type(obj)
+            if model in UPSERT:
+                # the last row for a key wins, as if the rows had been saved in order
+                key = tuple(getattr(obj, model._meta.get_field(f).attname) for f in UPSERT[model][0])
+                upserts.setdefault(model, {})[key] = obj
+            else:
+                appends.setdefault(model, []).append(obj)
+
+        written = 0
+        with transaction.atomic():
+            for model, objs in upserts.items():
+                unique_fields, update_fields = UPSERT[model]
+                written += len(model.objects.bulk_create(
+                    list(objs.values()), update_conflicts=True,
+                    unique_fields=unique_fields, update_fields=update_fields,
+                ))
+            for model, objs in appends.items():
+                written += len(model.objects.bulk_create(objs))
+                search.add(objs)
+        return written
+
+    def run(self, stream, chunk_size=CHUNK, on_error=None):
+        reader = csv.DictReader(stream)
+        reader.fieldnames = [_header(name) for name in reader.fieldnames or []]
+        missing = [c for c in REQUIRED[self.kind] if c not in reader.fieldnames]
+        if missing:
+            raise SheetError(f"missing column(s): {', '.join(missing)}")
+
+        result = ImportResult(self.kind)
+        chunk = []
+        for row in reader:
+            result.rows += 1
+            try:
+                chunk.extend(self.build(row))
+            except RowError as e:
+                result.error_count += 1
+                if len(result.errors) < MAX_ERRORS:
+                    result.errors.append((reader.line_num, str(e)))
+                if on_error:
+                    on_error(reader.line_num, str(e))
+                continue
+            if len(chunk) >= chunk_size:
+                result.written += self.write(chunk)
+                chunk = []
+        result.written += self.write(chunk)
+
+        self.finish()
+        return result
+
+    def finish(self):
+        payables.rebuild()
+        for owner_id, day in self.owner_dates.items():
+            invalidate_from(owner_id, day)
+        autocomplete.reset()
+        ledger_cache.invalidate_all()
+
+
+def import_csv(kind, stream, chunk_size=CHUNK, on_error=None):
+    """Import one day-sheet CSV (a text stream) of ``kind``."""
+    return Importer(kind).run(stream, chunk_size=chunk_size, on_error=on_error)
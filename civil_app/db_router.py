@@ -0,0 +1,124 @@
+"""Send the heavy read-only views to a read database.
+
+Views decorated with ``@read_only`` (reports, bills, dashboard) run their
+queries against the ``replica`` alias; every write, and every other view,
+uses ``default``. When no replica is configured, or it cannot be reached,
+``@read_only`` views fall back to the primary. A failed replica is retried
+after ``REPLICA_RETRY_SECONDS``.
+
+The replica lags the primary by design: a report may miss the last few
+seconds of day-sheet saves. Ledger cache versions (``CacheTag``) are read
+from the same database as the data, so a cached entry is never stored under
+a newer version than the rows it was computed from.
+"""
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.local import Local
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+logger = logging.getLogger("civil_app.db")
+
+REPLICA = "replica"
+
+# context-local, so async views' sync_to_async ORM calls see it
+_state = Local()
+_down_until = 0.0
+
+
+def _same_database(a, b):
+    return all(str(a.get(k)) == str(b.get(k)) for k in ("ENGINE", "NAME", "HOST", "PORT"))
+
+
+def replica_alias():
+    """``REPLICA`` when it is configured and reachable, else ``None`` (primary)."""
+    global _down_until
+
+    if REPLICA not in settings.DATABASES or time.monotonic() < _down_until:
+        return None
+
+    conn = connections[REPLICA]
+    # a test mirror is the primary itself; a second connection to it would
+    # not see the test's open transaction
+    if _same_database(conn.settings_dict, connections["default"].settings_dict):
+        return None
+
+    try:
+        # connecting to a missing SQLite file would create an empty database
+        if conn.vendor == "sqlite" and not conn.is_in_memory_db() \
+                and not os.path.exists(conn.settings_dict["NAME"]):
+            raise DatabaseError(f"{conn.settings_dict['NAME']} does not exist")
+        conn.ensure_connection()
+    except DatabaseError as exc:
+        retry = getattr(settings, "REPLICA_RETRY_SECONDS", 30)
+        logger.warning("read replica unavailable, using primary for %ss: %s", retry, exc)
+        _down_until = time.monotonic() + retry
+        return None
+
+    return REPLICA
+
+
+@contextmanager
+def use_database(alias):
+    """Route reads in this block to ``alias`` (``None``: the primary)."""
+    previous = getattr(_state, "alias", None)
+    _state.alias = alias
+    try:
+        yield alias
+    finally:
+        _state.alias = previous
+
+
+def read_only(view_func):
+    """Run a view's reads on the read database."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            # connecting is blocking I/O, on the request's ORM thread
+            with use_database(await sync_to_async(replica_alias)()):
+                return await view_func(request, *args, **kwargs)
+    else:
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with use_database(replica_alias()):
+                return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def snapshot_sqlite(source, target):
+    """Copy the SQLite file ``source`` into ``target`` with the online backup API.
+
+    The copy is one transaction on ``target``: replica readers see either the
+    previous snapshot or the new one, and writers on ``source`` are not blocked.
+    """
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target, timeout=20)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+class ReadReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        return getattr(_state, "alias", None)
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # same data on both; objects read from the replica can be saved to default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica's schema comes from the primary (snapshot / replication)
+        return db != REPLICA
@@ -0,0 +1,237 @@
+"""Bring stored wages in line with team and department rates.
+
+CivilDailyWork and DepartmentWork keep the labour_amount / total_amount
+worked out when the day was entered; editing a TeamRate or DefaultRate on
+masters_and_payments does not touch them. A :class:`Recompute` finds the
+rows whose wages differ from what the current rates give, lists them as a
+dry-run diff, and writes them.
+
+Civil rows are priced by the rate get_team_rate picks for their date: a
+team's rates split its timeline into periods with one rate each (locked
+rates win from the first locked ``from_date`` on), and each period is one
+pass whose new wages are an SQL expression over the day's counts.
+Department rows take the department's current full-day rate. DefaultRate
+has no effective date, so which rows move is given by the caller: only rows
+stored at ``old_rate`` (the rate before the edit) are repriced, so rates
+typed in by hand on a day stay as they are, and ``since`` limits the dates.
+
+labour_amount is an integer column and the save path stores ``int()`` of
+the wages, so new wages are floored the same way (wages are never
+negative) and compared exactly: an unchanged ledger gives no diff.
+total_amount moves by the same amount as labour_amount, so advances netted
+into it at entry are kept.
+
+Rows are written by id chunk with one set-based UPDATE each, in its own
+transaction. Signals do not fire, so each chunk also journals the rows it
+changed, moves payables by the change in their totals and notifies the
+ledger cache tags of their sites and months.
+"""
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import Floor
+
+from . import changes, ledger_cache, payables
+from .models import CivilDailyWork, DefaultRate, DepartmentWork, TeamRate
+
+
+CHUNK = 2000
+
+
+@dataclass
+class Pass:
+    """Rows of one team / department over [start, end) and their new wages."""
+    ref_id: int
+    start: date = None
+    end: date = None
+    labour: object = None  # expression over the row's counts
+    extra: dict = field(default_factory=dict)  # other fields to set
+    only: Q = field(default_factory=Q)
+
+
+def _float(expression):
+    return ExpressionWrapper(expression, output_field=FloatField())
+
+
+# =========================================================
+# PASSES
+# =========================================================
+
+def team_periods(rates):
+    """[(start, end, rate)] of one team's rates by get_team_rate precedence;
+    ``end`` is exclusive, None for open-ended."""
+    locked = sorted((r for r in rates if r.is_locked), key=lambda r: (r.from_date, r.id))
+    unlocked = sorted((r for r in rates if not r.is_locked), key=lambda r: (r.from_date, r.id))
+    cutoff = locked[0].from_date if locked else None
+
+    periods = []
+    for group, limit in ((unlocked, cutoff), (locked, None)):
+        for i, rate in enumerate(group):
+            end = group[i + 1].from_date if i + 1 < len(group) else limit
+            if limit and (end is None or end > limit):
+                end = limit
+            if end is None or rate.from_date < end:
+                periods.append((rate.from_date, end, rate))
+    return periods
+
+
+def civil_labour(rate):
+    return Floor(_float(
+        F("mason_full") * Value(rate.mason_full_rate) +
+        F("helper_full") * Value(rate.helper_full_rate) +
+        F("mason_half") * Value(rate.mason_full_rate / 2) +
+        F("helper_half") * Value(rate.helper_full_rate / 2)
+    ))
+
+
+def department_labour(rate):
+    return Floor(_float(F("full_day_count") * Value(float(rate)) + F("half_day_count") * Value(rate / 2)))
+
+
+# =========================================================
+# RECOMPUTE
+# =========================================================
+
+class Recompute:
+
+    def __init__(self, model, ref_field, payable_kind, passes, since=None):
+        self.model = model
+        self.ref_field = ref_field
+        self.payable_kind = payable_kind
+        self.passes = passes
+        self.since = since
+
+    @classmethod
+    def for_teams(cls, team_id=None, since=None):
+        rates = TeamRate.objects.all()
+        if team_id:
+            rates = rates.filter(team_id=team_id)
+        by_team = {}
+        for rate in rates:
+            by_team.setdefault(rate.team_id, []).append(rate)
+        passes = [
+            Pass(ref_id=team, start=start, end=end, labour=civil_labour(rate))
+            for team, team_rates in sorted(by_team.items())
+            for start, end, rate in team_periods(team_rates)
+        ]
+        return cls(CivilDailyWork, "team", "team", passes, since)
+
+    @classmethod
+    def for_departments(cls, old_rate, department_id=None, since=None):
+        """Reprice the rows stored at ``old_rate`` with their department's current rate."""
+        rates = DefaultRate.objects.filter(full_day_rate__gt=0)  # 0: never set, priced per day
+        if department_id:
+            rates = rates.filter(department_id=department_id)
+        passes = [
+            Pass(
+                ref_id=r.department_id,
+                labour=department_labour(r.full_day_rate),
+                extra={"full_day_rate": r.full_day_rate, "half_day_rate": r.half_day_rate},
+                only=Q(full_day_rate=old_rate),
+            )
+            for r in rates.order_by("department_id")
+        ]
+        return cls(DepartmentWork, "department", "department", passes, since)
+
+    # ---------------- rows ----------------
+
+    def changed(self, p):
+        """Rows of one pass whose stored wages (or rates) differ from the new ones."""
+        qs = self.model.objects.filter(p.only, **{f"{self.ref_field}_id": p.ref_id})
+        start = max(filter(None, (p.start, self.since)), default=None)
+        if start:
+            qs = qs.filter(date__gte=start)
+        if p.end:
+            qs = qs.filter(date__lt=p.end)
+
+        differs = ~Q(delta=0)
+        for name, value in p.extra.items():
+            differs |= ~Q(**{name: value})
+        return (
+            qs.annotate(new_labour=p.labour)
+            .annotate(delta=F("new_labour") - F("labour_amount"))
+            .filter(differs)
+        )
+
+    def chunks(self, chunk=CHUNK):
+        """(pass, [diff row]) in id order, ``chunk`` rows at a time."""
+        for p in self.passes:
+            last = 0
+            while True:
+                rows = list(
+                    self.changed(p).filter(id__gt=last).order_by("id")
+                    .values("id", "site_id", "date", "labour_amount", "total_amount", "new_labour")[:chunk]
+                )
+                if not rows:
+                    break
+                for r in rows:
+                    r["ref_id"] = p.ref_id
+                    r["new_total"] = r["total_amount"] + r["new_labour"] - r["labour_amount"]
+                yield p, rows
+                last = rows[-1]["id"]
+
+    # ---------------- dry run ----------------
+
+    def preview(self, limit=50):
+        """The diff without writing: how many rows move, by how much, the first ``limit``."""
+        count, labour_change, sample = 0, 0, []
+        by_ref = {}
+        for _, rows in self.chunks():
+            for r in rows:
+                count += 1
+                delta = r["new_labour"] - r["labour_amount"]
+                labour_change += delta
+                by_ref[r["ref_id"]] = by_ref.get(r["ref_id"], 0) + delta
+                if len(sample) < limit:
+                    sample.append({
+                        "id": r["id"], self.ref_field: r["ref_id"], "site_id": r["site_id"],
+                        "date": r["date"],
+                        "labour": r["labour_amount"], "new_labour": round(r["new_labour"], 2),
+                        "total": r["total_amount"], "new_total": round(r["new_total"], 2),
+                    })
+        return {
+            "kind": self.ref_field,
+            "rows": count,
+            "labour_change": round(labour_change, 2),
+            f"by_{self.ref_field}": {ref: round(d, 2) for ref, d in sorted(by_ref.items())},
+            "sample": sample,
+        }
+
+    # ---------------- write ----------------
+
+    def apply(self, chunk=CHUNK):
+        """Rewrite every differing row; returns how many were changed."""
+        count = 0
+        for p, rows in self.chunks(chunk):
+            with transaction.atomic(), ledger_cache.batch():
+                # total first: MySQL evaluates SET left to right
+                self.model.objects.filter(id__in=[r["id"] for r in rows]).update(
+                    total_amount=F("total_amount") + p.labour - F("labour_amount"),
+                    labour_amount=p.labour,
+                    **p.extra,
+                )
+                updated(self.model, self.payable_kind, [
+                    (r["id"], r["site_id"], r["date"], p.ref_id, r["new_total"] - r["total_amount"])
+                    for r in rows
+                ])
+            count += len(rows)
+        return count
+
+
+def updated(model, payable_kind, rows):
+    """What signals would have done for rows rewritten by a queryset update.
+
+    ``rows`` are (id, site_id, date, payable ref_id, change in the payable
+    amount): journal them, move payables, notify their site / month tags.
+    """
+    changes.record_updates(model, [(pk, site_id, day) for pk, site_id, day, _, _ in rows])
+    deltas = {}
+    for _, _, _, ref_id, delta in rows:
+        deltas[ref_id] = deltas.get(ref_id, 0) + delta
+    for ref_id, delta in deltas.items():
+        payables.apply(payable_kind, ref_id, billed=delta)
+    with ledger_cache.batch():
+        for site_id, month in {(site_id, day.replace(day=1)) for _, site_id, day, _, _ in rows}:
+            ledger_cache.notify(site_id=site_id, day=month)
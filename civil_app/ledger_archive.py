@@ -0,0 +1,186 @@
+"""Columnar export / restore of every master and ledger table (``.npz``).
+
+Each table is stored column by column as NumPy arrays named
+``<table>.<column>``: integers and foreign keys as int64, amounts as float64,
+dates as datetime64[D], text as fixed-width unicode. A nullable column that
+holds nulls gets a boolean ``<table>.<column>.null`` mask next to it. Nothing
+is pickled. ``__meta__`` is a JSON string with the format version, the last
+applied civil_app migration and each table's columns and row count.
+
+Restore writes the rows back with ``executemany`` inside one transaction,
+ids and foreign keys exactly as exported, then resets the id sequences.
+Signals do not fire, so the derived tables are recomputed afterwards the way
+generate_scale_data does it: payables and the search index are rebuilt and
+every cached computation and autocomplete index is invalidated. Payables,
+the search index, cache tags and the change journal are never exported; a
+flush empties payables and the search index too (search entries point at
+sites), since both are rebuilt.
+"""
+import json
+
+import numpy as np
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.migrations.recorder import MigrationRecorder
+
+from . import autocomplete, ledger_cache, payables, search
+from .models import (
+    Agent, BillPayment, CivilAdvance, CivilDailyWork, DefaultRate, Department,
+    DepartmentWork, ExpenseCategory, MaterialEntry, MaterialItem, OtherExpense,
+    Owner, OwnerCashEntry, OwnerCashSnapshot, Payable, SearchEntry, Site,
+    SiteDailyNote, Team, TeamRate,
+)
+
+
+FORMAT = 1
+BATCH = 5000
+
+# insert order: every table after the tables it points at
+MODELS = [
+    Site, Department, Team, TeamRate, DefaultRate, Agent, MaterialItem,
+    ExpenseCategory, Owner,
+    SiteDailyNote, CivilDailyWork, DepartmentWork, CivilAdvance, MaterialEntry,
+    OtherExpense, OwnerCashEntry, OwnerCashSnapshot, BillPayment,
+]
+
+DTYPES = {
+    "AutoField": np.int64, "BigAutoField": np.int64, "IntegerField": np.int64,
+    "BigIntegerField": np.int64, "PositiveBigIntegerField": np.int64,
+    "PositiveIntegerField": np.int64, "SmallIntegerField": np.int64,
+    "FloatField": np.float64, "BooleanField": np.bool_,
+    "DateField": "datetime64[D]", "CharField": np.str_, "TextField": np.str_,
+}
+# not archived, rebuilt after a restore; emptied first on --flush
+DERIVED = [SearchEntry, Payable]
+
+# stands in for NULL inside the array; the mask says which cells it is
+FILL = {np.int64: 0, np.float64: 0.0, np.bool_: False, "datetime64[D]": "1970-01-01", np.str_: ""}
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def _dtype(field):
+    internal = (field.target_field if field.is_relation else field).get_internal_type()
+    try:
+        return DTYPES[internal]
+    except KeyError:
+        raise ArchiveError(f"{field.model.__name__}.{field.name}: cannot archive {internal}")
+
+
+def _columns(model):
+    return [field.column for field in model._meta.concrete_fields]
+
+
+def _last_migration(connection):
+    return (
+        MigrationRecorder(connection).migration_qs.filter(app="civil_app")
+        .order_by("-id").values_list("name", flat=True).first()
+    )
+
+
+# =========================================================
+# EXPORT
+# =========================================================
+
+def export(path):
+    """Write every table to ``path``; returns {table: rows}."""
+    connection = connections[router.db_for_read(Site)]
+    arrays, tables = {}, {}
+    with connection.cursor() as cursor:
+        for model in MODELS:
+            table = model._meta.db_table
+            fields = model._meta.concrete_fields
+            cursor.execute(
+                f"SELECT {', '.join(connection.ops.quote_name(f.column) for f in fields)} "
+                f"FROM {connection.ops.quote_name(table)} ORDER BY id"
+            )
+            rows = cursor.fetchall()
+            for i, field in enumerate(fields):
+                dtype = _dtype(field)
+                values = [row[i] for row in rows]
+                nulls = np.array([v is None for v in values], dtype=bool)
+                if nulls.any():
+                    values = [FILL[dtype] if v is None else v for v in values]
+                    arrays[f"{table}.{field.column}.null"] = nulls
+                arrays[f"{table}.{field.column}"] = np.array(values, dtype=dtype)
+            tables[table] = {"columns": _columns(model), "rows": len(rows)}
+
+    meta = {"format": FORMAT, "migration": _last_migration(connection), "tables": tables}
+    arrays["__meta__"] = np.array(json.dumps(meta))
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    return {table: info["rows"] for table, info in tables.items()}
+
+
+# =========================================================
+# RESTORE
+# =========================================================
+
+def read_meta(archive):
+    meta = json.loads(str(archive["__meta__"]))
+    if meta.get("format") != FORMAT:
+        raise ArchiveError(f"unsupported archive format {meta.get('format')!r}")
+    for model in MODELS:
+        table = model._meta.db_table
+        stored = meta["tables"].get(table, {}).get("columns")
+        if stored != _columns(model):
+            raise ArchiveError(
+                f"{table}: archive columns {stored} do not match this schema {_columns(model)} "
+                f"(archive written at migration {meta.get('migration')})"
+            )
+    return meta
+
+
+def _rows(archive, model, count):
+    """Rows of one table as tuples of plain Python values, NULLs restored."""
+    table = model._meta.db_table
+    columns = []
+    for column in _columns(model):
+        values = archive[f"{table}.{column}"].tolist()  # datetime64[D] -> date
+        mask = f"{table}.{column}.null"
+        if mask in archive.files:
+            values = [None if null else v for v, null in zip(values, archive[mask].tolist())]
+        columns.append(values)
+    return list(zip(*columns)) if columns else [()] * count
+
+
+def restore(path, flush=False):
+    """Load an archive into empty tables (or replace them with ``flush``)."""
+    connection = connections[router.db_for_write(Site)]
+    quote = connection.ops.quote_name
+    counts = {}
+
+    with np.load(path, allow_pickle=False) as archive:
+        meta = read_meta(archive)
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            if flush:
+                # plain DELETEs: no cascades collected in Python, no signals
+                for model in [*DERIVED, *reversed(MODELS)]:
+                    cursor.execute(f"DELETE FROM {quote(model._meta.db_table)}")
+            else:
+                occupied = [m.__name__ for m in MODELS if m.objects.using(connection.alias).exists()]
+                if occupied:
+                    raise ArchiveError(f"tables already hold data ({', '.join(occupied)}); pass --flush")
+
+            for model in MODELS:
+                table = model._meta.db_table
+                columns = _columns(model)
+                rows = _rows(archive, model, meta["tables"][table]["rows"])
+                sql = (
+                    f"INSERT INTO {quote(table)} ({', '.join(quote(c) for c in columns)}) "
+                    f"VALUES ({', '.join(['%s'] * len(columns))})"
+                )
+                for i in range(0, len(rows), BATCH):
+                    cursor.executemany(sql, rows[i:i + BATCH])
+                counts[table] = len(rows)
+
+            for sql in connection.ops.sequence_reset_sql(no_style(), MODELS):
+                cursor.execute(sql)
+
+    counts["payables"] = payables.rebuild()
+    counts["search"] = search.rebuild()
+    autocomplete.reset()
+    ledger_cache.invalidate_all()
+    return counts
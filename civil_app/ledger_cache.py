@@ -0,0 +1,215 @@
+"""Tagged caching of ledger computations with invalidation on every ledger write.
+
+Entries live in Django's ``default`` cache (local memory, files or a shared
+backend, see ``CACHE_URL`` in settings). Each entry is tagged by site and by
+the months of its date range, and its key embeds the current version of every
+tag. Ledger writes ``notify()`` the tags they touch; the versions are bumped
+in the ``CacheTag`` table once the write commits. Every worker process reads
+the same table, so a write in one gunicorn worker retires the entry in all
+of them, whatever the backend.
+
+Tags:
+    all                      everything (``invalidate_all``)
+    masters                  names, rates and payments shown with ledger data
+    ledger                   any ledger row, for all-time computations
+    site:<id>                any row of one site
+    month:<YYYY-MM>          any row dated in that month
+    site:<id>:month:<YYYY-MM>
+    owner:<id>               an owner's cash in / out
+    material                 any material entry (price analytics)
+"""
+import hashlib
+from contextlib import contextmanager
+from datetime import date
+
+from asgiref.local import Local
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import CacheTag
+
+
+# context-local rather than thread-local: under ASGI a request's ORM work
+# runs in sync_to_async threads that must see the request's batch
+_local = Local()
+
+
+# =========================================================
+# TAGS
+# =========================================================
+
+def _months(start, end):
+    month = date(start.year, start.month, 1)
+    while month <= end:
+        yield f"{month:%Y-%m}"
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _as_date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def write_tags(site_id=None, day=None, owner_id=None):
+    """Tags touched by writing one ledger row."""
+    tags = {"ledger"}
+    day = _as_date(day)
+    if site_id:
+        tags.add(f"site:{site_id}")
+    if day:
+        tags.add(f"month:{day:%Y-%m}")
+    if site_id and day:
+        tags.add(f"site:{site_id}:month:{day:%Y-%m}")
+    if owner_id:
+        tags.add(f"owner:{owner_id}")
+    return tags
+
+
+def entry_tags(site_id=None, start=None, end=None, owner_id=None):
+    """Tags a computation over one site (or all) and a date range (or all time) depends on."""
+    tags = {"all", "masters"}
+    if start and end:
+        months = _months(_as_date(start), _as_date(end))
+        if site_id:
+            tags.update(f"site:{site_id}:month:{m}" for m in months)
+        else:
+            tags.update(f"month:{m}" for m in months)
+    elif site_id:
+        tags.add(f"site:{site_id}")
+    elif not owner_id:
+        tags.add("ledger")
+    if owner_id:
+        tags.add(f"owner:{owner_id}")
+    return tags
+
+
+# =========================================================
+# VERSIONS
+# =========================================================
+
+def versions(tags):
+    return dict(CacheTag.objects.filter(tag__in=tags).values_list("tag", "version"))
+
+
+def bump(tags):
+    tags = sorted(tags)
+    if not tags:
+        return
+    existing = set(
+        CacheTag.objects.filter(tag__in=tags).values_list("tag", flat=True)
+    )
+    CacheTag.objects.filter(tag__in=existing).update(version=F("version") + 1)
+    # a concurrent bump may create the same tag first; either way it moved off 0
+    CacheTag.objects.bulk_create(
+        [CacheTag(tag=t, version=1) for t in tags if t not in existing],
+        ignore_conflicts=True,
+    )
+
+
+# =========================================================
+# NOTIFY (THE INVALIDATION BUS)
+# =========================================================
+
+def _pending():
+    if not hasattr(_local, "tags"):
+        _local.tags = set()
+        _local.depth = 0
+    return _local.tags
+
+
+def _flush():
+    tags = set(_pending())
+    _local.tags.clear()
+    bump(tags)
+
+
+def notify(site_id=None, day=None, owner_id=None, tags=()):
+    """Record that ledger data changed; versions move once the write commits.
+
+    Inside :func:`batch` (every request, via the middleware) the tags from all
+    writes are collected and bumped once at the end.
+    """
+    pending = _pending()
+    pending.update(write_tags(site_id, day, owner_id))
+    pending.update(tags)
+    if not _local.depth:
+        transaction.on_commit(_flush)
+
+
+def notify_masters():
+    notify(tags={"masters"})
+
+
+def invalidate_all():
+    bump({"all"})
+
+
+def _enter():
+    _pending()
+    _local.depth += 1
+
+
+def _exit():
+    _local.depth -= 1
+    if not _local.depth and _local.tags:
+        transaction.on_commit(_flush)
+
+
+@contextmanager
+def batch():
+    _enter()
+    try:
+        yield
+    finally:
+        _exit()
+
+
+class LedgerCacheMiddleware:
+    """Collapse every invalidation raised while handling a request into one bump."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with batch():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        _enter()
+        try:
+            return await self.get_response(request)
+        finally:
+            # the flush bumps versions in the database
+            await sync_to_async(_exit)()
+
+
+# =========================================================
+# CACHED COMPUTATIONS
+# =========================================================
+
+def stamp(tags):
+    """The current version of every tag as one string; changes with any of them."""
+    current = versions(tags)
+    return ",".join(f"{t}={current.get(t, 0)}" for t in sorted(tags))
+
+
+def cached(name, params, compute, site_id=None, start=None, end=None, owner_id=None, timeout=None):
+    """Return ``compute()`` from the cache, keyed by ``params`` and its tags' versions."""
+    tags = entry_tags(site_id, start, end, owner_id)
+    digest = hashlib.sha1(f"{params!r}|{stamp(tags)}".encode()).hexdigest()
+    key = f"ledger:{name}:{digest}"
+
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout or settings.LEDGER_CACHE_TIMEOUT)
+    return value
@@ -0,0 +1,157 @@
+"""The hot ledger query shapes, shared by the views and their index tests.
+
+Each function is the filter + grouping one of the composite indexes in
+civil_app.models was added for (named on the function); the views add
+their own aggregates on top. LedgerIndexPlanTests EXPLAINs these same
+querysets and checks each index's column order against their filters, so
+a view that drifts from its index shows up as a failing test.
+
+Range queries filter ``date`` first and group by the party; single-bill
+queries filter the party and then the date range.
+"""
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import (
+    CivilAdvance, CivilDailyWork, DepartmentWork, MaterialEntry, OtherExpense, OwnerCashEntry,
+)
+
+
+# =========================================================
+# DATE RANGE (all_bills)
+# =========================================================
+
+def civil_totals(from_date, to_date):
+    """cdw_date_team_total_idx"""
+    return (
+        CivilDailyWork.objects
+        .filter(date__range=[from_date, to_date])
+        .values("team_id", "team__name")
+        .annotate(total_amount=Sum("total_amount"))
+    )
+
+
+def civil_advances(from_date, to_date):
+    """cadv_date_team_amount_idx"""
+    return (
+        CivilAdvance.objects
+        .filter(date__range=[from_date, to_date])
+        .values("team_id")
+        .annotate(total_advance=Sum("amount"))
+    )
+
+
+def department_totals(from_date, to_date):
+    """dw_date_dept_idx"""
+    return (
+        DepartmentWork.objects
+        .filter(date__range=[from_date, to_date])
+        .values("department_id", "department__name")
+        .annotate(
+            total_amount=Sum("total_amount"),
+            total_advance=Sum("advance_amount"),
+        )
+    )
+
+
+def material_totals(from_date, to_date):
+    """mat_date_agent_idx"""
+    return (
+        MaterialEntry.objects
+        .filter(date__range=[from_date, to_date])
+        .values("agent_id", "agent__name")
+        .annotate(
+            total_amount=Sum("total"),
+            total_advance=Sum("advance"),
+        )
+        .order_by("agent__name")
+    )
+
+
+def expense_totals(from_date, to_date):
+    """exp_date_category_idx"""
+    return (
+        OtherExpense.objects
+        .filter(date__range=[from_date, to_date])
+        .values("category_id", "category__name")
+        .annotate(
+            total_amount=Coalesce(
+                Sum("amount"),
+                Value(0),
+                output_field=DecimalField()
+            )
+        )
+    )
+
+
+# =========================================================
+# SINGLE BILL (bill_*_detail / bill_*_pdf), grouped by site
+# =========================================================
+
+def team_bill(team_id, from_date, to_date):
+    """cdw_team_date_idx"""
+    return (
+        CivilDailyWork.objects
+        .filter(team_id=team_id, date__range=[from_date, to_date])
+        .values("site_id", "site__name")
+    )
+
+
+def team_bill_advances(team_id, from_date, to_date):
+    """cadv_team_date_idx"""
+    return (
+        CivilAdvance.objects
+        .filter(team_id=team_id, date__range=[from_date, to_date])
+        .values("site_id")
+    )
+
+
+def department_bill(department_id, from_date, to_date):
+    """dw_dept_date_idx"""
+    return (
+        DepartmentWork.objects
+        .filter(department_id=department_id, date__range=[from_date, to_date])
+        .values("site_id", "site__name")
+    )
+
+
+def agent_bill(agent_id, from_date, to_date):
+    """mat_agent_date_idx"""
+    return (
+        MaterialEntry.objects
+        .filter(agent_id=agent_id, date__range=[from_date, to_date])
+        .values("site_id", "site__name")
+    )
+
+
+def category_bill(category_id, from_date, to_date):
+    """exp_category_date_idx"""
+    return (
+        OtherExpense.objects
+        .filter(category_id=category_id, date__range=[from_date, to_date])
+        .values("site_id", "site__name", "owner__name")
+    )
+
+
+# =========================================================
+# SITE DAY (site_detail) / OWNERS
+# =========================================================
+
+def day_materials(site_id, day):
+    """mat_site_date_idx"""
+    return MaterialEntry.objects.filter(site_id=site_id, date=day)
+
+
+def day_expenses(site_id, day):
+    """exp_site_date_idx"""
+    return OtherExpense.objects.filter(site_id=site_id, date=day)
+
+
+def owner_cash_entries():
+    """ocash_date_idx: newest first, id breaking ties for keyset pages."""
+    return OwnerCashEntry.objects.select_related("owner").order_by("-date", "-id")
+
+
+def owner_sums(model, condition):
+    """ocash_owner_date_amt_idx / exp_owner_amount_idx: amount per owner."""
+    return model.objects.filter(condition).values("owner_id").annotate(s=Sum("amount"))
@@ -0,0 +1,252 @@
+"""Process-level columnar snapshot of every ledger line, for ad-hoc pivots.
+
+Each civil work, civil advance, department work, material, expense and owner
+cash row is one line: its kind, date, site and parties (team, department,
+agent, item, category, owner; 0 where they do not apply) and its amount, held
+as NumPy columns. :func:`pivot` groups and sums those columns over any one or
+two dimensions with ``bincount``; only the freshness check reaches the
+database.
+
+Freshness:
+    - lines written since the snapshot's cursor in the change journal
+      (``civil_app.changes``) are reloaded by id, deleted ones dropped;
+    - a new version of the ``all`` cache tag (bulk loads, resets) reloads
+      everything;
+    - names are reloaded when the ``masters`` tag moves.
+"""
+import threading
+from datetime import timedelta
+
+import numpy as np
+from django.db import connections, router
+
+from . import changes, ledger_cache
+from .models import (
+    Agent, CivilAdvance, CivilDailyWork, Department, DepartmentWork, ExpenseCategory,
+    MaterialEntry, MaterialItem, OtherExpense, Owner, OwnerCashEntry, Site, Team,
+)
+from .price_analytics import EPOCH, day_sql
+
+
+# kind -> (model, amount field, {party column: field})
+SOURCES = {
+    "civil": (CivilDailyWork, "total_amount", {"site": "site", "team": "team"}),
+    "advance": (CivilAdvance, "amount", {"site": "site", "team": "team"}),
+    "department": (DepartmentWork, "total_amount", {"site": "site", "department": "department"}),
+    "material": (MaterialEntry, "total", {"site": "site", "agent": "agent", "item": "item"}),
+    "expense": (OtherExpense, "amount", {"site": "site", "category": "category", "owner": "owner"}),
+    "owner_cash": (OwnerCashEntry, "amount", {"owner": "owner"}),
+}
+KINDS = list(SOURCES)
+PARTIES = ["site", "team", "department", "agent", "item", "category", "owner"]
+NAME_MODELS = {
+    "site": Site, "team": Team, "department": Department, "agent": Agent,
+    "item": MaterialItem, "category": ExpenseCategory, "owner": Owner,
+}
+DIMENSIONS = ["kind", *PARTIES, "date", "month", "year"]
+MEASURES = ["amount", "count"]
+
+COLUMNS = ["kind", "id", "day", *PARTIES, "amount"]
+
+
+# =========================================================
+# LOADING
+# =========================================================
+
+def _select(kind, connection):
+    model, amount, parties = SOURCES[kind]
+    fields = [
+        f"COALESCE({model._meta.get_field(parties[p]).column}, 0)" if p in parties else "0"
+        for p in PARTIES
+    ]
+    return (
+        f"SELECT {KINDS.index(kind)}, id, {day_sql(connection)}, {', '.join(fields)}, "
+        f"COALESCE({model._meta.get_field(amount).column}, 0) FROM {model._meta.db_table}"
+    )
+
+
+def _lines(rows):
+    return np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+
+
+def load_all():
+    """Every line of every kind, from one UNION ALL query."""
+    connection = connections[router.db_for_read(CivilDailyWork)]
+    with connection.cursor() as cursor:
+        cursor.execute(" UNION ALL ".join(_select(kind, connection) for kind in KINDS))
+        return _lines(cursor.fetchall())
+
+
+def load_lines(kind, ids, chunk=500):
+    """Lines of one kind with the given ids."""
+    connection = connections[router.db_for_read(SOURCES[kind][0])]
+    sql = _select(kind, connection)
+    rows = []
+    with connection.cursor() as cursor:
+        for i in range(0, len(ids), chunk):
+            part = ids[i:i + chunk]
+            cursor.execute(f"{sql} WHERE id IN ({', '.join(['%s'] * len(part))})", part)
+            rows.extend(cursor.fetchall())
+    return _lines(rows)
+
+
+def load_names():
+    """{dimension: {id: name}} for every master, from one UNION ALL query."""
+    connection = connections[router.db_for_read(Site)]
+    dims = list(NAME_MODELS)
+    sql = " UNION ALL ".join(
+        f"SELECT {i}, id, name FROM {NAME_MODELS[dim]._meta.db_table}" for i, dim in enumerate(dims)
+    )
+    names = {dim: {} for dim in dims}
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        for i, pk, name in cursor.fetchall():
+            names[dims[i]][pk] = name
+    return names
+
+
+class Snapshot:
+
+    def __init__(self):
+        self.lines = np.empty((0, len(COLUMNS)))
+        self.cursor = 0
+        self.versions = None
+        self.names = {}
+        self._split()
+
+    def _split(self):
+        """Typed column views over the line array."""
+        for i, name in enumerate(COLUMNS):
+            column = self.lines[:, i]
+            setattr(self, name, column if name == "amount" else column.astype(np.int64))
+
+    def reload(self):
+        # cursor first: a write landing during the load is replayed next time
+        self.cursor = changes.latest()
+        self.lines = load_all()
+        self._split()
+
+    def apply(self, pending):
+        """Replace the lines named by journal entries ``(id, kind, row_id)``."""
+        stale = np.zeros(len(self.lines), dtype=bool)
+        fresh = []
+        for kind in {k for _, k, _ in pending}:
+            if kind not in SOURCES:
+                continue
+            ids = sorted({row_id for _, k, row_id in pending if k == kind})
+            stale |= (self.kind == KINDS.index(kind)) & np.isin(self.id, ids)
+            fresh.append(load_lines(kind, ids))  # deleted rows simply do not come back
+        self.lines = np.concatenate([self.lines[~stale], *fresh])
+        self.cursor = max(change_id for change_id, _, _ in pending)
+        self._split()
+
+    def refresh(self):
+        current = ledger_cache.versions({"all", "masters"})
+        if self.versions is None or current.get("all") != self.versions.get("all"):
+            self.reload()
+        else:
+            pending = [entry[:3] for entry in changes.settled(self.cursor)]
+            if pending:
+                self.apply(pending)
+        if self.versions is None or current.get("masters") != self.versions.get("masters"):
+            self.names = load_names()
+        self.versions = current
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def snapshot():
+    """The process snapshot, brought up to date (two small queries when nothing changed)."""
+    global _snapshot
+    with _lock:
+        if _snapshot is None:
+            _snapshot = Snapshot()
+        _snapshot.refresh()
+        return _snapshot
+
+
+def reset():
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+# =========================================================
+# PIVOTS
+# =========================================================
+
+def _dimension(snap, name, mask):
+    """(group codes, label for a code) of one dimension over the masked lines."""
+    if name == "kind":
+        return snap.kind[mask], lambda code: KINDS[code]
+    if name == "date":
+        return snap.day[mask], lambda code: (EPOCH + timedelta(days=code)).isoformat()
+    if name == "month":
+        months = snap.day[mask].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        return months, lambda code: f"{1970 + code // 12}-{code % 12 + 1:02d}"
+    if name == "year":
+        years = snap.day[mask].astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64)
+        return years, lambda code: str(1970 + code)
+    names = snap.names.get(name, {})
+    return getattr(snap, name)[mask], lambda code: names.get(code, "")
+
+
+def _rounded(values):
+    return np.round(values, 2).tolist()
+
+
+def pivot(rows, cols=None, kinds=None, start=None, end=None, site_id=None, measure="amount"):
+    """Sum (or count) ledger lines grouped by ``rows`` and optionally ``cols``."""
+    snap = snapshot()
+
+    mask = np.ones(len(snap.lines), dtype=bool)
+    if kinds:
+        mask &= np.isin(snap.kind, [KINDS.index(k) for k in kinds])
+    if start:
+        mask &= snap.day >= (start - EPOCH).days
+    if end:
+        mask &= snap.day <= (end - EPOCH).days
+    if site_id:
+        mask &= snap.site == site_id
+
+    weights = snap.amount[mask] if measure == "amount" else None
+
+    row_codes, row_label = _dimension(snap, rows, mask)
+    row_keys, row_group = np.unique(row_codes, return_inverse=True)
+    result = {
+        "measure": measure,
+        "lines": int(mask.sum()),
+        "rows": {
+            "dimension": rows,
+            "keys": row_keys.tolist(),
+            "labels": [row_label(k) for k in row_keys.tolist()],
+        },
+    }
+
+    if not cols:
+        values = np.bincount(row_group, weights=weights, minlength=len(row_keys))
+        result.update(cols=None, values=_rounded(values), total=round(float(values.sum()), 2))
+        return result
+
+    col_codes, col_label = _dimension(snap, cols, mask)
+    col_keys, col_group = np.unique(col_codes, return_inverse=True)
+    cells = np.bincount(
+        row_group * len(col_keys) + col_group,
+        weights=weights,
+        minlength=len(row_keys) * len(col_keys),
+    ).reshape(len(row_keys), len(col_keys))
+
+    result.update(
+        cols={
+            "dimension": cols,
+            "keys": col_keys.tolist(),
+            "labels": [col_label(k) for k in col_keys.tolist()],
+        },
+        values=_rounded(cells),
+        row_totals=_rounded(cells.sum(axis=1)),
+        col_totals=_rounded(cells.sum(axis=0)),
+        total=round(float(cells.sum()), 2),
+    )
+    return result
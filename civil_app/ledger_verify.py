@@ -0,0 +1,260 @@
+"""Find (and fix) stored amounts that no longer follow from counts and rates.
+
+Every row of a kind is loaded as NumPy columns with one numeric query, its
+amounts are recomputed for all rows at once and compared with what is
+stored:
+
+civil       wages = counts x the team rate get_team_rate picks for the
+            date; labour_amount = floor(wages); total_amount = wages - that
+            day's CivilAdvance
+department  wages = full x full_day_rate + half x full_day_rate / 2;
+            labour_amount = floor(wages); half_day_rate = full_day_rate // 2;
+            total_amount = wages - advance
+material    total = quantity x rate
+
+Integer columns hold wages floored the way the save path (``int()``) and
+labour_recompute floor them, so they are compared exactly; float columns
+to within TOLERANCE.
+
+A civil row's rate is found by binary search over every TeamRate sorted by
+(team, from_date), once for locked and once for unlocked rates; days no rate
+covers are counted as unpriced, not checked. Rows and rates (or advances)
+are matched on packed int64 keys built by :func:`_keys`.
+
+Typical causes: rates edited after entry, copy_previous_day copying labour
+and totals across a rate change or without the advance, and department days
+saved with the default half_day_rate next to a typed full-day rate.
+
+:func:`fix` writes the expected values with bulk_update and, since signals
+do not fire, journals the rows, moves payables and notifies the ledger
+cache (see ``labour_recompute.updated``).
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.db import connections, router, transaction
+
+from .labour_recompute import updated
+from .models import (
+    CivilAdvance, CivilDailyWork, DepartmentWork, MaterialEntry, TeamRate,
+)
+from .price_analytics import _date, day_sql
+
+
+KINDS = ["civil", "department", "material"]
+BATCH = 500
+TOLERANCE = 0.005
+
+# kind -> (model, party column, payable kind)
+MODELS = {
+    "civil": (CivilDailyWork, "team_id", "team"),
+    "department": (DepartmentWork, "department_id", "department"),
+    "material": (MaterialEntry, "agent_id", "agent"),
+}
+
+
+@dataclass
+class Check:
+    """One kind's rows: key columns plus stored / expected value per field."""
+    kind: str
+    id: np.ndarray
+    site: np.ndarray
+    party: np.ndarray
+    day: np.ndarray
+    fields: dict = field(default_factory=dict)  # name -> (stored, expected)
+    checked: np.ndarray = None  # rows that could be recomputed
+    payable: str = "total_amount"
+
+    def mismatched(self, name):
+        stored, expected = self.fields[name]
+        model = MODELS[self.kind][0]
+        if model._meta.get_field(name).get_internal_type() == "IntegerField":
+            return self.checked & (stored != expected)
+        return self.checked & (np.abs(stored - expected) > TOLERANCE)
+
+    @property
+    def bad(self):
+        """Rows with at least one mismatched field."""
+        bad = np.zeros(len(self.id), dtype=bool)
+        for name in self.fields:
+            bad |= self.mismatched(name)
+        return bad
+
+
+# =========================================================
+# LOADING
+# =========================================================
+
+def _columns(model, columns):
+    """Every row of ``model`` as one float array per column (dates as day numbers)."""
+    connection = connections[router.db_for_read(model)]
+    select = ", ".join(
+        day_sql(connection, c) if model._meta.get_field(c).get_internal_type() == "DateField"
+        else f"COALESCE({c}, 0)"
+        for c in columns
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {select} FROM {model._meta.db_table} ORDER BY id")
+        rows = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, len(columns))
+    return {c: rows[:, i] for i, c in enumerate(columns)}
+
+
+def _keys(*tuples):
+    """One int64 per row for each (site, team, day) style tuple of columns.
+
+    Keys are comparable across the tuples and sort like the tuples do: each
+    column is replaced by its rank among the values all tuples hold at that
+    position, so a column takes only as many bits as it has distinct values.
+    """
+    sizes = [len(columns[0]) for columns in tuples]
+    key = np.zeros(sum(sizes), dtype=np.int64)
+    used = 0
+    for position in range(len(tuples[0])):
+        values, rank = np.unique(
+            np.concatenate([columns[position] for columns in tuples]), return_inverse=True,
+        )
+        bits = len(values).bit_length()
+        used += bits
+        if used > 63:
+            raise ValueError(f"{len(tuples[0])} key columns need {used} bits")
+        key = (key << bits) | rank.reshape(-1).astype(np.int64)
+    return np.split(key, np.cumsum(sizes)[:-1])
+
+
+def _lookup(keys, values, wanted, default=0.0):
+    """values[keys == wanted] per wanted key (keys unique), ``default`` if absent."""
+    order = np.argsort(keys)
+    keys, values = keys[order], values[order]
+    i = np.clip(np.searchsorted(keys, wanted), 0, max(len(keys) - 1, 0))
+    found = (keys[i] == wanted) if len(keys) else np.zeros(len(wanted), dtype=bool)
+    return np.where(found, values[i] if len(keys) else default, default)
+
+
+# =========================================================
+# CHECKS
+# =========================================================
+
+def _rate_index(rate_team, rate_day, team, day):
+    """Per row, the last rate of its team starting on or before its day (-1 if none).
+    Rates (at least one) must be sorted by (team, from_day)."""
+    rate_key, row_key = _keys((rate_team, rate_day), (team, day))
+    i = np.searchsorted(rate_key, row_key, side="right") - 1
+    return np.where((i >= 0) & (rate_team[np.maximum(i, 0)] == team), i, -1)
+
+
+def check_civil():
+    c = _columns(CivilDailyWork, [
+        "id", "site_id", "team_id", "date", "mason_full", "helper_full",
+        "mason_half", "helper_half", "labour_amount", "total_amount",
+    ])
+    r = _columns(TeamRate, ["id", "team_id", "from_date", "is_locked", "mason_full_rate", "helper_full_rate"])
+
+    team, day = c["team_id"], c["date"]
+    mason = np.zeros(len(team))
+    helper = np.zeros(len(team))
+    priced = np.zeros(len(team), dtype=bool)
+    # locked rates take precedence wherever one has started
+    for locked in (False, True):
+        group = {k: v[r["is_locked"] == locked] for k, v in r.items()}
+        if not len(group["id"]):
+            continue
+        order = np.lexsort((group["id"], group["from_date"], group["team_id"]))
+        group = {k: v[order] for k, v in group.items()}
+        i = _rate_index(group["team_id"], group["from_date"], team, day)
+        hit = i >= 0
+        mason = np.where(hit, group["mason_full_rate"][np.maximum(i, 0)], mason)
+        helper = np.where(hit, group["helper_full_rate"][np.maximum(i, 0)], helper)
+        priced |= hit
+
+    wages = (
+        c["mason_full"] * mason + c["helper_full"] * helper +
+        c["mason_half"] * mason / 2 + c["helper_half"] * helper / 2
+    )
+    a = _columns(CivilAdvance, ["site_id", "team_id", "date", "amount"])
+    advance_key, row_key = _keys((a["site_id"], a["team_id"], a["date"]), (c["site_id"], team, day))
+    advance = _lookup(advance_key, a["amount"], row_key)
+
+    return Check(
+        "civil", c["id"], c["site_id"], team, day,
+        fields={
+            "labour_amount": (c["labour_amount"], np.floor(wages)),
+            "total_amount": (c["total_amount"], wages - advance),
+        },
+        checked=priced,
+    )
+
+
+def check_department():
+    c = _columns(DepartmentWork, [
+        "id", "site_id", "department_id", "date", "full_day_count", "half_day_count",
+        "full_day_rate", "half_day_rate", "labour_amount", "advance_amount", "total_amount",
+    ])
+    rate = c["full_day_rate"]
+    wages = c["full_day_count"] * rate + c["half_day_count"] * rate / 2
+    return Check(
+        "department", c["id"], c["site_id"], c["department_id"], c["date"],
+        fields={
+            "half_day_rate": (c["half_day_rate"], np.floor(rate / 2)),
+            "labour_amount": (c["labour_amount"], np.floor(wages)),
+            "total_amount": (c["total_amount"], wages - c["advance_amount"]),
+        },
+        checked=np.ones(len(rate), dtype=bool),
+    )
+
+
+def check_material():
+    c = _columns(MaterialEntry, ["id", "site_id", "agent_id", "date", "quantity", "rate", "total"])
+    return Check(
+        "material", c["id"], c["site_id"], c["agent_id"], c["date"],
+        fields={"total": (c["total"], c["quantity"] * c["rate"])},
+        checked=np.ones(len(c["id"]), dtype=bool),
+        payable="total",
+    )
+
+
+CHECKS = {"civil": check_civil, "department": check_department, "material": check_material}
+
+
+# =========================================================
+# REPORT / FIX
+# =========================================================
+
+def mismatches(check):
+    """[{id, site_id, date, party, field, stored, expected}] for every bad field."""
+    out = []
+    for name in check.fields:
+        stored, expected = check.fields[name]
+        for i in np.flatnonzero(check.mismatched(name)).tolist():
+            out.append({
+                "id": int(check.id[i]), "site_id": int(check.site[i]),
+                "date": _date(check.day[i]), "party": int(check.party[i]) or None,
+                "field": name, "stored": float(stored[i]), "expected": round(float(expected[i]), 2),
+            })
+    out.sort(key=lambda m: (m["site_id"], m["date"], m["party"] or 0, m["id"]))
+    return out
+
+
+def fix(check):
+    """Write the expected values over every bad row; returns how many were fixed."""
+    model, _, payable_kind = MODELS[check.kind]
+    rows = np.flatnonzero(check.bad)
+    names = list(check.fields)
+    stored_payable = check.fields[check.payable][0]
+    expected_payable = check.fields[check.payable][1]
+
+    for start in range(0, len(rows), BATCH):
+        part = rows[start:start + BATCH].tolist()
+        objs = [
+            model(id=int(check.id[i]), **{name: float(check.fields[name][1][i]) for name in names})
+            for i in part
+        ]
+        with transaction.atomic():
+            model.objects.bulk_update(objs, names)
+            updated(model, payable_kind, [
+                (
+                    int(check.id[i]), int(check.site[i]), _date(check.day[i]), int(check.party[i]),
+                    float(expected_payable[i] - stored_payable[i]),
+                )
+                for i in part
+            ])
+    return len(rows)
@@ -0,0 +1,179 @@
+import logging
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from math import nan
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count, Max
+from django.test import Client
+
+from civil_app import benchmarks
+from civil_app.models import CivilDailyWork
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent site_detail saves and report reads from separate processes "
+        "against a scratch copy of the SQLite database. Compare runs with "
+        "SQLITE_TUNED=0 (stock), the default IMMEDIATE setup and SQLITE_WAL=1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--days", type=int, default=30, help="Report range length.")
+        parser.add_argument("--output", help="Result file (default benchmarks/concurrency-<time>.json).")
+        parser.add_argument("--compare", help="Earlier result file to compare against.")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "sqlite":
+            raise CommandError("The concurrency benchmark targets the SQLite setup.")
+
+        last_day = CivilDailyWork.objects.aggregate(d=Max("date"))["d"]
+        if not last_day:
+            raise CommandError("No ledger data; run generate_scale_data first.")
+
+        options = settings.DATABASES["default"].get("OPTIONS", {})
+        tuned = options.get("transaction_mode") == "IMMEDIATE"
+        wal = "journal_mode=WAL" in options.get("init_command", "")
+        original = settings.DATABASES["default"]["NAME"]
+        scratch = self.scratch_copy(original, wal)
+
+        try:
+            sites = list(
+                CivilDailyWork.objects.filter(date=last_day)
+                .values("site_id").annotate(n=Count("id")).order_by("-n")
+                .values_list("site_id", flat=True)[:opts["writers"]]
+            )
+            User.objects.filter(username="benchmark").delete()
+            User.objects.create_superuser("benchmark", "benchmark@example.com", None)
+
+            jobs = [
+                ("write", f"/site/{site_id}/", benchmarks.site_day_form(site_id, last_day))
+                for site_id in sites
+            ] + [
+                ("read", "/reports/", {
+                    "from_date": (last_day - timedelta(days=opts["days"] - 1)).isoformat(),
+                    "to_date": last_day.isoformat(),
+                })
+            ] * opts["readers"]
+
+            results = self.run_workers(jobs, opts["seconds"])
+            journal = connection.cursor().execute("PRAGMA journal_mode").fetchone()[0]
+        finally:
+            connections.close_all()
+            connections["default"].settings_dict["NAME"] = original
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                if os.path.exists(scratch + suffix):
+                    os.remove(scratch + suffix)
+
+        for kind in ("write", "read"):
+            r = results[kind]
+            self.stdout.write(
+                f"{kind:<6} {r['per_second']:>8.1f}/s  median {r.get('median_ms', nan):>8.2f} ms  "
+                f"p95 {r.get('p95_ms', nan):>8.2f} ms  errors {r['errors']}"
+            )
+
+        path = benchmarks.write_results(
+            "concurrency", results,
+            meta={
+                "tuned": tuned, "journal_mode": journal,
+                "writers": len(sites), "readers": opts["readers"], "seconds": opts["seconds"],
+            },
+            path=opts["output"],
+        )
+        self.stdout.write(f"saved {path}")
+
+        if opts["compare"]:
+            self.stdout.write(f"{'case':<28} {'before':>10} {'after':>10} {'change':>9}")
+            old, new = benchmarks.load_results(opts["compare"]), benchmarks.load_results(path)
+            for key in ("median_ms", "p95_ms", "per_second"):
+                self.stdout.write(key)
+                for line in benchmarks.compare(old, new, key=key):
+                    self.stdout.write(line)
+
+    # =========================================================
+    # SCRATCH DATABASE
+    # =========================================================
+
+    def scratch_copy(self, original, wal):
+        """Point the default connection at a copy of the database; return its path."""
+        fd, path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+
+        source = sqlite3.connect(original)
+        target = sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+        # the copy keeps the source's journal mode; without SQLITE_WAL it is rollback-journal
+        target.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        target.close()
+
+        connections.close_all()
+        connections["default"].settings_dict["NAME"] = path
+        return path
+
+    # =========================================================
+    # WORKERS
+    # =========================================================
+
+    def run_workers(self, jobs, seconds):
+        ctx = multiprocessing.get_context("fork")
+        queue = ctx.Queue()
+        start_at = time.time() + 1  # every worker starts together
+
+        connections.close_all()
+        procs = [
+            ctx.Process(target=worker, args=(kind, url, data, start_at, seconds, queue))
+            for kind, url, data in jobs
+        ]
+        for p in procs:
+            p.start()
+        reports = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+        results = {}
+        for kind in ("write", "read"):
+            samples = [s for k, ss, _ in reports if k == kind for s in ss]
+            errors = sum(e for k, _, e in reports if k == kind)
+            results[kind] = {
+                **(benchmarks.summarize(samples) if samples else {"runs": 0}),
+                "per_second": round(len(samples) / seconds, 2),
+                "errors": errors,
+            }
+        return results
+
+
+def worker(kind, url, data, start_at, seconds, queue):
+    # lock errors are counted, not printed
+    logging.getLogger("civil_app.queries").disabled = True
+    logging.getLogger("django.request").disabled = True
+    connections.close_all()
+
+    client = Client(raise_request_exception=False)
+    client.force_login(User.objects.get(username="benchmark"))
+    send = client.post if kind == "write" else client.get
+
+    samples, errors = [], 0
+    time.sleep(max(0, start_at - time.time()))
+    deadline = start_at + seconds
+
+    while time.time() < deadline:
+        t = time.perf_counter()
+        response = send(url, data)
+        if response.status_code >= 400:
+            errors += 1
+        else:
+            samples.append(time.perf_counter() - t)
+
+    connections.close_all()
+    queue.put((kind, samples, errors))
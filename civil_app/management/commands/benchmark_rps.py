@@ -0,0 +1,164 @@
+import logging
+import multiprocessing
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count, Max
+from django.test import Client
+
+from civil_app import benchmarks
+from civil_app.models import CivilDailyWork
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure requests per second over the main pages from several processes, "
+        "with the settings in use. Run once with the default settings and once with "
+        "DJANGO_ENV=production SECRET_KEY=... ALLOWED_HOSTS=testserver "
+        "(collectstatic first) and --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--days", type=int, default=30, help="Report / bill range length.")
+        parser.add_argument("--output", help="Result file (default benchmarks/rps-<time>.json).")
+        parser.add_argument("--compare", help="Earlier result file to compare against.")
+
+    def handle(self, *args, **opts):
+        last_day = CivilDailyWork.objects.aggregate(d=Max("date"))["d"]
+        if not last_day:
+            raise CommandError("No ledger data; run generate_scale_data first.")
+
+        window = {
+            "from_date": (last_day - timedelta(days=opts["days"] - 1)).isoformat(),
+            "to_date": last_day.isoformat(),
+        }
+        site_id = (
+            CivilDailyWork.objects.filter(date=last_day)
+            .values("site_id").annotate(n=Count("id")).order_by("-n")
+            .values_list("site_id", flat=True).first()
+        )
+        pages = [
+            ("dashboard", "/", {"range": "month"}),
+            ("site_entry", "/sites/", None),
+            ("site_detail_get", f"/site/{site_id}/", {"date": last_day.isoformat()}),
+            ("reports", "/reports/", window),
+            ("all_bills", "/bills/", window),
+            ("api_bill_details", "/api/bills/details/", window),
+        ]
+
+        User.objects.filter(username="benchmark").delete()
+        User.objects.create_superuser("benchmark", "benchmark@example.com", None)
+        try:
+            results = self.run_workers(pages, opts["workers"], opts["seconds"])
+        finally:
+            User.objects.filter(username="benchmark").delete()
+
+        for name, r in results.items():
+            if name == "total":
+                self.stdout.write(f"{name:<20} {r['per_second']:>8.1f}/s  errors {r['errors']}")
+                continue
+            self.stdout.write(
+                f"{name:<20} {r['per_second']:>8.1f}/s  median {r['median_ms']:>8.2f} ms  "
+                f"p95 {r['p95_ms']:>8.2f} ms  {r['bytes']:>8} B  errors {r['errors']}"
+            )
+
+        database = settings.DATABASES["default"]
+        path = benchmarks.write_results(
+            "rps", results,
+            meta={
+                "settings": os.environ.get("DJANGO_SETTINGS_MODULE"),
+                "debug": settings.DEBUG,
+                "session_engine": settings.SESSION_ENGINE,
+                "conn_max_age": database.get("CONN_MAX_AGE", 0),
+                "compression": "civil_project.middleware.CompressionMiddleware" in settings.MIDDLEWARE,
+                "workers": opts["workers"], "seconds": opts["seconds"], "days": opts["days"],
+            },
+            path=opts["output"],
+        )
+        self.stdout.write(f"saved {path}")
+
+        if opts["compare"]:
+            self.stdout.write(f"{'case':<28} {'before':>10} {'after':>10} {'change':>9}")
+            old, new = benchmarks.load_results(opts["compare"]), benchmarks.load_results(path)
+            for key in ("per_second", "median_ms", "bytes"):
+                self.stdout.write(key)
+                for line in benchmarks.compare(old, new, key=key):
+                    self.stdout.write(line)
+
+    # =========================================================
+    # WORKERS
+    # =========================================================
+
+    def run_workers(self, pages, workers, seconds):
+        ctx = multiprocessing.get_context("fork")
+        queue = ctx.Queue()
+        start_at = time.time() + 1  # every worker starts together
+
+        connections.close_all()
+        procs = [
+            ctx.Process(target=worker, args=(pages, start_at, seconds, queue))
+            for _ in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        reports = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        # a worker finishes its last request after the deadline; count that time too
+        elapsed = max(r.pop("finished") for r in reports) - start_at
+
+        results = {}
+        for name, _, _ in pages:
+            samples = [s for r in reports for s in r[name]["samples"]]
+            results[name] = {
+                **(benchmarks.summarize(samples) if samples else {"runs": 0}),
+                "per_second": round(len(samples) / elapsed, 2),
+                "bytes": max(r[name]["bytes"] for r in reports),
+                "errors": sum(r[name]["errors"] for r in reports),
+            }
+
+        runs = sum(r["runs"] for r in results.values())
+        results["total"] = {
+            "runs": runs,
+            "per_second": round(runs / elapsed, 2),
+            "median_ms": None, "p95_ms": None, "bytes": None,
+            "errors": sum(r["errors"] for r in results.values()),
+        }
+        return results
+
+
+def worker(pages, start_at, seconds, queue):
+    logging.getLogger("civil_app.queries").disabled = True
+    logging.getLogger("django.request").disabled = True
+    connections.close_all()
+
+    # what a browser sends; the production profile answers compressed
+    client = Client(raise_request_exception=False, HTTP_ACCEPT_ENCODING="br, gzip")
+    client.force_login(User.objects.get(username="benchmark"))
+
+    report = {name: {"samples": [], "bytes": 0, "errors": 0} for name, _, _ in pages}
+    time.sleep(max(0, start_at - time.time()))
+    deadline = start_at + seconds
+
+    while time.time() < deadline:
+        for name, url, data in pages:
+            t = time.perf_counter()
+            response = client.get(url, data)
+            elapsed = time.perf_counter() - t
+            r = report[name]
+            if response.status_code >= 400:
+                r["errors"] += 1
+            else:
+                r["samples"].append(elapsed)
+                r["bytes"] = len(response.content)
+
+    report["finished"] = time.time()
+    connections.close_all()
+    queue.put(report)
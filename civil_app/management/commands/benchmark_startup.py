@@ -0,0 +1,98 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+from civil_app import benchmarks
+
+
+# Runs in a fresh interpreter: boot Django the way a worker does, resolve
+# the URLconf, then optionally import extra modules; report time and RSS.
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+
+import django
+django.setup()
+from django.urls import resolve
+resolve("/")
+
+failed = []
+for name in sys.argv[1:]:
+    try:
+        __import__(name)
+    except Exception:
+        failed.append(name)
+
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "rss_kb": rss // 1024 if sys.platform == "darwin" else rss,
+    "modules": len(sys.modules),
+    "pdf_loaded": sorted(m for m in ("weasyprint", "xhtml2pdf") if m in sys.modules),
+    "failed": failed,
+}))
+"""
+
+CASES = [
+    ("boot", []),
+    ("boot+weasyprint", ["weasyprint"]),
+    ("boot+pdf_engines", ["weasyprint", "xhtml2pdf.pisa"]),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker boot (django.setup + URLconf) in fresh interpreters: time, "
+        "peak RSS and whether a PDF engine was loaded. The +weasyprint / +pdf_engines "
+        "cases add what importing the engines eagerly costs every worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--output", help="Result file (default benchmarks/startup-<time>.json).")
+        parser.add_argument("--compare", help="Earlier result file to compare medians against.")
+
+    def handle(self, *args, **opts):
+        env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+
+        results = {}
+        for name, modules in CASES:
+            runs = [self.run_child(modules, env) for _ in range(opts["repeat"])]
+            last = runs[-1]
+            results[name] = {
+                **benchmarks.summarize([r["seconds"] for r in runs]),
+                "rss_mb": round(statistics.median(r["rss_kb"] for r in runs) / 1024, 1),
+                "modules": last["modules"],
+                "pdf_loaded": last["pdf_loaded"],
+                "failed": last["failed"],
+            }
+            r = results[name]
+            note = f"  (import failed: {', '.join(r['failed'])})" if r["failed"] else ""
+            self.stdout.write(
+                f"{name:<28} {r['median_ms']:>10.2f} ms  {r['rss_mb']:>8.1f} MB  "
+                f"{r['modules']:>5} modules  pdf: {', '.join(r['pdf_loaded']) or '-'}{note}"
+            )
+
+        path = benchmarks.write_results(
+            "startup", results, meta={"repeat": opts["repeat"]}, path=opts["output"],
+        )
+        self.stdout.write(f"saved {path}")
+
+        if opts["compare"]:
+            old, new = benchmarks.load_results(opts["compare"]), benchmarks.load_results(path)
+            self.stdout.write(f"{'case':<28} {'before':>10} {'after':>10} {'change':>9}")
+            for key in ("median_ms", "rss_mb"):
+                self.stdout.write(key)
+                for line in benchmarks.compare(old, new, key=key):
+                    self.stdout.write(line)
+
+    def run_child(self, modules, env):
+        out = subprocess.run(
+            [sys.executable, "-c", CHILD, *modules],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        return json.loads(out.strip().splitlines()[-1])
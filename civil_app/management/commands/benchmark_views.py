@@ -0,0 +1,130 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.test import Client
+
+from civil_app import benchmarks
+from civil_app.models import CivilDailyWork, DepartmentWork, MaterialEntry, OtherExpense
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main views against the current database (see generate_scale_data) "
+        "and save the results as JSON. Everything runs in a rolled-back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--warmup", type=int, default=1)
+        parser.add_argument("--days", type=int, default=30, help="Report / bill range length.")
+        parser.add_argument("--only", nargs="*", help="Run only these cases.")
+        parser.add_argument("--cold", action="store_true", help="Clear the cache before every run.")
+        parser.add_argument("--output", help="Result file (default benchmarks/views-<time>.json).")
+        parser.add_argument("--compare", help="Earlier result file to compare medians against.")
+
+    def handle(self, *args, **opts):
+        last_day = CivilDailyWork.objects.aggregate(d=Max("date"))["d"]
+        if not last_day:
+            raise CommandError("No ledger data; run generate_scale_data first.")
+
+        # the N+1 warnings would drown the output; counts are recorded instead
+        logging.getLogger("civil_app.queries").disabled = True
+
+        with transaction.atomic():
+            client = Client(raise_request_exception=False)
+            client.force_login(
+                User.objects.create_superuser("benchmark", "benchmark@example.com", None)
+            )
+
+            cases = self.cases(last_day - timedelta(days=opts["days"] - 1), last_day)
+            if opts["only"]:
+                cases = [c for c in cases if c[0] in opts["only"]]
+
+            results = {}
+            for name, method, url, data in cases:
+                results[name] = self.run_case(client, method, url, data, opts)
+                r = results[name]
+                self.stdout.write(
+                    f"{name:<28} {r['median_ms']:>10.2f} ms  p95 {r['p95_ms']:>10.2f}  "
+                    f"{r['queries']:>5} q  {r['status']}"
+                )
+
+            transaction.set_rollback(True)
+
+        path = benchmarks.write_results(
+            "views", results,
+            meta={
+                "repeat": opts["repeat"], "days": opts["days"], "cold": opts["cold"],
+                "cache": settings.CACHES["default"]["BACKEND"], "last_day": last_day.isoformat(),
+            },
+            path=opts["output"],
+        )
+        self.stdout.write(f"saved {path}")
+
+        if opts["compare"]:
+            self.stdout.write(f"{'case':<28} {'before':>10} {'after':>10} {'change':>9}")
+            for line in benchmarks.compare(benchmarks.load_results(opts["compare"]), benchmarks.load_results(path)):
+                self.stdout.write(line)
+
+    def run_case(self, client, method, url, data, opts):
+        send = client.post if method == "POST" else client.get
+
+        def run():
+            if opts["cold"]:
+                cache.clear()
+            return send(url, data)
+
+        timing, response = benchmarks.measure(run, repeat=opts["repeat"], warmup=opts["warmup"])
+        stats = getattr(response.wsgi_request, "query_stats", None)
+        return {
+            **timing,
+            "method": method,
+            "url": url,
+            "status": response.status_code,
+            "bytes": len(response.content),
+            "queries": stats.count if stats else None,
+            "db_ms": round(stats.db_time * 1000, 2) if stats else None,
+        }
+
+    # =========================================================
+    # CASES
+    # =========================================================
+
+    def busiest(self, qs, field):
+        row = qs.values(field).annotate(n=Count("id")).order_by("-n").first()
+        return row[field] if row else 0
+
+    def cases(self, from_date, to_date):
+        window = {"from_date": from_date.isoformat(), "to_date": to_date.isoformat()}
+        in_range = {"date__range": [from_date, to_date]}
+
+        site_id = self.busiest(CivilDailyWork.objects.filter(**in_range), "site_id")
+        team_id = self.busiest(CivilDailyWork.objects.filter(**in_range), "team_id")
+        dept_id = self.busiest(DepartmentWork.objects.filter(**in_range), "department_id")
+        agent_id = self.busiest(MaterialEntry.objects.filter(**in_range), "agent_id")
+        category_id = self.busiest(OtherExpense.objects.filter(**in_range), "category_id")
+
+        day = {"date": to_date.isoformat()}
+
+        return [
+            ("dashboard_week", "GET", "/", {"range": "week"}),
+            ("dashboard_month", "GET", "/", {"range": "month"}),
+            ("site_entry", "GET", "/sites/", None),
+            ("site_detail_get", "GET", f"/site/{site_id}/", day),
+            ("site_detail_post", "POST", f"/site/{site_id}/", benchmarks.site_day_form(site_id, to_date)),
+            ("reports", "GET", "/reports/", window),
+            ("all_bills", "GET", "/bills/", window),
+            ("all_bills_pdf", "GET", "/bills/all/pdf/", window),
+            ("api_bill_details", "GET", "/api/bills/details/", window),
+            ("api_day_full_detail", "GET", "/api/day-full/", window),
+            ("bill_civil_detail", "GET", f"/api/bill/civil/{team_id}/", window),
+            ("bill_department_detail", "GET", f"/api/bill/department/{dept_id}/", window),
+            ("bill_material_detail", "GET", f"/api/bill/material/{agent_id}/", window),
+            ("api_bill_expense", "GET", f"/api/bill/expense/{category_id}/", window),
+        ]
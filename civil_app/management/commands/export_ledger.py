@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from civil_app.ledger_archive import export
+
+
+class Command(BaseCommand):
+    help = (
+        "Write every master and ledger table to a compressed columnar .npz archive "
+        "(ids and foreign keys kept); load it elsewhere with restore_ledger."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Archive to write, e.g. ledger.npz.")
+
+    def handle(self, *args, **opts):
+        counts = export(opts["path"])
+        for table, n in counts.items():
+            self.stdout.write(f"{table}: {n}")
+        self.stdout.write(f"saved {opts['path']}")
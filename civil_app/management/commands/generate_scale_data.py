@@ -0,0 +1,253 @@
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from civil_app import ledger_cache, payables, search
+from civil_app.models import (
+    Agent, CivilAdvance, CivilDailyWork, DefaultRate, Department, DepartmentWork,
+    ExpenseCategory, MaterialEntry, MaterialItem, OtherExpense, Owner,
+    OwnerCashEntry, OwnerCashSnapshot, Site, Team, TeamRate, normalize_key,
+)
+from civil_app.signals import DEFAULT_DEPARTMENTS
+
+
+PREFIX = "Scale"
+BATCH = 5000
+
+MATERIALS = [
+    ("Cement", "bag", 380, 450), ("Sand", "unit", 2500, 4000),
+    ("Steel", "kg", 60, 80), ("Bricks", "nos", 7, 11),
+    ("Jelly", "unit", 2800, 3600), ("Tiles", "sqft", 35, 90),
+    ("PVC Pipe", "nos", 150, 600), ("Wire", "coil", 1200, 2600),
+    ("Paint", "ltr", 250, 520), ("Plywood", "sheet", 900, 2200),
+]
+EXPENSES = ["Tea", "Transport", "Water", "Tools", "Food", "Rent", "Electricity", "Diesel"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate deterministic site / team / ledger data for benchmarking. "
+        "Rows are inserted with bulk_create (signals do not fire); payables and "
+        "the search index are rebuilt and cached computations invalidated afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sites", type=int, default=100)
+        parser.add_argument("--teams", type=int, default=30)
+        parser.add_argument("--days", type=int, default=3 * 365)
+        parser.add_argument("--teams-per-site", type=int, default=3)
+        parser.add_argument("--owners", type=int, default=5)
+        parser.add_argument("--agents", type=int, default=40)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--end", type=date.fromisoformat, default=None,
+            help="Last generated day (YYYY-MM-DD); defaults to today.",
+        )
+        parser.add_argument(
+            "--flush", action="store_true",
+            help="Delete previously generated data first.",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["teams_per_site"] > opts["teams"]:
+            raise CommandError("--teams-per-site cannot exceed --teams")
+
+        if opts["flush"]:
+            self.flush()
+        elif Site.objects.filter(name__startswith=f"{PREFIX} Site").exists():
+            raise CommandError("Generated data already exists; pass --flush to replace it.")
+
+        rng = random.Random(opts["seed"])
+        end = opts["end"] or date.today()
+        start = end - timedelta(days=opts["days"] - 1)
+
+        with transaction.atomic():
+            masters = self.create_masters(rng, opts, start)
+            counts = self.create_ledger(rng, opts, masters, start, end)
+
+        counts["payables"] = payables.rebuild()
+        counts["search"] = search.rebuild()
+        ledger_cache.invalidate_all()
+
+        for name, n in counts.items():
+            self.stdout.write(f"{name}: {n}")
+
+    # =========================================================
+    # MASTERS
+    # =========================================================
+
+    def create_masters(self, rng, opts, start):
+        for name in DEFAULT_DEPARTMENTS:
+            Department.objects.get_or_create(name=name)
+
+        departments = list(Department.objects.exclude(name="Civil").order_by("name"))
+        rates = {}
+        for dept in departments:
+            # always draw, so the stream does not depend on existing rates
+            rates[dept.id] = rng.randrange(600, 1200, 50)
+            rate, _ = DefaultRate.objects.get_or_create(department=dept)
+            if not rate.full_day_rate:
+                rate.full_day_rate = rates[dept.id]
+                rate.save(update_fields=["full_day_rate"])
+
+        teams = Team.objects.bulk_create([
+            Team(name=f"{PREFIX} Team {i + 1:03d}") for i in range(opts["teams"])
+        ])
+        team_rates = {}
+        for team in teams:
+            mason = rng.randrange(700, 1100, 50)
+            helper = rng.randrange(450, 750, 50)
+            team_rates[team.id] = (mason, helper)
+        TeamRate.objects.bulk_create([
+            TeamRate(
+                team_id=team_id, mason_full_rate=mason, helper_full_rate=helper,
+                from_date=start, is_locked=True,
+            )
+            for team_id, (mason, helper) in team_rates.items()
+        ])
+
+        sites = Site.objects.bulk_create([
+            Site(name=f"{PREFIX} Site {i + 1:03d}") for i in range(opts["sites"])
+        ])
+        owners = Owner.objects.bulk_create([
+            Owner(name=f"{PREFIX} Owner {i + 1}") for i in range(opts["owners"])
+        ])
+
+        def master(model, names, **extra):
+            model.objects.bulk_create(
+                [model(name=n, key=normalize_key(n), **extra.get(n, {})) for n in names],
+                ignore_conflicts=True,
+            )
+            return list(model.objects.filter(key__in=[normalize_key(n) for n in names]))
+
+        agents = master(Agent, [f"{PREFIX} Agent {i + 1:02d}" for i in range(opts["agents"])])
+        items = master(
+            MaterialItem,
+            [f"{PREFIX} {m[0]}" for m in MATERIALS],
+            **{f"{PREFIX} {m[0]}": {"unit": m[1]} for m in MATERIALS},
+        )
+        prices = {normalize_key(f"{PREFIX} {m[0]}"): m for m in MATERIALS}
+        items = [(item, prices[item.key]) for item in items]
+        categories = master(ExpenseCategory, [f"{PREFIX} {e}" for e in EXPENSES])
+
+        return {
+            "departments": departments, "dept_rates": rates,
+            "teams": teams, "team_rates": team_rates,
+            "sites": sites, "owners": owners,
+            "agents": agents, "items": items, "categories": categories,
+        }
+
+    # =========================================================
+    # LEDGER
+    # =========================================================
+
+    def create_ledger(self, rng, opts, m, start, end):
+        counts = dict.fromkeys(
+            ["civil", "advances", "department", "material", "expense", "owner_cash"], 0
+        )
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+        for site in m["sites"]:
+            site_teams = rng.sample(m["teams"], opts["teams_per_site"])
+            site_depts = rng.sample(m["departments"], min(2, len(m["departments"])))
+            site_agents = rng.sample(m["agents"], min(4, len(m["agents"])))
+            rows = {key: [] for key in counts}
+
+            for day in days:
+                # Sundays off, plus the odd idle day
+                if day.weekday() == 6 or rng.random() < 0.1:
+                    continue
+
+                for team in site_teams:
+                    mf, hf = rng.randint(1, 6), rng.randint(1, 8)
+                    mh, hh = rng.randint(0, 1), rng.randint(0, 2)
+                    mason, helper = m["team_rates"][team.id]
+                    labour = mf * mason + hf * helper + mh * mason / 2 + hh * helper / 2
+                    adv = rng.choice([500, 1000, 2000]) if rng.random() < 0.1 else 0
+                    if adv:
+                        rows["advances"].append(CivilAdvance(
+                            site=site, team=team, date=day, amount=adv,
+                        ))
+                    rows["civil"].append(CivilDailyWork(
+                        site=site, team=team, date=day,
+                        mason_full=mf, helper_full=hf, mason_half=mh, helper_half=hh,
+                        labour_amount=labour, total_amount=labour - adv,
+                    ))
+
+                for dept in site_depts:
+                    if rng.random() < 0.4:
+                        continue
+                    full, half = rng.randint(1, 4), rng.randint(0, 1)
+                    rate = m["dept_rates"][dept.id]
+                    labour = full * rate + half * rate / 2
+                    adv = rng.choice([300, 500]) if rng.random() < 0.05 else 0
+                    rows["department"].append(DepartmentWork(
+                        site=site, department=dept, date=day,
+                        full_day_count=full, half_day_count=half,
+                        full_day_rate=rate, half_day_rate=rate // 2,
+                        labour_amount=labour, advance_amount=adv, total_amount=labour - adv,
+                    ))
+
+                for _ in range(rng.choices([0, 1, 2], weights=[6, 3, 1])[0]):
+                    item, (_, unit, low, high) = rng.choice(m["items"])
+                    qty = rng.randint(1, 50)
+                    rate = rng.randint(low, high)
+                    rows["material"].append(MaterialEntry(
+                        site=site, date=day,
+                        agent=rng.choice(site_agents) if rng.random() < 0.95 else None,
+                        item=item, quantity=qty, unit=unit, rate=rate, total=qty * rate,
+                        advance=rng.choice([0, 0, 0, 1000]),
+                    ))
+
+                for _ in range(rng.choices([0, 1, 2], weights=[5, 4, 1])[0]):
+                    rows["expense"].append(OtherExpense(
+                        site=site, date=day,
+                        owner=rng.choice(m["owners"]) if m["owners"] and rng.random() < 0.7 else None,
+                        category=rng.choice(m["categories"]),
+                        amount=rng.randrange(50, 3000, 10),
+                    ))
+
+            self.insert(rows, counts)
+
+        cash = [
+            OwnerCashEntry(owner=owner, date=day, amount=rng.randrange(20000, 80000, 1000))
+            for day in days if day.weekday() == 0
+            for owner in m["owners"]
+        ]
+        self.insert({"owner_cash": cash}, counts)
+        return counts
+
+    MODELS = {
+        "civil": CivilDailyWork, "advances": CivilAdvance, "department": DepartmentWork,
+        "material": MaterialEntry, "expense": OtherExpense, "owner_cash": OwnerCashEntry,
+    }
+
+    def insert(self, rows, counts):
+        for key, objs in rows.items():
+            self.MODELS[key].objects.bulk_create(objs, batch_size=BATCH)
+            counts[key] += len(objs)
+
+    # =========================================================
+    # FLUSH
+    # =========================================================
+
+    def flush(self):
+        # cascaded deletes notify the cache per row; bump the tags once instead
+        with ledger_cache.batch(), transaction.atomic():
+            owners = Owner.objects.filter(name__startswith=f"{PREFIX} Owner")
+            OwnerCashSnapshot.objects.filter(owner__in=owners).delete()
+            OwnerCashEntry.objects.filter(owner__in=owners).delete()
+            # cascades every ledger row on those sites
+            Site.objects.filter(name__startswith=f"{PREFIX} Site").delete()
+            Team.objects.filter(name__startswith=f"{PREFIX} Team").delete()
+            owners.delete()
+
+            prefix = normalize_key(PREFIX) + " "
+            for model in (Agent, MaterialItem, ExpenseCategory):
+                model.objects.filter(key__startswith=prefix).delete()
+
+        payables.rebuild()
+        search.rebuild()
+        ledger_cache.invalidate_all()
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from civil_app.day_import import CHUNK, KINDS, SheetError, import_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a CSV of historical civil counts, department counts, materials or "
+        "expenses into the ledger (see civil_app.day_import for the columns). "
+        "Bad rows are reported and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=KINDS)
+        parser.add_argument("path", help="CSV file (UTF-8, header row first).")
+        parser.add_argument("--chunk", type=int, default=CHUNK, help="Rows per bulk insert.")
+
+    def handle(self, *args, **opts):
+        def report(line, error):
+            self.stderr.write(f"line {line}: {error}")
+
+        try:
+            with open(opts["path"], newline="", encoding="utf-8-sig") as f:
+                result = import_csv(opts["kind"], f, chunk_size=opts["chunk"], on_error=report)
+        except SheetError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"{result.rows} row(s) read, {result.written} written, {result.error_count} error(s)"
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from civil_app.payables import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute every outstanding payable from the ledger and bill payments."
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(f"{count} payable(s) rebuilt")
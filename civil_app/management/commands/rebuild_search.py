@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from civil_app.search import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recreate the search index from every material entry, expense and daily note."
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(f"{count} search entries indexed")
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from civil_app.labour_recompute import Recompute
+
+
+class Command(BaseCommand):
+    help = (
+        "Reprice stored civil / department wages with the current team and department "
+        "rates. Shows the diff only; pass --apply to write it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=["civil", "department"])
+        parser.add_argument("--id", type=int, help="One team (civil) or department; default all.")
+        parser.add_argument("--since", type=date.fromisoformat, help="Only days on or after YYYY-MM-DD.")
+        parser.add_argument(
+            "--old-rate", type=int,
+            help="Department (required): reprice just the rows entered at this full-day rate.",
+        )
+        parser.add_argument("--show", type=int, default=20, help="Diff rows to print.")
+        parser.add_argument("--apply", action="store_true")
+
+    def handle(self, *args, **opts):
+        if opts["kind"] == "civil":
+            recompute = Recompute.for_teams(opts["id"], since=opts["since"])
+        elif opts["old_rate"]:
+            recompute = Recompute.for_departments(opts["old_rate"], department_id=opts["id"], since=opts["since"])
+        else:
+            raise CommandError("department needs --old-rate: the full-day rate the days were entered at")
+
+        if opts["apply"]:
+            self.stdout.write(f"{recompute.apply()} row(s) repriced")
+            return
+
+        diff = recompute.preview(limit=opts["show"])
+        for r in diff["sample"]:
+            self.stdout.write(
+                f"#{r['id']:<8} {r['date']}  site {r['site_id']:<5} {diff['kind']} {r[diff['kind']]:<5} "
+                f"labour {r['labour']:>10} -> {r['new_labour']:<10} total {r['total']:>10} -> {r['new_total']}"
+            )
+        self.stdout.write(
+            f"{diff['rows']} row(s) would change, labour {diff['labour_change']:+}; "
+            "run again with --apply to write"
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from civil_app.ledger_archive import ArchiveError, restore
+
+
+class Command(BaseCommand):
+    help = (
+        "Load an export_ledger archive with bulk inserts, keeping ids and foreign keys, "
+        "then rebuild payables and the search index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Archive written by export_ledger.")
+        parser.add_argument(
+            "--flush", action="store_true",
+            help="Delete every master and ledger row first.",
+        )
+
+    def handle(self, *args, **opts):
+        try:
+            counts = restore(opts["path"], flush=opts["flush"])
+        except ArchiveError as e:
+            raise CommandError(str(e))
+        for name, n in counts.items():
+            self.stdout.write(f"{name}: {n}")
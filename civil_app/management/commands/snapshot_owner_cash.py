@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from civil_app.models import Owner
+from civil_app.owner_cash import close_months
+
+
+class Command(BaseCommand):
+    help = "Write monthly closing-balance snapshots for every owner's cash ledger."
+
+    def handle(self, *args, **options):
+        for owner in Owner.objects.all():
+            created = close_months(owner.id)
+            self.stdout.write(f"{owner.name}: {len(created)} month(s) closed")
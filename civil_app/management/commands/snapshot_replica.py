@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from civil_app.db_router import REPLICA, snapshot_sqlite
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the local SQLite read replica (SQLITE_REPLICA=1) from the primary "
+        "database file. With --interval, keep refreshing until interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Seconds between snapshots.")
+
+    def handle(self, *args, **opts):
+        if REPLICA not in settings.DATABASES:
+            raise CommandError("No replica database configured; set SQLITE_REPLICA=1.")
+
+        primary, replica = settings.DATABASES["default"], settings.DATABASES[REPLICA]
+        if not (primary["ENGINE"].endswith("sqlite3") and replica["ENGINE"].endswith("sqlite3")):
+            raise CommandError("Only SQLite replicas are snapshotted; others are kept in sync by the server.")
+
+        while True:
+            start = time.perf_counter()
+            snapshot_sqlite(primary["NAME"], replica["NAME"])
+            self.stdout.write(
+                f"{replica['NAME']} refreshed in {(time.perf_counter() - start) * 1000:.0f} ms"
+            )
+            if not opts["interval"]:
+                break
+            time.sleep(opts["interval"])
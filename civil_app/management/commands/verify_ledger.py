@@ -0,0 +1,57 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from civil_app import ledger_verify
+from civil_app.models import Agent, Department, Site, Team
+
+
+PARTY_MODELS = {"civil": Team, "department": Department, "material": Agent}
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute stored civil / department wages and material totals from their "
+        "counts and rates and report every mismatch by site, date and team; "
+        "--fix writes the expected values."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", action="append", choices=ledger_verify.KINDS,
+                            help="Check only this kind (repeatable); default all.")
+        parser.add_argument("--show", type=int, default=50, help="Mismatches to list per kind.")
+        parser.add_argument("--fix", action="store_true")
+
+    def handle(self, *args, **opts):
+        sites = dict(Site.objects.values_list("id", "name"))
+        total = 0
+        for kind in opts["kind"] or ledger_verify.KINDS:
+            check = ledger_verify.CHECKS[kind]()
+            found = ledger_verify.mismatches(check)
+            parties = dict(PARTY_MODELS[kind].objects.values_list("id", "name"))
+            unpriced = int((~check.checked).sum())
+
+            self.stdout.write(
+                f"{kind}: {len(check.id)} row(s), {int(check.bad.sum())} with mismatches"
+                + (f", {unpriced} without a rate" if unpriced else "")
+            )
+            for m in found[:opts["show"]]:
+                self.stdout.write(
+                    f"  {sites.get(m['site_id'], m['site_id'])} {m['date']} "
+                    f"{parties.get(m['party'], '-')} #{m['id']} {m['field']}: "
+                    f"{m['stored']:g} -> {m['expected']:g}"
+                )
+            if len(found) > opts["show"]:
+                self.stdout.write(f"  ... {len(found) - opts['show']} more")
+            if found:
+                by_site = Counter(sites.get(m["site_id"], m["site_id"]) for m in found)
+                by_party = Counter(parties.get(m["party"], "-") for m in found)
+                self.stdout.write("  by site: " + ", ".join(f"{k} {n}" for k, n in by_site.most_common(10)))
+                self.stdout.write("  by party: " + ", ".join(f"{k} {n}" for k, n in by_party.most_common(10)))
+
+            if opts["fix"] and found:
+                self.stdout.write(f"  fixed {ledger_verify.fix(check)} row(s)")
+            total += len(found)
+
+        if total and not opts["fix"]:
+            self.stdout.write("run again with --fix to write the expected values")
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civil_app', '0032_civildailywork_allowance_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='civiladvance',
+            index=models.Index(fields=['date', 'team', 'amount'], name='cadv_date_team_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='civiladvance',
+            index=models.Index(fields=['team', 'date'], name='cadv_team_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='civildailywork',
+            index=models.Index(fields=['date', 'team', 'total_amount'], name='cdw_date_team_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='civildailywork',
+            index=models.Index(fields=['team', 'date'], name='cdw_team_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='departmentwork',
+            index=models.Index(fields=['date', 'department'], name='dw_date_dept_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='departmentwork',
+            index=models.Index(fields=['department', 'date'], name='dw_dept_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialentry',
+            index=models.Index(fields=['date', 'agent_name'], name='mat_date_agent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialentry',
+            index=models.Index(fields=['agent_name', 'date'], name='mat_agent_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialentry',
+            index=models.Index(fields=['site', 'date'], name='mat_site_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otherexpense',
+            index=models.Index(fields=['date', 'title'], name='exp_date_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otherexpense',
+            index=models.Index(fields=['title', 'date'], name='exp_title_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otherexpense',
+            index=models.Index(fields=['site', 'date'], name='exp_site_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otherexpense',
+            index=models.Index(fields=['owner', 'amount'], name='exp_owner_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ownercashentry',
+            index=models.Index(fields=['owner', 'date', 'amount'], name='ocash_owner_date_amt_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ownercashentry',
+            index=models.Index(fields=['date'], name='ocash_date_idx'),
+        ),
+    ]
@@ -0,0 +1,124 @@
+from collections import Counter, defaultdict
+
+from django.db import migrations
+
+
+def normalize_key(value):
+    # keep in step with civil_app.models.normalize_key
+    return " ".join((value or "").split()).casefold()
+
+
+def build_master(Master, values, extra=None):
+    """Create one master row per normalized key, named after its most used spelling.
+
+    Returns {raw string: master id}.
+    """
+    spellings = defaultdict(Counter)
+
+    for value, count in values:
+        key = normalize_key(value)
+        if key:
+            spellings[key][" ".join(value.split())] += count
+
+    Master.objects.bulk_create([
+        Master(
+            key=key,
+            name=counter.most_common(1)[0][0],
+            **(extra or {}).get(key, {}),
+        )
+        for key, counter in spellings.items()
+    ])
+    ids = dict(Master.objects.values_list("key", "id"))
+
+    return {
+        value: ids[normalize_key(value)]
+        for value, _count in values
+        if normalize_key(value)
+    }
+
+
+def forwards(apps, schema_editor):
+    from django.db.models import Count
+
+    MaterialEntry = apps.get_model("civil_app", "MaterialEntry")
+    OtherExpense = apps.get_model("civil_app", "OtherExpense")
+    Agent = apps.get_model("civil_app", "Agent")
+    MaterialItem = apps.get_model("civil_app", "MaterialItem")
+    ExpenseCategory = apps.get_model("civil_app", "ExpenseCategory")
+
+    # ================= AGENTS =================
+    agent_values = [
+        (r["agent_name"], r["n"])
+        for r in MaterialEntry.objects.values("agent_name").annotate(n=Count("id"))
+    ]
+    for value, agent_id in build_master(Agent, agent_values).items():
+        MaterialEntry.objects.filter(agent_name=value).update(agent_id=agent_id)
+
+    # ================= MATERIAL ITEMS =================
+    item_values = [
+        (r["name"], r["n"])
+        for r in MaterialEntry.objects.values("name").annotate(n=Count("id"))
+    ]
+
+    # most used unit per item as its default
+    unit_counts = defaultdict(Counter)
+    for r in MaterialEntry.objects.values("name", "unit").annotate(n=Count("id")):
+        if r["unit"]:
+            unit_counts[normalize_key(r["name"])][r["unit"].strip()] += r["n"]
+
+    units = {
+        key: {"unit": counter.most_common(1)[0][0]}
+        for key, counter in unit_counts.items()
+    }
+
+    # entries with a blank name still need an item
+    if any(not normalize_key(value) for value, _count in item_values):
+        item_values.append(("Unknown", 0))
+
+    item_map = build_master(MaterialItem, item_values, units)
+    unknown_id = item_map.get("Unknown")
+
+    for value, _count in item_values:
+        item_id = item_map.get(value, unknown_id)
+        MaterialEntry.objects.filter(name=value).update(item_id=item_id)
+
+    # ================= EXPENSE CATEGORIES =================
+    title_values = [
+        (r["title"], r["n"])
+        for r in OtherExpense.objects.values("title").annotate(n=Count("id"))
+    ]
+
+    if any(not normalize_key(value) for value, _count in title_values):
+        title_values.append(("Unknown", 0))
+
+    category_map = build_master(ExpenseCategory, title_values)
+    unknown_id = category_map.get("Unknown")
+
+    for value, _count in title_values:
+        category_id = category_map.get(value, unknown_id)
+        OtherExpense.objects.filter(title=value).update(category_id=category_id)
+
+
+def backwards(apps, schema_editor):
+    MaterialEntry = apps.get_model("civil_app", "MaterialEntry")
+    OtherExpense = apps.get_model("civil_app", "OtherExpense")
+
+    for m in MaterialEntry.objects.select_related("agent", "item"):
+        m.agent_name = m.agent.name if m.agent else ""
+        m.name = m.item.name if m.item else ""
+        m.save(update_fields=["agent_name", "name"])
+
+    for e in OtherExpense.objects.select_related("category"):
+        e.title = e.category.name if e.category else ""
+        e.save(update_fields=["title"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civil_app', '0034_agent_materialitem_expensecategory'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,82 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civil_app', '0035_normalize_masters'),
+    ]
+
+    operations = [
+        # defaults only so the removals below can be reversed
+        migrations.AlterField(
+            model_name='materialentry',
+            name='agent_name',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='materialentry',
+            name='name',
+            field=models.CharField(default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='otherexpense',
+            name='title',
+            field=models.CharField(default='', max_length=150),
+        ),
+        migrations.RemoveIndex(
+            model_name='materialentry',
+            name='mat_date_agent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='materialentry',
+            name='mat_agent_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='otherexpense',
+            name='exp_date_title_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='otherexpense',
+            name='exp_title_date_idx',
+        ),
+        migrations.RemoveField(
+            model_name='materialentry',
+            name='agent_name',
+        ),
+        migrations.RemoveField(
+            model_name='materialentry',
+            name='name',
+        ),
+        migrations.RemoveField(
+            model_name='otherexpense',
+            name='title',
+        ),
+        migrations.AlterField(
+            model_name='materialentry',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='civil_app.materialitem'),
+        ),
+        migrations.AlterField(
+            model_name='otherexpense',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='civil_app.expensecategory'),
+        ),
+        migrations.AddIndex(
+            model_name='materialentry',
+            index=models.Index(fields=['date', 'agent'], name='mat_date_agent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialentry',
+            index=models.Index(fields=['agent', 'date'], name='mat_agent_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otherexpense',
+            index=models.Index(fields=['date', 'category'], name='exp_date_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otherexpense',
+            index=models.Index(fields=['category', 'date'], name='exp_category_date_idx'),
+        ),
+    ]
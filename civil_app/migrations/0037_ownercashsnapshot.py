@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civil_app', '0036_remove_free_text_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerCashSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('total_in', models.FloatField(default=0)),
+                ('total_out', models.FloatField(default=0)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='civil_app.owner')),
+            ],
+            options={
+                'unique_together': {('owner', 'month')},
+            },
+        ),
+    ]
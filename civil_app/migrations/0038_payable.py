@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:41
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def backfill(apps, schema_editor):
+    Payable = apps.get_model("civil_app", "Payable")
+    BillPayment = apps.get_model("civil_app", "BillPayment")
+
+    totals = {}
+
+    def add(kind, rows, field):
+        for ref_id, amount in rows:
+            if ref_id is not None:
+                entry = totals.setdefault((kind, ref_id), {"billed": 0, "paid": 0})
+                entry[field] += amount or 0
+
+    def grouped(model, key, value):
+        Model = apps.get_model("civil_app", model)
+        return Model.objects.values_list(key).annotate(s=Sum(value)).values_list(key, "s")
+
+    add("team", grouped("CivilDailyWork", "team_id", "total_amount"), "billed")
+    add("department", grouped("DepartmentWork", "department_id", "total_amount"), "billed")
+    add("agent", grouped("MaterialEntry", "agent_id", F("total") - F("advance")), "billed")
+    add("expense", grouped("OtherExpense", "category_id", "amount"), "billed")
+
+    for bill_type, reference, amount in (
+        BillPayment.objects.values_list("bill_type", "reference")
+        .annotate(s=Sum("amount")).values_list("bill_type", "reference", "s")
+    ):
+        if str(reference).isdigit():
+            add(bill_type, [(int(reference), amount)], "paid")
+
+    Payable.objects.bulk_create([
+        Payable(kind=kind, ref_id=ref_id, **values)
+        for (kind, ref_id), values in totals.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civil_app', '0037_ownercashsnapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='billpayment',
+            name='bill_type',
+            field=models.CharField(choices=[('team', 'Team'), ('department', 'Department'), ('agent', 'Agent'), ('expense', 'Expense')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='Payable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('team', 'Team'), ('department', 'Department'), ('agent', 'Agent'), ('expense', 'Expense')], max_length=20)),
+                ('ref_id', models.BigIntegerField()),
+                ('billed', models.FloatField(default=0)),
+                ('paid', models.FloatField(default=0)),
+            ],
+            options={
+                'unique_together': {('kind', 'ref_id')},
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
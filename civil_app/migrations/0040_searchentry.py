@@ -0,0 +1,99 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+FTS_SQL = [
+    """CREATE VIRTUAL TABLE civil_app_searchentry_fts USING fts5(
+        body, content='civil_app_searchentry', content_rowid='id',
+        prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER civil_app_searchentry_ai AFTER INSERT ON civil_app_searchentry BEGIN
+        INSERT INTO civil_app_searchentry_fts(rowid, body) VALUES (new.id, new.body);
+    END""",
+    """CREATE TRIGGER civil_app_searchentry_ad AFTER DELETE ON civil_app_searchentry BEGIN
+        INSERT INTO civil_app_searchentry_fts(civil_app_searchentry_fts, rowid, body)
+        VALUES ('delete', old.id, old.body);
+    END""",
+    """CREATE TRIGGER civil_app_searchentry_au AFTER UPDATE ON civil_app_searchentry BEGIN
+        INSERT INTO civil_app_searchentry_fts(civil_app_searchentry_fts, rowid, body)
+        VALUES ('delete', old.id, old.body);
+        INSERT INTO civil_app_searchentry_fts(rowid, body) VALUES (new.id, new.body);
+    END""",
+]
+FTS_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS civil_app_searchentry_au",
+    "DROP TRIGGER IF EXISTS civil_app_searchentry_ad",
+    "DROP TRIGGER IF EXISTS civil_app_searchentry_ai",
+    "DROP TABLE IF EXISTS civil_app_searchentry_fts",
+]
+TSVECTOR_SQL = [
+    "CREATE INDEX search_body_tsv_idx ON civil_app_searchentry "
+    "USING gin (to_tsvector('simple', body))",
+]
+TSVECTOR_DROP_SQL = ["DROP INDEX IF EXISTS search_body_tsv_idx"]
+
+
+def create_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {"sqlite": FTS_SQL, "postgresql": TSVECTOR_SQL}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {"sqlite": FTS_DROP_SQL, "postgresql": TSVECTOR_DROP_SQL}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def backfill(apps, schema_editor):
+    SearchEntry = apps.get_model("civil_app", "SearchEntry")
+    MaterialEntry = apps.get_model("civil_app", "MaterialEntry")
+    OtherExpense = apps.get_model("civil_app", "OtherExpense")
+    SiteDailyNote = apps.get_model("civil_app", "SiteDailyNote")
+
+    def entries(kind, rows, text):
+        for row in rows.iterator(chunk_size=2000):
+            body = " ".join(text(row).split())
+            if body:
+                yield SearchEntry(kind=kind, ref_id=row.pk, site_id=row.site_id, date=row.date, body=body)
+
+    SearchEntry.objects.bulk_create(entries(
+        "material", MaterialEntry.objects.select_related("agent", "item"),
+        lambda m: f"{m.item.name} {m.quantity or 0:g} {m.unit} {m.agent.name if m.agent_id else ''}",
+    ), batch_size=2000)
+    SearchEntry.objects.bulk_create(entries(
+        "expense", OtherExpense.objects.select_related("category"),
+        lambda e: f"{e.category.name} {e.notes}",
+    ), batch_size=2000)
+    SearchEntry.objects.bulk_create(entries(
+        "note", SiteDailyNote.objects.all(), lambda n: n.description,
+    ), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civil_app', '0039_cachetag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('material', 'Material'), ('expense', 'Expense'), ('note', 'Daily note')], max_length=20)),
+                ('ref_id', models.BigIntegerField()),
+                ('date', models.DateField()),
+                ('body', models.TextField()),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='civil_app.site')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['site', 'date'], name='search_site_date_idx')],
+                'unique_together': {('kind', 'ref_id')},
+            },
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civil_app', '0040_searchentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('civil', 'Civil work'), ('advance', 'Civil advance'), ('department', 'Department work'), ('material', 'Material'), ('expense', 'Expense'), ('note', 'Daily note'), ('owner_cash', 'Owner cash')], max_length=20)),
+                ('row_id', models.BigIntegerField()),
+                ('op', models.CharField(choices=[('i', 'Insert'), ('u', 'Update'), ('d', 'Delete')], max_length=1)),
+                ('site_id', models.BigIntegerField(null=True)),
+                ('date', models.DateField(null=True)),
+                ('at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
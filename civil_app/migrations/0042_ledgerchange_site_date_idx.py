@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civil_app', '0041_ledgerchange'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ledgerchange',
+            index=models.Index(fields=['site_id', 'date'], name='ledgerchange_site_date_idx'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 # ---------- SITE ----------
@@ -49,6 +50,15 @@ class TeamRate(models.Model):
     def helper_half_rate(self):
         return self.helper_full_rate // 2
 
+    def labour(self, mf, hf, mh, hh):
+        """Wages for a day's mason / helper full and half counts."""
+        return (
+            mf * self.mason_full_rate +
+            hf * self.helper_full_rate +
+            mh * (self.mason_full_rate / 2) +
+            hh * (self.helper_full_rate / 2)
+        )
+
     def __str__(self):
         return self.team.name
 
@@ -73,6 +83,12 @@ class CivilDailyWork(models.Model):
 
     class Meta:
         unique_together = ("site", "team", "date")
+        indexes = [
+            # all_bills / reports: date range, grouped by team, summing totals
+            models.Index(fields=["date", "team", "total_amount"], name="cdw_date_team_total_idx"),
+            # bill_civil_*: one team over a date range
+            models.Index(fields=["team", "date"], name="cdw_team_date_idx"),
+        ]
 
 # ---------- OTHER DEPARTMENT WORK ----------
 class DepartmentWork(models.Model):
@@ -93,6 +109,11 @@ class DepartmentWork(models.Model):
 
     class Meta:
         unique_together = ("site", "department", "date")
+        indexes = [
+            models.Index(fields=["date", "department"], name="dw_date_dept_idx"),
+            # bill_department_*: one department over a date range
+            models.Index(fields=["department", "date"], name="dw_dept_date_idx"),
+        ]
 
 # ---------- DEFAULT RATE (PER SITE + DEPARTMENT) ----------
 class DefaultRate(models.Model):
@@ -114,27 +135,106 @@ class CivilAdvance(models.Model):
 
     class Meta:
         unique_together = ("site", "team", "date")
+        indexes = [
+            models.Index(fields=["date", "team", "amount"], name="cadv_date_team_amount_idx"),
+            models.Index(fields=["team", "date"], name="cadv_team_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.site} - {self.team} - {self.date}"
 
+# ---------- NAMED MASTERS (AGENT / MATERIAL / EXPENSE) ----------
+def normalize_key(value):
+    """Lookup key for typed names: trimmed, single-spaced, case-folded."""
+    return " ".join((value or "").split()).casefold()
+
+
+class NamedMaster(models.Model):
+    name = models.CharField(max_length=150)
+    key = models.CharField(max_length=150, unique=True)
+
+    class Meta:
+        abstract = True
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def resolve(cls, value, **defaults):
+        """Get or create the row for a typed name; blank names resolve to None."""
+        key = normalize_key(value)
+        if not key:
+            return None
+        obj, _ = cls.objects.get_or_create(
+            key=key,
+            defaults={"name": " ".join(value.split()), **defaults},
+        )
+        return obj
+
+
+class Agent(NamedMaster):
+    pass
+
+
+class MaterialItem(NamedMaster):
+    # last unit typed for this item, offered as the default
+    unit = models.CharField(max_length=20, blank=True)
+
+
+class ExpenseCategory(NamedMaster):
+
+    class Meta(NamedMaster.Meta):
+        verbose_name_plural = "expense categories"
+
+
 class MaterialEntry(models.Model):
     site = models.ForeignKey(Site, on_delete=models.CASCADE)
     date = models.DateField()
-    agent_name = models.CharField(max_length=100)
-    name = models.CharField(max_length=100)
+    agent = models.ForeignKey(Agent, on_delete=models.PROTECT, null=True, blank=True)
+    item = models.ForeignKey(MaterialItem, on_delete=models.PROTECT)
     quantity = models.FloatField()
     unit = models.CharField(max_length=20)
     rate = models.FloatField()
     total = models.FloatField()
     advance = models.FloatField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "agent"], name="mat_date_agent_idx"),
+            # bill_material_*: one agent over a date range
+            models.Index(fields=["agent", "date"], name="mat_agent_date_idx"),
+            # site_detail load / delete of one day
+            models.Index(fields=["site", "date"], name="mat_site_date_idx"),
+        ]
+
+PAYABLE_KINDS = [
+    ("team", "Team"),
+    ("department", "Department"),
+    ("agent", "Agent"),
+    ("expense", "Expense"),
+]
+
 class BillPayment(models.Model):
-    bill_type = models.CharField(max_length=20)  # team / agent
-    reference = models.CharField(max_length=100)
+    bill_type = models.CharField(max_length=20, choices=PAYABLE_KINDS)
+    reference = models.CharField(max_length=100)  # id of the team / department / agent / category
     amount = models.FloatField()
     paid_on = models.DateField(auto_now_add=True)
 
+class Payable(models.Model):
+    """Running billed / paid totals for one bill, kept current by signals."""
+    kind = models.CharField(max_length=20, choices=PAYABLE_KINDS)
+    ref_id = models.BigIntegerField()
+    billed = models.FloatField(default=0)
+    paid = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ("kind", "ref_id")
+
+    @property
+    def outstanding(self):
+        return self.billed - self.paid
+
 
 class Owner(models.Model):
     name = models.CharField(max_length=100)
@@ -148,8 +248,32 @@ class OwnerCashEntry(models.Model):
     amount = models.FloatField()
     notes = models.CharField(max_length=200, blank=True)
 
+    class Meta:
+        indexes = [
+            # owner_cash_list: per-owner totals and date-ordered entries
+            models.Index(fields=["owner", "date", "amount"], name="ocash_owner_date_amt_idx"),
+            models.Index(fields=["date"], name="ocash_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.owner} - {self.amount}"
+
+class OwnerCashSnapshot(models.Model):
+    """Cumulative cash in / out for an owner up to the end of ``month``."""
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE)
+    month = models.DateField()  # first day of the closed month
+    total_in = models.FloatField(default=0)
+    total_out = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ("owner", "month")
+
+    @property
+    def balance(self):
+        return self.total_in - self.total_out
+
+    def __str__(self):
+        return f"{self.owner} - {self.month:%Y-%m}"
     
 class OtherExpense(models.Model):
     site = models.ForeignKey(Site, on_delete=models.CASCADE)
@@ -162,9 +286,107 @@ class OtherExpense(models.Model):
         blank=True
     )
 
-    title = models.CharField(max_length=150)
+    category = models.ForeignKey(ExpenseCategory, on_delete=models.PROTECT)
     amount = models.FloatField()
     notes = models.CharField(max_length=255, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "category"], name="exp_date_category_idx"),
+            # api_bill_expense / bill_expense_pdf: one category over a date range
+            models.Index(fields=["category", "date"], name="exp_category_date_idx"),
+            models.Index(fields=["site", "date"], name="exp_site_date_idx"),
+            # owner_cash_list: spent per owner
+            models.Index(fields=["owner", "amount"], name="exp_owner_amount_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.site} - {self.category} - {self.amount}"
+
+
+# ---------- SEARCH INDEX ----------
+SEARCH_KINDS = [
+    ("material", "Material"),
+    ("expense", "Expense"),
+    ("note", "Daily note"),
+]
+
+class SearchEntry(models.Model):
+    """Searchable text of one material / expense / daily-note row, kept current by signals.
+
+    Indexed by an FTS5 table on SQLite and a tsvector GIN index on Postgres
+    (migration 0040); see ``civil_app.search``.
+    """
+    kind = models.CharField(max_length=20, choices=SEARCH_KINDS)
+    ref_id = models.BigIntegerField()
+    site = models.ForeignKey(Site, on_delete=models.CASCADE)
+    date = models.DateField()
+    body = models.TextField()
+
+    class Meta:
+        unique_together = ("kind", "ref_id")
+        indexes = [
+            models.Index(fields=["site", "date"], name="search_site_date_idx"),
+        ]
+
+
+# ---------- CACHE TAG VERSIONS ----------
+class CacheTag(models.Model):
+    """Version counter for one cache tag; bumping it retires every entry keyed on it."""
+    tag = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
     def __str__(self):
-        return f"{self.site} - {self.title} - {self.amount}"
+        return f"{self.tag} v{self.version}"
+
+
+# ---------- CHANGE JOURNAL ----------
+LEDGER_KINDS = [
+    ("civil", "Civil work"),
+    ("advance", "Civil advance"),
+    ("department", "Department work"),
+    ("material", "Material"),
+    ("expense", "Expense"),
+    ("note", "Daily note"),
+    ("owner_cash", "Owner cash"),
+]
+
+CHANGE_OPS = [
+    ("i", "Insert"),
+    ("u", "Update"),
+    ("d", "Delete"),
+]
+
+class LedgerChange(models.Model):
+    """One ledger write, appended by signals; the id is the change cursor.
+
+    Not a foreign key to the row or its site: the journal outlives both.
+    """
+    kind = models.CharField(max_length=20, choices=LEDGER_KINDS)
+    row_id = models.BigIntegerField()
+    op = models.CharField(max_length=1, choices=CHANGE_OPS)
+    site_id = models.BigIntegerField(null=True)
+    date = models.DateField(null=True)
+    at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # changes.day_version: the last change to one site's day
+            models.Index(fields=["site_id", "date"], name="ledgerchange_site_date_idx"),
+        ]
+
+
+# ---------- OFFLINE SYNC ----------
+class SyncedEdit(models.Model):
+    """An offline day-sheet save already applied by ``api/sync/`` and its answer.
+
+    Written in the transaction that applies the edit, so a resent batch
+    answers the same on any worker; rows older than a day are pruned.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    edit_id = models.CharField(max_length=64)
+    result = models.JSONField()
+    at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("user", "edit_id")
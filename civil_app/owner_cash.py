@@ -0,0 +1,283 @@
+"""Owner cash ledger: running balances, keyset pages and monthly snapshots.
+
+An owner's ledger is every OwnerCashEntry (cash in) plus every OtherExpense
+paid by that owner (cash out), ordered by (date, kind, id) with "in" before
+"out" on the same day.
+"""
+from datetime import date, timedelta
+
+from django.db import connection
+from django.db.models import OuterRef, Q, Subquery, Sum
+
+from . import ledger_queries
+from .models import OtherExpense, OwnerCashEntry, OwnerCashSnapshot, ExpenseCategory, Site
+
+
+PAGE_SIZE = 50
+
+
+# =========================================================
+# MONTH HELPERS
+# =========================================================
+
+def month_start(d):
+    return d.replace(day=1)
+
+
+def next_month(d):
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+# =========================================================
+# SNAPSHOTS
+# =========================================================
+
+def latest_snapshot(owner_id, before=None):
+    """Newest snapshot whose month closed before ``before`` (a month start)."""
+    qs = OwnerCashSnapshot.objects.filter(owner_id=owner_id)
+    if before:
+        qs = qs.filter(month__lt=before)
+    return qs.order_by("-month").first()
+
+
+def _totals(owner_id, start=None, end=None):
+    """(cash in, cash out) for ``start <= date < end``; open ends are unbounded."""
+    cash_in = OwnerCashEntry.objects.filter(owner_id=owner_id)
+    cash_out = OtherExpense.objects.filter(owner_id=owner_id)
+
+    if start:
+        cash_in = cash_in.filter(date__gte=start)
+        cash_out = cash_out.filter(date__gte=start)
+    if end:
+        cash_in = cash_in.filter(date__lt=end)
+        cash_out = cash_out.filter(date__lt=end)
+
+    return (
+        cash_in.aggregate(s=Sum("amount"))["s"] or 0,
+        cash_out.aggregate(s=Sum("amount"))["s"] or 0,
+    )
+
+
+def close_months(owner_id, until=None):
+    """Snapshot every fully closed month not yet snapshotted, oldest first.
+
+    Each new month only aggregates that month's rows on top of the previous
+    snapshot, so catching up is O(entries since the last snapshot).
+    """
+    until = month_start(until or date.today())
+    last = latest_snapshot(owner_id)
+
+    if last:
+        month = next_month(last.month)
+        total_in, total_out = last.total_in, last.total_out
+    else:
+        first = min(
+            filter(None, [
+                OwnerCashEntry.objects.filter(owner_id=owner_id)
+                .order_by("date").values_list("date", flat=True).first(),
+                OtherExpense.objects.filter(owner_id=owner_id)
+                .order_by("date").values_list("date", flat=True).first(),
+            ]),
+            default=None,
+        )
+        if not first:
+            return []
+        month = month_start(first)
+        total_in = total_out = 0
+
+    created = []
+
+    while month < until:
+        month_in, month_out = _totals(owner_id, month, next_month(month))
+        total_in += month_in
+        total_out += month_out
+
+        created.append(OwnerCashSnapshot(
+            owner_id=owner_id,
+            month=month,
+            total_in=total_in,
+            total_out=total_out,
+        ))
+        month = next_month(month)
+
+    # a concurrent request may have closed the same months
+    OwnerCashSnapshot.objects.bulk_create(created, ignore_conflicts=True)
+    return created
+
+
+def invalidate_from(owner_id, changed_on):
+    """Drop snapshots that include ``changed_on``; they are rebuilt on demand."""
+    if not owner_id or not changed_on:
+        return
+
+    if isinstance(changed_on, str):
+        changed_on = date.fromisoformat(changed_on)
+
+    # only closed months are ever snapshotted
+    if month_start(changed_on) >= month_start(date.today()):
+        return
+
+    OwnerCashSnapshot.objects.filter(
+        owner_id=owner_id,
+        month__gte=month_start(changed_on),
+    ).delete()
+
+
+# =========================================================
+# BALANCE
+# =========================================================
+
+def owner_balance(owner_id):
+    """Current cash in / out / balance from the last snapshot plus newer rows."""
+    snap = latest_snapshot(owner_id)
+
+    if snap:
+        since_in, since_out = _totals(owner_id, start=next_month(snap.month))
+        total_in = snap.total_in + since_in
+        total_out = snap.total_out + since_out
+    else:
+        total_in, total_out = _totals(owner_id)
+
+    return {
+        "total_in": total_in,
+        "total_out": total_out,
+        "balance": total_in - total_out,
+    }
+
+
+def balances(owner_ids):
+    """owner_balance() for many owners in three queries, reading snapshots
+    but never writing them (months are closed by snapshot_owner_cash and by
+    the ledger page)."""
+    owner_ids = list(owner_ids)
+    latest = OwnerCashSnapshot.objects.filter(
+        owner_id__in=owner_ids,
+        month=Subquery(
+            OwnerCashSnapshot.objects.filter(owner_id=OuterRef("owner_id"))
+            .order_by("-month").values("month")[:1]
+        ),
+    )
+    snaps = {snap.owner_id: snap for snap in latest}
+
+    # rows after each owner's snapshot; all rows for owners without one
+    since = Q(owner_id__in=[pk for pk in owner_ids if pk not in snaps])
+    for pk, snap in snaps.items():
+        since |= Q(owner_id=pk, date__gte=next_month(snap.month))
+
+    def sums(model):
+        return dict(ledger_queries.owner_sums(model, since).values_list("owner_id", "s"))
+
+    since_in, since_out = sums(OwnerCashEntry), sums(OtherExpense)
+    out = {}
+    for pk in owner_ids:
+        snap = snaps.get(pk)
+        total_in = (snap.total_in if snap else 0) + (since_in.get(pk) or 0)
+        total_out = (snap.total_out if snap else 0) + (since_out.get(pk) or 0)
+        out[pk] = {"total_in": total_in, "total_out": total_out, "balance": total_in - total_out}
+    return out
+
+
+# =========================================================
+# LEDGER PAGE (KEYSET + WINDOW)
+# =========================================================
+
+def parse_cursor(raw):
+    """``YYYY-MM-DD:kind:id`` -> (date, kind, id), or None."""
+    try:
+        day, kind, pk = raw.split(":")
+        if kind not in ("in", "out"):
+            return None
+        return (date.fromisoformat(day), kind, int(pk))
+    except (AttributeError, ValueError):
+        return None
+
+
+def format_cursor(row):
+    return f"{row['date'].isoformat()}:{row['kind']}:{row['id']}"
+
+
+def _lines_sql():
+    return f"""
+        SELECT 'in' AS kind, c.id, c.date, c.amount AS amount,
+               c.amount AS signed, c.notes, '' AS site, '' AS title
+        FROM {OwnerCashEntry._meta.db_table} c
+        WHERE c.owner_id = %s AND c.date BETWEEN %s AND %s
+        UNION ALL
+        SELECT 'out' AS kind, e.id, e.date, e.amount AS amount,
+               -e.amount AS signed, e.notes, s.name AS site, cat.name AS title
+        FROM {OtherExpense._meta.db_table} e
+        JOIN {Site._meta.db_table} s ON s.id = e.site_id
+        JOIN {ExpenseCategory._meta.db_table} cat ON cat.id = e.category_id
+        WHERE e.owner_id = %s AND e.date BETWEEN %s AND %s
+    """
+
+
+def ledger_page(owner_id, before=None, limit=PAGE_SIZE):
+    """One page of ledger lines, newest first, each with its running balance.
+
+    ``before`` is a cursor tuple from :func:`parse_cursor`. The running balance
+    is a window SUM over rows between the snapshot preceding the page and the
+    cursor, seeded with that snapshot's closing balance, so no page scans the
+    whole history.
+    """
+    keyset = ""
+    params = []
+    upto = date.max.isoformat()
+
+    if before:
+        keyset = "WHERE (date, kind, id) < (%s, %s, %s)"
+        params = [before[0].isoformat(), before[1], before[2]]
+        upto = before[0].isoformat()
+
+    # ---------- page bounds (cheap: no window) ----------
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT date FROM ({_lines_sql()}) lines
+            {keyset}
+            ORDER BY date DESC, kind DESC, id DESC
+            LIMIT %s
+            """,
+            [owner_id, date.min.isoformat(), upto, owner_id, date.min.isoformat(), upto, *params, limit + 1],
+        )
+        dates = [r[0] for r in cursor.fetchall()]
+
+    if not dates:
+        return [], None
+
+    has_more = len(dates) > limit
+    oldest = dates[:limit][-1]
+    if isinstance(oldest, str):
+        oldest = date.fromisoformat(oldest)
+
+    # ---------- opening balance from the snapshot before the page ----------
+    snap = latest_snapshot(owner_id, before=month_start(oldest))
+    opening = snap.balance if snap else 0
+    window_from = (next_month(snap.month) if snap else date.min).isoformat()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT kind, id, date, amount, notes, site, title, balance FROM (
+                SELECT lines.*,
+                       %s + SUM(signed) OVER (
+                           ORDER BY date, kind, id
+                           ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW
+                       ) AS balance
+                FROM ({_lines_sql()}) lines
+            ) ledger
+            {keyset}
+            ORDER BY date DESC, kind DESC, id DESC
+            LIMIT %s
+            """,
+            [opening, owner_id, window_from, upto, owner_id, window_from, upto, *params, limit],
+        )
+        columns = [c[0] for c in cursor.description]
+        rows = [dict(zip(columns, r)) for r in cursor.fetchall()]
+
+    for row in rows:
+        if isinstance(row["date"], str):
+            row["date"] = date.fromisoformat(row["date"])
+
+    next_cursor = format_cursor(rows[-1]) if has_more else None
+    return rows, next_cursor
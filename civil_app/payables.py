@@ -0,0 +1,145 @@
+"""Outstanding payables per team, department, agent and expense category.
+
+Each ledger row contributes its net payable (what all_bills shows as the
+bill total) to one Payable row; each BillPayment reduces it. Signals apply
+only the delta of every write, so reading what is owed is a single keyed
+lookup instead of an aggregation over the whole history.
+"""
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import (
+    BillPayment, CivilDailyWork, DepartmentWork,
+    MaterialEntry, OtherExpense, Payable,
+)
+
+
+# =========================================================
+# CONTRIBUTIONS
+# =========================================================
+
+def contribution(instance):
+    """(kind, ref_id, amount) a ledger row adds to its payable, or None."""
+    if isinstance(instance, CivilDailyWork):
+        return ("team", instance.team_id, instance.total_amount or 0)
+
+    if isinstance(instance, DepartmentWork):
+        return ("department", instance.department_id, instance.total_amount or 0)
+
+    if isinstance(instance, MaterialEntry):
+        if not instance.agent_id:
+            return None
+        return ("agent", instance.agent_id, (instance.total or 0) - (instance.advance or 0))
+
+    if isinstance(instance, OtherExpense):
+        return ("expense", instance.category_id, instance.amount or 0)
+
+    return None
+
+
+def payment_contribution(payment):
+    try:
+        ref_id = int(payment.reference)
+    except (TypeError, ValueError):
+        return None
+    return (payment.bill_type, ref_id, payment.amount or 0)
+
+
+# =========================================================
+# DELTAS
+# =========================================================
+
+def apply(kind, ref_id, billed=0, paid=0):
+    """Add to a payable's billed / paid totals atomically."""
+    if not ref_id or (not billed and not paid):
+        return
+
+    with transaction.atomic():
+        Payable.objects.get_or_create(kind=kind, ref_id=ref_id)
+        Payable.objects.filter(kind=kind, ref_id=ref_id).update(
+            billed=F("billed") + billed,
+            paid=F("paid") + paid,
+        )
+
+
+def apply_change(old, new, field="billed"):
+    """Move a row's contribution from ``old`` to ``new`` (either may be None)."""
+    if old and new and old[:2] == new[:2]:
+        apply(new[0], new[1], **{field: new[2] - old[2]})
+        return
+
+    if old:
+        apply(old[0], old[1], **{field: -old[2]})
+    if new:
+        apply(new[0], new[1], **{field: new[2]})
+
+
+# =========================================================
+# READS
+# =========================================================
+
+def outstanding(kind, ref_id):
+    payable = Payable.objects.filter(kind=kind, ref_id=ref_id).first()
+    return payable.outstanding if payable else 0
+
+
+def outstanding_map(kind):
+    """{ref_id: outstanding} for every payable of one kind."""
+    return {
+        p.ref_id: p.outstanding
+        for p in Payable.objects.filter(kind=kind)
+    }
+
+
+# =========================================================
+# FULL REBUILD
+# =========================================================
+
+def rebuild():
+    """Recompute every payable from scratch with grouped queries."""
+    totals = {}
+
+    def add(kind, rows, key, field, value):
+        for r in rows:
+            if r[key] is None:
+                continue
+            entry = totals.setdefault((kind, r[key]), {"billed": 0, "paid": 0})
+            entry[field] += r[value] or 0
+
+    add(
+        "team",
+        CivilDailyWork.objects.values("team_id").annotate(s=Sum("total_amount")),
+        "team_id", "billed", "s",
+    )
+    add(
+        "department",
+        DepartmentWork.objects.values("department_id").annotate(s=Sum("total_amount")),
+        "department_id", "billed", "s",
+    )
+    add(
+        "agent",
+        MaterialEntry.objects.values("agent_id").annotate(s=Sum(F("total") - F("advance"))),
+        "agent_id", "billed", "s",
+    )
+    add(
+        "expense",
+        OtherExpense.objects.values("category_id").annotate(s=Sum("amount")),
+        "category_id", "billed", "s",
+    )
+
+    for p in BillPayment.objects.values("bill_type", "reference").annotate(s=Sum("amount")):
+        c = payment_contribution(BillPayment(
+            bill_type=p["bill_type"], reference=p["reference"], amount=p["s"],
+        ))
+        if c:
+            entry = totals.setdefault(c[:2], {"billed": 0, "paid": 0})
+            entry["paid"] += c[2]
+
+    with transaction.atomic():
+        Payable.objects.all().delete()
+        Payable.objects.bulk_create([
+            Payable(kind=kind, ref_id=ref_id, **values)
+            for (kind, ref_id), values in totals.items()
+        ])
+
+    return len(totals)
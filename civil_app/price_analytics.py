@@ -0,0 +1,330 @@
+"""Material rate history: rolling averages, agent comparisons and outliers.
+
+Every MaterialEntry is loaded once into NumPy columns (date, item, agent,
+site, rate, quantity) sorted by item then date, so one item over any range
+is two binary searches and every statistic is a handful of array operations.
+
+The columns are kept per process and tagged with the version of the
+``material`` cache tag (see ``civil_app.ledger_cache``), so the first request
+after a material write reloads them; names are looked up per request.
+
+Averages are weighted by quantity. A purchase is an outlier when its rate is
+more than OUTLIER_Z robust z-scores (median / MAD) from its item's median
+over the requested range.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from django.db import connections, router
+
+from . import ledger_cache
+from .models import Agent, MaterialEntry, MaterialItem
+
+
+WINDOW_DAYS = 30
+OUTLIER_Z = 3.5
+
+# "all" moves on bulk loads and invalidate_all(), "material" on every material write
+DATA_TAGS = {"all", "material"}
+
+
+@dataclass
+class PriceTable:
+    """Column arrays for every material purchase, sorted by (item, day, id)."""
+    stamp: str
+    id: np.ndarray
+    day: np.ndarray  # days since 1970-01-01
+    item: np.ndarray
+    agent: np.ndarray  # 0 when the purchase has no agent
+    site: np.ndarray
+    rate: np.ndarray
+    qty: np.ndarray
+
+    def item_slice(self, item_id, start, end):
+        """Index range of one item's purchases dated start..end."""
+        lo = np.searchsorted(self.item, item_id, side="left")
+        hi = np.searchsorted(self.item, item_id, side="right")
+        days = self.day[lo:hi]
+        return (
+            lo + np.searchsorted(days, _day(start), side="left"),
+            lo + np.searchsorted(days, _day(end), side="right"),
+        )
+
+
+# =========================================================
+# LOADING
+# =========================================================
+
+_lock = threading.Lock()
+_table = None
+
+
+# a date column as whole days since 1970-01-01, computed by the database
+DAY_SQL = {
+    "sqlite": "CAST(julianday({column}) - 2440587.5 AS INTEGER)",
+    "postgresql": "({column} - DATE '1970-01-01')",
+    "mysql": "DATEDIFF({column}, '1970-01-01')",
+}
+EPOCH = date(1970, 1, 1)
+
+
+def day_sql(connection, column="date"):
+    return DAY_SQL[connection.vendor].format(column=column)
+
+
+def _day(d):
+    return (d - EPOCH).days
+
+
+def _date(n):
+    return EPOCH + timedelta(days=int(n))
+
+
+def load(stamp=""):
+    """Read every purchase as plain numbers and sort it in NumPy.
+
+    One numeric query: no model instances, no date objects, no ORDER BY.
+    """
+    connection = connections[router.db_for_read(MaterialEntry)]
+    sql = (
+        f"SELECT id, {day_sql(connection)}, item_id, COALESCE(agent_id, 0), "
+        f"site_id, rate, quantity FROM {MaterialEntry._meta.db_table}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        rows = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 7)
+
+    rows = rows[np.lexsort((rows[:, 0], rows[:, 1], rows[:, 2]))]
+    ids, days, items, agents, sites = (rows[:, k].astype(np.int64) for k in range(5))
+    return PriceTable(
+        stamp=stamp, id=ids, day=days, item=items, agent=agents, site=sites,
+        rate=rows[:, 5].copy(), qty=rows[:, 6].copy(),
+    )
+
+
+def table():
+    """The current columns, reloaded when the ledger cache version moves."""
+    global _table
+    stamp = ledger_cache.stamp(DATA_TAGS)
+    with _lock:
+        if _table is not None and _table.stamp == stamp:
+            return _table
+    fresh = load(stamp)
+    with _lock:
+        _table = fresh
+    return fresh
+
+
+def reset():
+    global _table
+    with _lock:
+        _table = None
+
+
+# =========================================================
+# VECTOR HELPERS
+# =========================================================
+
+def weighted_mean(values, weights):
+    total = weights.sum()
+    return float((values * weights).sum() / total) if total else None
+
+
+def rolling_daily(day, rate, qty, start, end, window):
+    """Per-day weighted average and trailing ``window``-day weighted average.
+
+    Both cover every day from ``start`` to ``end``; a day without purchases
+    has no daily value (NaN), a window without purchases no rolling value.
+    """
+    first = _day(start)
+    span = _day(end) - first + 1
+    pos = day - first
+
+    spend = np.bincount(pos, weights=rate * qty, minlength=span)
+    volume = np.bincount(pos, weights=qty, minlength=span)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = np.where(volume > 0, spend / volume, np.nan)
+
+        cum_spend = np.concatenate(([0.0], np.cumsum(spend)))
+        cum_volume = np.concatenate(([0.0], np.cumsum(volume)))
+        upto = np.arange(1, span + 1)
+        since = np.maximum(upto - window, 0)
+        window_volume = cum_volume[upto] - cum_volume[since]
+        rolling = np.where(
+            window_volume > 0, (cum_spend[upto] - cum_spend[since]) / window_volume, np.nan,
+        )
+    return daily, rolling
+
+
+def robust_z(rate):
+    """|rate - median| in units of the scaled median absolute deviation."""
+    if not rate.size:
+        return rate
+    median = np.median(rate)
+    mad = np.median(np.abs(rate - median)) * 1.4826
+    if not mad:
+        return np.zeros_like(rate)
+    return np.abs(rate - median) / mad
+
+
+def _round(value, digits=2):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+# =========================================================
+# ONE ITEM
+# =========================================================
+
+def item_history(item_id, start, end, window=WINDOW_DAYS, agent_id=None):
+    """Rate series, per-agent comparison and outliers for one item."""
+    t = table()
+    lo, hi = t.item_slice(item_id, start, end)
+    day, agent, rate, qty = t.day[lo:hi], t.agent[lo:hi], t.rate[lo:hi], t.qty[lo:hi]
+
+    if agent_id:
+        only = agent == agent_id
+        series_day, series_rate, series_qty = day[only], rate[only], qty[only]
+    else:
+        series_day, series_rate, series_qty = day, rate, qty
+    daily, rolling = rolling_daily(series_day, series_rate, series_qty, start, end, window)
+
+    # ---------------- per agent ----------------
+    agents = []
+    item_avg = weighted_mean(rate, qty)
+    if rate.size:
+        ids, group = np.unique(agent, return_inverse=True)
+        n = np.bincount(group)
+        volume = np.bincount(group, weights=qty)
+        spend = np.bincount(group, weights=rate * qty)
+        low = np.full(ids.size, np.inf)
+        high = np.full(ids.size, -np.inf)
+        np.minimum.at(low, group, rate)
+        np.maximum.at(high, group, rate)
+        # rows are in date order, so the last index per group is the latest purchase
+        latest = np.zeros(ids.size, dtype=np.int64)
+        np.maximum.at(latest, group, np.arange(rate.size))
+
+        names = dict(Agent.objects.filter(id__in=ids.tolist()).values_list("id", "name"))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg = np.where(volume > 0, spend / volume, np.nan)
+        for i, agent_key in enumerate(ids.tolist()):
+            agents.append({
+                "agent_id": agent_key or None,
+                "agent": names.get(agent_key, ""),
+                "purchases": int(n[i]),
+                "quantity": _round(volume[i]),
+                "avg_rate": _round(avg[i]),
+                "min_rate": _round(low[i]),
+                "max_rate": _round(high[i]),
+                "last_rate": _round(rate[latest[i]]),
+                "last_date": _date(day[latest[i]]),
+                "vs_item_pct": _round((avg[i] / item_avg - 1) * 100, 1) if item_avg else None,
+            })
+        agents.sort(key=lambda a: (a["avg_rate"] is None, a["avg_rate"]))
+
+    # ---------------- outliers ----------------
+    z = robust_z(rate)
+    flagged = np.flatnonzero(z > OUTLIER_Z)
+    outliers = [
+        {
+            "id": int(t.id[lo + i]),
+            "date": _date(day[i]),
+            "agent_id": int(agent[i]) or None,
+            "site_id": int(t.site[lo + i]),
+            "rate": _round(rate[i]),
+            "quantity": _round(qty[i]),
+            "z": _round(z[i], 1),
+        }
+        for i in flagged.tolist()
+    ]
+
+    first = _day(start)
+    has_rate = ~np.isnan(rolling)
+    item = MaterialItem.objects.filter(id=item_id).values("name", "unit").first() or {}
+    return {
+        "item_id": item_id,
+        "item": item.get("name", ""),
+        "unit": item.get("unit", ""),
+        "window_days": window,
+        "purchases": int(rate.size),
+        "quantity": _round(qty.sum()),
+        "avg_rate": _round(item_avg),
+        "series": [
+            {
+                "date": _date(first + i),
+                "rate": _round(daily[i]),
+                "rolling": _round(rolling[i]),
+            }
+            for i in np.flatnonzero(has_rate).tolist()
+        ],
+        "agents": agents,
+        "outliers": outliers,
+    }
+
+
+# =========================================================
+# ALL ITEMS
+# =========================================================
+
+def overview(start, end, window=WINDOW_DAYS):
+    """Per item: weighted average over the range, over its last ``window``
+    days and the ``window`` before, the change between them and outliers."""
+    t = table()
+    in_range = (t.day >= _day(start)) & (t.day <= _day(end))
+    item, day, rate, qty = t.item[in_range], t.day[in_range], t.rate[in_range], t.qty[in_range]
+    if not rate.size:
+        return []
+
+    ids, group = np.unique(item, return_inverse=True)
+    k = ids.size
+
+    def group_avg(mask):
+        volume = np.bincount(group[mask], weights=qty[mask], minlength=k)
+        spend = np.bincount(group[mask], weights=(rate * qty)[mask], minlength=k)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(volume > 0, spend / volume, np.nan)
+
+    last = _day(end)
+    everything = np.ones(rate.size, dtype=bool)
+    recent = day > last - window
+    previous = (day > last - 2 * window) & ~recent
+    avg, avg_recent, avg_previous = group_avg(everything), group_avg(recent), group_avg(previous)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change = (avg_recent / avg_previous - 1) * 100
+
+    # robust z per item: each group's median from one sort by (group, value)
+    counts = np.bincount(group, minlength=k)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    median = _group_median(rate[np.lexsort((rate, group))], starts, counts)
+    deviation = np.abs(rate - median[group])
+    mad = _group_median(deviation[np.lexsort((deviation, group))], starts, counts) * 1.4826
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(mad[group] > 0, deviation / mad[group], 0)
+    outliers = np.bincount(group, weights=z > OUTLIER_Z, minlength=k)
+
+    names = dict(MaterialItem.objects.filter(id__in=ids.tolist()).values_list("id", "name"))
+    rows = [
+        {
+            "item_id": item_id,
+            "item": names.get(item_id, ""),
+            "purchases": int(counts[i]),
+            "avg_rate": _round(avg[i]),
+            "recent_avg_rate": _round(avg_recent[i]),
+            "previous_avg_rate": _round(avg_previous[i]),
+            "change_pct": _round(change[i], 1),
+            "outliers": int(outliers[i]),
+        }
+        for i, item_id in enumerate(ids.tolist())
+    ]
+    rows.sort(key=lambda r: r["item"].casefold())
+    return rows
+
+
+def _group_median(sorted_values, starts, counts):
+    """Median of each group in values sorted by (group, value)."""
+    low = starts + (counts - 1) // 2
+    high = starts + counts // 2
+    return (sorted_values[low] + sorted_values[high]) / 2
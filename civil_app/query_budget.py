@@ -0,0 +1,160 @@
+"""Per-request query counting, N+1 detection and per-view query budgets.
+
+``QueryBudgetMiddleware`` wraps every database connection for the length of
+a request and records each query's fingerprint and duration. Requests that
+exceed their view's budget, or repeat one query shape too often, are logged
+to ``civil_app.queries``.
+
+Views declare a budget with ``@query_budget(n)``; others fall back to
+``settings.QUERY_BUDGET_DEFAULT``.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger("civil_app.queries")
+
+DEFAULT_BUDGET = 50
+DEFAULT_DUPLICATE_THRESHOLD = 5
+
+
+def query_budget(limit):
+    """Declare the most queries one request to this view may run."""
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+# =========================================================
+# FINGERPRINTS
+# =========================================================
+
+_IN_LIST = re.compile(r"IN \((?:%s|\?)(?:, ?(?:%s|\?))*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def fingerprint(sql):
+    """SQL with literals and IN-list lengths removed, so repeats group together."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+# =========================================================
+# STATS
+# =========================================================
+
+class QueryStats:
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.view_name = None
+        self.count = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.count > self.budget
+
+    def duplicates(self, threshold=None):
+        threshold = threshold or getattr(
+            settings, "QUERY_DUPLICATE_THRESHOLD", DEFAULT_DUPLICATE_THRESHOLD
+        )
+        return [
+            (sql, n)
+            for sql, n in self.fingerprints.most_common()
+            if n >= threshold
+        ]
+
+    def report(self):
+        lines = [
+            f"{self.view_name or '?'}: {self.count} queries "
+            f"(budget {self.budget}), {self.db_time * 1000:.1f} ms in DB"
+        ]
+        for sql, n in self.duplicates():
+            lines.append(f"  x{n}  {sql[:200]}")
+        return "\n".join(lines)
+
+
+# =========================================================
+# MIDDLEWARE
+# =========================================================
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = self.start(request)
+        with ExitStack() as stack:
+            self.wrap_connections(stack, stats)
+            response = self.get_response(request)
+        return self.finish(request, stats, response)
+
+    async def __acall__(self, request):
+        # connections are per thread: wrap them in the thread the ORM will
+        # use for this request (every sync_to_async call shares it)
+        stats = self.start(request)
+        stack = ExitStack()
+        await sync_to_async(self.wrap_connections)(stack, stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, stats, response)
+
+    def start(self, request):
+        stats = QueryStats(
+            budget=getattr(settings, "QUERY_BUDGET_DEFAULT", DEFAULT_BUDGET)
+        )
+        request.query_stats = stats
+        return stats
+
+    def wrap_connections(self, stack, stats):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(stats))
+
+    def finish(self, request, stats, response):
+        if stats.over_budget or stats.duplicates():
+            logger.warning("%s %s\n%s", request.method, request.path, stats.report())
+
+        response["Server-Timing"] = (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.count} queries"'
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = request.query_stats
+        stats.view_name = getattr(view_func, "__name__", None)
+
+        budget = getattr(view_func, "query_budget", None)
+        if budget is not None:
+            stats.budget = budget
@@ -0,0 +1,216 @@
+"""Ranked full-text search over material entries, expenses and daily notes.
+
+Every searchable row has one SearchEntry holding its text (item, quantity,
+unit and agent for materials; category and notes for expenses; the daily
+note's description). Signals keep it current on write; bulk inserts call
+:func:`rebuild`.
+
+The index behind it depends on the database (migration 0040):
+
+SQLite      ``civil_app_searchentry_fts``, an FTS5 external-content table
+            kept in step with SearchEntry by triggers, ranked by bm25.
+Postgres    a GIN index on ``to_tsvector('simple', body)``, ranked by ts_rank.
+other       ``icontains`` per term, newest first.
+
+Every query term matches as a prefix, all terms must match.
+"""
+import re
+
+from django.db import connections, router, transaction
+
+from .models import (
+    Agent, ExpenseCategory, MaterialEntry, MaterialItem, OtherExpense,
+    SearchEntry, SiteDailyNote,
+)
+
+
+PAGE_SIZE = 20
+FTS_TABLE = "civil_app_searchentry_fts"
+TS_CONFIG = "simple"  # names and numbers, not English prose: no stemming
+
+
+# =========================================================
+# ENTRY TEXT
+# =========================================================
+
+def entry_for(instance):
+    """(kind, ref_id, site_id, date, body) for a searchable row, or None."""
+    if isinstance(instance, MaterialEntry):
+        agent = instance.agent.name if instance.agent_id else ""
+        body = f"{instance.item.name} {instance.quantity or 0:g} {instance.unit} {agent}"
+        return ("material", instance.pk, instance.site_id, instance.date, body)
+
+    if isinstance(instance, OtherExpense):
+        body = f"{instance.category.name} {instance.notes}"
+        return ("expense", instance.pk, instance.site_id, instance.date, body)
+
+    if isinstance(instance, SiteDailyNote):
+        return ("note", instance.pk, instance.site_id, instance.date, instance.description)
+
+    return None
+
+
+def _entries(rows):
+    entries = []
+    for row in rows:
+        kind, ref_id, site_id, day, body = entry_for(row)
+        body = " ".join(body.split())
+        if body:
+            entries.append(SearchEntry(kind=kind, ref_id=ref_id, site_id=site_id, date=day, body=body))
+    return entries
+
+
+# =========================================================
+# SYNC ON WRITE
+# =========================================================
+
+def index(instance):
+    """Write (or drop, when its text is blank) the entry for one row."""
+    with transaction.atomic():
+        remove(instance)
+        SearchEntry.objects.bulk_create(_entries([instance]))
+
+
+def remove(instance):
+    kind = entry_for(instance)[0]
+    SearchEntry.objects.filter(kind=kind, ref_id=instance.pk).delete()
+
+
+def add(rows):
+    """Entries for rows just written with bulk_create (no signals fired)."""
+    return len(SearchEntry.objects.bulk_create(_entries(rows)))
+
+
+MASTER_ROWS = {
+    Agent: lambda m: MaterialEntry.objects.filter(agent=m).select_related("agent", "item"),
+    MaterialItem: lambda m: MaterialEntry.objects.filter(item=m).select_related("agent", "item"),
+    ExpenseCategory: lambda m: OtherExpense.objects.filter(category=m).select_related("category"),
+}
+
+
+def reindex_master(master):
+    """A renamed agent / item / category changes the text of every row using it."""
+    return _replace(MASTER_ROWS[type(master)](master))
+
+
+def _replace(rows, batch=2000):
+    rows = list(rows)
+    if not rows:
+        return 0
+    kind = entry_for(rows[0])[0]
+    with transaction.atomic():
+        for i in range(0, len(rows), batch):
+            chunk = rows[i:i + batch]
+            SearchEntry.objects.filter(kind=kind, ref_id__in=[r.pk for r in chunk]).delete()
+            SearchEntry.objects.bulk_create(_entries(chunk))
+    return len(rows)
+
+
+def rebuild(batch=2000):
+    """Recreate every entry from the ledger (after bulk inserts / imports)."""
+    sources = [
+        MaterialEntry.objects.select_related("agent", "item"),
+        OtherExpense.objects.select_related("category"),
+        SiteDailyNote.objects.all(),
+    ]
+    count = 0
+    with transaction.atomic():
+        SearchEntry.objects.all().delete()
+        for qs in sources:
+            entries = []
+            for row in qs.order_by("pk").iterator(chunk_size=batch):
+                entries.extend(_entries([row]))
+                if len(entries) >= batch:
+                    SearchEntry.objects.bulk_create(entries)
+                    count += len(entries)
+                    entries = []
+            SearchEntry.objects.bulk_create(entries)
+            count += len(entries)
+    return count
+
+
+# =========================================================
+# QUERIES
+# =========================================================
+
+def terms(query):
+    """Words of a typed query; FTS / tsquery syntax in it is never interpreted."""
+    return re.findall(r"\w+", (query or "").casefold())
+
+
+SQL_FILTERS = {
+    "site_id": "e.site_id = %s",
+    "date__gte": "e.date >= %s",
+    "date__lte": "e.date <= %s",
+}
+
+
+def search(query, site_id=None, from_date=None, to_date=None, page=1, per_page=PAGE_SIZE):
+    """One page of matches, best first: ``(rows, has_next)``.
+
+    Each row is a dict of kind, id (of the ledger row), site_id, site, date,
+    text and rank.
+    """
+    words = terms(query)
+    if not words:
+        return [], False
+
+    bounds = {"site_id": site_id, "date__gte": from_date, "date__lte": to_date}
+    bounds = {k: v for k, v in bounds.items() if v}
+    where = "".join(f" AND {SQL_FILTERS[k]}" for k in bounds)
+    params = [str(v) for v in bounds.values()]
+
+    alias = router.db_for_read(SearchEntry)
+    connection = connections[alias]
+    offset = (max(page, 1) - 1) * per_page
+
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{w}"*' for w in words)
+        sql = f"""
+            SELECT e.kind, e.ref_id, e.site_id, s.name, e.date, e.body, -bm25({FTS_TABLE}) AS rank
+            FROM {FTS_TABLE}
+            JOIN civil_app_searchentry e ON e.id = {FTS_TABLE}.rowid
+            JOIN civil_app_site s ON s.id = e.site_id
+            WHERE {FTS_TABLE} MATCH %s{where}
+            ORDER BY rank DESC, e.date DESC
+            LIMIT %s OFFSET %s
+        """
+    elif connection.vendor == "postgresql":
+        match = " & ".join(f"{w}:*" for w in words)
+        sql = f"""
+            SELECT e.kind, e.ref_id, e.site_id, s.name, e.date, e.body,
+                   ts_rank(to_tsvector('{TS_CONFIG}', e.body), q) AS rank
+            FROM civil_app_searchentry e
+            JOIN civil_app_site s ON s.id = e.site_id,
+                 to_tsquery('{TS_CONFIG}', %s) q
+            WHERE to_tsvector('{TS_CONFIG}', e.body) @@ q{where}
+            ORDER BY rank DESC, e.date DESC
+            LIMIT %s OFFSET %s
+        """
+    else:
+        return _search_icontains(words, alias, bounds, offset, per_page)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, *params, per_page + 1, offset])
+        rows = [
+            {
+                "kind": kind, "id": ref_id, "site_id": site_id, "site": site,
+                "date": str(day), "text": body, "rank": round(rank, 4),
+            }
+            for kind, ref_id, site_id, site, day, body, rank in cursor.fetchall()
+        ]
+    return rows[:per_page], len(rows) > per_page
+
+
+def _search_icontains(words, alias, bounds, offset, per_page):
+    qs = SearchEntry.objects.using(alias).filter(**bounds).select_related("site")
+    for w in words:
+        qs = qs.filter(body__icontains=w)
+    rows = [
+        {
+            "kind": e.kind, "id": e.ref_id, "site_id": e.site_id, "site": e.site.name,
+            "date": str(e.date), "text": e.body, "rank": 0,
+        }
+        for e in qs.order_by("-date", "-id")[offset:offset + per_page + 1]
+    ]
+    return rows[:per_page], len(rows) > per_page
@@ -1,6 +1,13 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from .models import Site, Department, DefaultRate
+from .models import (
+    Site, Department, DefaultRate, OwnerCashEntry, OtherExpense,
+    CivilDailyWork, DepartmentWork, MaterialEntry, BillPayment,
+    CivilAdvance, SiteDailyNote, Team, TeamRate, Owner,
+    Agent, MaterialItem, ExpenseCategory,
+)
+from .owner_cash import invalidate_from
+from . import autocomplete, changes, ledger_cache, payables, search
 
 
 DEFAULT_DEPARTMENTS = [
@@ -27,3 +34,213 @@ def create_default_rate(sender, instance, created, **kwargs):
                 "is_locked": False
             }
         )
+
+
+# 🔥 The stored row before a save, read once and shared by every pre_save
+# receiver below; dropped again after the save (see the end of the module)
+_UNREAD = object()
+
+
+def _old_row(sender, instance):
+    if not instance.pk:
+        return None
+    old = instance.__dict__.get("_old_row", _UNREAD)
+    if old is _UNREAD:
+        old = instance._old_row = sender.objects.filter(pk=instance.pk).first()
+    return old
+
+
+def forget_old_row(sender, instance, **kwargs):
+    instance.__dict__.pop("_old_row", None)
+
+
+# 🔥 Owner cash snapshots go stale when a row in a closed month changes
+@receiver(pre_save, sender=OwnerCashEntry)
+@receiver(pre_save, sender=OtherExpense)
+def owner_cash_before_change(sender, instance, **kwargs):
+    old = _old_row(sender, instance)
+    if old:
+        invalidate_from(old.owner_id, old.date)
+
+
+@receiver(post_save, sender=OwnerCashEntry)
+@receiver(post_save, sender=OtherExpense)
+@receiver(post_delete, sender=OwnerCashEntry)
+@receiver(post_delete, sender=OtherExpense)
+def owner_cash_changed(sender, instance, **kwargs):
+    invalidate_from(instance.owner_id, instance.date)
+
+
+# 🔥 Payables move by the delta of every ledger / payment write
+def _contribution_before(sender, instance, contribution):
+    old = _old_row(sender, instance)
+    return contribution(old) if old else None
+
+
+@receiver(pre_save, sender=CivilDailyWork)
+@receiver(pre_save, sender=DepartmentWork)
+@receiver(pre_save, sender=MaterialEntry)
+@receiver(pre_save, sender=OtherExpense)
+def payable_before_change(sender, instance, **kwargs):
+    instance._payable_before = _contribution_before(sender, instance, payables.contribution)
+
+
+@receiver(post_save, sender=CivilDailyWork)
+@receiver(post_save, sender=DepartmentWork)
+@receiver(post_save, sender=MaterialEntry)
+@receiver(post_save, sender=OtherExpense)
+def payable_changed(sender, instance, **kwargs):
+    payables.apply_change(getattr(instance, "_payable_before", None), payables.contribution(instance))
+
+
+@receiver(post_delete, sender=CivilDailyWork)
+@receiver(post_delete, sender=DepartmentWork)
+@receiver(post_delete, sender=MaterialEntry)
+@receiver(post_delete, sender=OtherExpense)
+def payable_deleted(sender, instance, **kwargs):
+    payables.apply_change(payables.contribution(instance), None)
+
+
+@receiver(pre_save, sender=BillPayment)
+def payment_before_change(sender, instance, **kwargs):
+    instance._payable_before = _contribution_before(sender, instance, payables.payment_contribution)
+
+
+@receiver(post_save, sender=BillPayment)
+def payment_changed(sender, instance, **kwargs):
+    payables.apply_change(
+        getattr(instance, "_payable_before", None),
+        payables.payment_contribution(instance),
+        field="paid",
+    )
+
+
+@receiver(post_delete, sender=BillPayment)
+def payment_deleted(sender, instance, **kwargs):
+    payables.apply_change(payables.payment_contribution(instance), None, field="paid")
+
+
+# 🔥 Cached ledger computations: every ledger write retires its site / month tags
+LEDGER_MODELS = [
+    CivilDailyWork, CivilAdvance, DepartmentWork, MaterialEntry,
+    OtherExpense, SiteDailyNote, OwnerCashEntry,
+]
+MASTER_MODELS = [
+    Site, Team, TeamRate, Department, DefaultRate, Owner,
+    Agent, MaterialItem, ExpenseCategory, BillPayment,
+]
+
+
+# extra tags per model, for caches over one kind of row
+ROW_TAGS = {MaterialEntry: {"material"}}
+
+
+def _notify_row(row):
+    ledger_cache.notify(
+        site_id=getattr(row, "site_id", None),
+        day=row.date,
+        owner_id=getattr(row, "owner_id", None),
+        tags=ROW_TAGS.get(type(row), ()),
+    )
+
+
+def ledger_before_change(sender, instance, **kwargs):
+    # an edit can move a row to another site / date / owner
+    old = _old_row(sender, instance)
+    if old:
+        _notify_row(old)
+
+
+def ledger_changed(sender, instance, **kwargs):
+    _notify_row(instance)
+
+
+def master_changed(sender, instance, **kwargs):
+    ledger_cache.notify_masters()
+
+
+for model in LEDGER_MODELS:
+    pre_save.connect(ledger_before_change, sender=model)
+    post_save.connect(ledger_changed, sender=model)
+    post_delete.connect(ledger_changed, sender=model)
+
+for model in MASTER_MODELS:
+    post_save.connect(master_changed, sender=model)
+    post_delete.connect(master_changed, sender=model)
+
+
+# 🔥 Search index: materials, expenses and notes, plus renamed masters
+SEARCH_MODELS = [MaterialEntry, OtherExpense, SiteDailyNote]
+
+
+def search_changed(sender, instance, **kwargs):
+    search.index(instance)
+
+
+def search_deleted(sender, instance, **kwargs):
+    search.remove(instance)
+
+
+def search_master_changed(sender, instance, created, **kwargs):
+    if not created:
+        search.reindex_master(instance)
+
+
+for model in SEARCH_MODELS:
+    post_save.connect(search_changed, sender=model)
+    post_delete.connect(search_deleted, sender=model)
+
+for model in search.MASTER_ROWS:
+    post_save.connect(search_master_changed, sender=model)
+
+
+# 🔥 Autocomplete: usage counts move by the delta of every write
+def autocomplete_before_change(sender, instance, **kwargs):
+    instance._autocomplete_before = _contribution_before(sender, instance, autocomplete.contribution)
+
+
+def autocomplete_changed(sender, instance, **kwargs):
+    autocomplete.apply_change(
+        getattr(instance, "_autocomplete_before", None), autocomplete.contribution(instance)
+    )
+
+
+def autocomplete_deleted(sender, instance, **kwargs):
+    autocomplete.apply_change(autocomplete.contribution(instance), None)
+
+
+def autocomplete_master_changed(sender, instance, **kwargs):
+    autocomplete.master_changed(instance)
+
+
+def autocomplete_master_deleted(sender, instance, **kwargs):
+    autocomplete.master_changed(instance, deleted=True)
+
+
+for model in (MaterialEntry, OtherExpense):
+    pre_save.connect(autocomplete_before_change, sender=model)
+    post_save.connect(autocomplete_changed, sender=model)
+    post_delete.connect(autocomplete_deleted, sender=model)
+
+for model in autocomplete.MASTER_FIELDS:
+    post_save.connect(autocomplete_master_changed, sender=model)
+    post_delete.connect(autocomplete_master_deleted, sender=model)
+
+
+# 🔥 Change journal: one row per ledger insert / update / delete
+def journal_saved(sender, instance, created, **kwargs):
+    changes.record(instance, "i" if created else "u")
+
+
+def journal_deleted(sender, instance, **kwargs):
+    changes.record(instance, "d")
+
+
+for model in changes.KIND_MODELS.values():
+    post_save.connect(journal_saved, sender=model)
+    post_delete.connect(journal_deleted, sender=model)
+
+
+# every model whose pre_save receivers read _old_row
+for model in {OwnerCashEntry, BillPayment, *LEDGER_MODELS}:
+    post_save.connect(forget_old_row, sender=model)
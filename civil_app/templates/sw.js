@@ -0,0 +1,101 @@
+// Offline service worker, served from /sw.js by civil_app.views.sync.
+//
+// - static files: cached at install, served from cache
+// - site pages (/site/<id>/?date=...): network first, the last good copy
+//   when the network fails or stalls; saves made there wait in the
+//   IndexedDB queue of static/js/offline.js
+// - everything else: network only
+// The login page drops every cached page (the next user must not see them).
+
+const VERSION = "{{ version }}";
+const ASSETS = {{ assets|safe }};
+const STATIC_CACHE = "civil-static-" + VERSION;
+const PAGE_CACHE = "civil-pages";
+const CDN = ["https://cdn.tailwindcss.com", "https://fonts.googleapis.com", "https://fonts.gstatic.com"];
+const SITE_PAGE = /^\/site\/\d+\/$/;
+const NETWORK_WAIT = 6000; // ms before a stalled 2G request falls back to the cache
+
+
+self.addEventListener("install", event => {
+  event.waitUntil(
+    caches.open(STATIC_CACHE)
+      .then(cache => cache.addAll(ASSETS))
+      .then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener("activate", event => {
+  event.waitUntil(
+    caches.keys()
+      .then(keys => Promise.all(
+        keys.filter(k => k.startsWith("civil-static-") && k !== STATIC_CACHE)
+            .map(k => caches.delete(k))
+      ))
+      .then(() => self.clients.claim())
+  );
+});
+
+
+/* ================= STRATEGIES ================= */
+
+function cacheFirst(request, cacheName){
+  return caches.match(request).then(hit => hit || fetch(request).then(res => {
+    if (res.ok || res.type === "opaque"){
+      const copy = res.clone();
+      caches.open(cacheName).then(cache => cache.put(request, copy));
+    }
+    return res;
+  }));
+}
+
+function networkFirst(request){
+  const network = fetch(request).then(res => {
+    // a redirect here is the login page: never cache it as the site page
+    if (res.ok && !res.redirected){
+      const copy = res.clone();
+      caches.open(PAGE_CACHE).then(cache => cache.put(request, copy));
+    }
+    return res;
+  });
+
+  const stalled = new Promise(resolve => setTimeout(resolve, NETWORK_WAIT));
+  const cached = () => caches.match(request, {cacheName: PAGE_CACHE});
+
+  return Promise.race([network, stalled.then(cached)])
+    .then(res => res || network)
+    .catch(() => cached().then(res => res || offlinePage()));
+}
+
+function offlinePage(){
+  return new Response(
+    "<meta name=viewport content='width=device-width'>" +
+    "<p style='font:16px sans-serif;padding:2em'>You are offline and this day has not been " +
+    "opened on this phone yet. Open a day you have visited before; saves there are kept " +
+    "and sent when the connection is back.</p>",
+    {headers: {"Content-Type": "text/html; charset=utf-8"}}
+  );
+}
+
+
+/* ================= ROUTING ================= */
+
+self.addEventListener("fetch", event => {
+  const request = event.request;
+  if (request.method !== "GET") return;
+
+  const url = new URL(request.url);
+  const sameOrigin = url.origin === self.location.origin;
+
+  if (sameOrigin && request.mode === "navigate"){
+    if (SITE_PAGE.test(url.pathname)){
+      event.respondWith(networkFirst(request));
+    } else if (url.pathname === "/login/"){
+      event.waitUntil(caches.delete(PAGE_CACHE));
+    }
+    return;
+  }
+
+  if (sameOrigin ? ASSETS.includes(url.pathname) : CDN.includes(url.origin)){
+    event.respondWith(cacheFirst(request, STATIC_CACHE));
+  }
+});
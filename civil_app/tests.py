@@ -1,3 +1,1258 @@
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import closing
+from io import StringIO
+from unittest import mock
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, router
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db.models import Q, Sum
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from civil_project.middleware import brotli_compress
+
+from . import (
+    autocomplete, changes, day_import, db_router, ledger_archive, ledger_cache, ledger_queries,
+    ledger_snapshot, ledger_verify, owner_cash, payables, price_analytics, search,
+)
+from .labour_recompute import Recompute, team_periods
+from .views import sync as sync_views
+from .query_budget import fingerprint
+from .models import (
+    CivilAdvance, CivilDailyWork, DefaultRate, DepartmentWork,
+    MaterialEntry, OtherExpense, OwnerCashEntry,
+    ExpenseCategory, Owner, OwnerCashSnapshot, Site,
+    Agent, BillPayment, Department, Payable, Team, TeamRate,
+    LedgerChange, MaterialItem, SearchEntry, SiteDailyNote, SyncedEdit,
+)
+
+
+FROM_DATE = date(2026, 1, 1)
+TO_DATE = date(2026, 1, 31)
+
+
+# (query, index it was built for): the querysets come from ledger_queries, as
+# the views build them, with the aggregate the view adds
+INDEX_PLANS = [
+    # ================= DATE RANGE (all_bills) =================
+    (lambda: ledger_queries.civil_totals(FROM_DATE, TO_DATE), "cdw_date_team_total_idx"),
+    (lambda: ledger_queries.civil_advances(FROM_DATE, TO_DATE), "cadv_date_team_amount_idx"),
+    (lambda: ledger_queries.department_totals(FROM_DATE, TO_DATE), "dw_date_dept_idx"),
+    (lambda: ledger_queries.material_totals(FROM_DATE, TO_DATE), "mat_date_agent_idx"),
+    (lambda: ledger_queries.expense_totals(FROM_DATE, TO_DATE), "exp_date_category_idx"),
+    # ================= SINGLE BILL (bill_*_detail / bill_*_pdf) =================
+    (lambda: ledger_queries.team_bill(1, FROM_DATE, TO_DATE).annotate(total=Sum("total_amount")), "cdw_team_date_idx"),
+    (lambda: ledger_queries.team_bill_advances(1, FROM_DATE, TO_DATE).annotate(advance=Sum("amount")), "cadv_team_date_idx"),
+    (lambda: ledger_queries.department_bill(1, FROM_DATE, TO_DATE).annotate(total=Sum("total_amount")), "dw_dept_date_idx"),
+    (lambda: ledger_queries.agent_bill(1, FROM_DATE, TO_DATE).annotate(total_raw=Sum("total")), "mat_agent_date_idx"),
+    (lambda: ledger_queries.category_bill(1, FROM_DATE, TO_DATE).annotate(total=Sum("amount")), "exp_category_date_idx"),
+    # ================= SITE DAY (site_detail) =================
+    (lambda: ledger_queries.day_materials(1, FROM_DATE), "mat_site_date_idx"),
+    (lambda: ledger_queries.day_expenses(1, FROM_DATE), "exp_site_date_idx"),
+    # ================= OWNER (owner_cash_list, site_detail) =================
+    (lambda: ledger_queries.owner_sums(OwnerCashEntry, Q(owner_id=1)), "ocash_owner_date_amt_idx"),
+    (lambda: ledger_queries.owner_sums(OtherExpense, Q(owner_id=1)), "exp_owner_amount_idx"),
+    (lambda: ledger_queries.owner_cash_entries(), "ocash_date_idx"),
+]
+
+
+def _leading_fields(qs):
+    """What an index must start with to serve ``qs``: the equality-filtered
+    fields (any order), then the range-filtered ones, or the ordering when
+    nothing is filtered."""
+    lookups = [(child.lookup_name, child.lhs.target.name) for child in qs.query.where.children]
+    equal = {name for lookup, name in lookups if lookup == "exact"}
+    rest = [name for lookup, name in lookups if lookup != "exact"]
+    if not lookups:
+        rest = [f.lstrip("-") for f in qs.query.order_by if f.lstrip("-") != "id"]
+    return equal, rest
+
+
+class LedgerIndexPlanTests(TestCase):
+    """The hot ledger queries (civil_app.ledger_queries) against their indexes.
+
+    The index definitions are checked on any backend. The EXPLAIN runs on
+    the test database's backend: SQLite locally, Postgres when DATABASE_URL
+    points at one.
+    """
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # empty tables would otherwise always win a seq scan
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+
+    def test_indexes_lead_with_the_query_filters(self):
+        for build, index_name in INDEX_PLANS:
+            qs = build()
+            indexes = {index.name: index for index in qs.model._meta.indexes}
+            with self.subTest(index_name):
+                self.assertIn(index_name, indexes)
+                equal, rest = _leading_fields(qs)
+                fields = indexes[index_name].fields
+                self.assertTrue(equal or rest)
+                self.assertEqual(set(fields[:len(equal)]), equal)
+                self.assertEqual(fields[len(equal):len(equal) + len(rest)], rest)
+
+    def test_plans_use_the_index(self):
+        for build, index_name in INDEX_PLANS:
+            with self.subTest(index_name):
+                plan = build().explain()
+                self.assertIn(index_name, plan, msg=plan)
+
+
+class OwnerCashLedgerTests(TestCase):
+
+    def setUp(self):
+        self.owner = Owner.objects.create(name="Owner")
+        site = Site.objects.create(name="Site")
+        category = ExpenseCategory.resolve("Tea")
+        start = date.today().replace(day=1) - timedelta(days=120)
+
+        for i in range(40):
+            day = start + timedelta(days=i * 4)
+            OwnerCashEntry.objects.create(owner=self.owner, date=day, amount=100 + i)
+            OtherExpense.objects.create(
+                site=site, owner=self.owner, category=category,
+                date=day, amount=30 + i,
+            )
+
+        owner_cash.close_months(self.owner.id)
+
+    def expected_balances(self):
+        lines = [
+            (e.date, "in", e.id, e.amount)
+            for e in OwnerCashEntry.objects.filter(owner=self.owner)
+        ] + [
+            (e.date, "out", e.id, -e.amount)
+            for e in OtherExpense.objects.filter(owner=self.owner)
+        ]
+        balance = 0
+        expected = {}
+        for day, kind, pk, signed in sorted(lines):
+            balance += signed
+            expected[(day, kind, pk)] = balance
+        return expected
+
+    def test_running_balance_across_pages_matches_full_history(self):
+        self.assertTrue(OwnerCashSnapshot.objects.exists())
+
+        got = {}
+        cursor = None
+        while True:
+            rows, cursor = owner_cash.ledger_page(
+                self.owner.id,
+                before=owner_cash.parse_cursor(cursor),
+                limit=7,
+            )
+            for r in rows:
+                got[(r["date"], r["kind"], r["id"])] = r["balance"]
+            if not cursor:
+                break
+
+        self.assertEqual(got, self.expected_balances())
+
+    def test_backdated_entry_invalidates_snapshots(self):
+        first = OwnerCashSnapshot.objects.order_by("month").first()
+        OwnerCashEntry.objects.create(owner=self.owner, date=first.month, amount=5)
+
+        self.assertFalse(OwnerCashSnapshot.objects.filter(month__gte=first.month).exists())
+
+        owner_cash.close_months(self.owner.id)
+        balance = owner_cash.owner_balance(self.owner.id)["balance"]
+        self.assertEqual(balance, list(self.expected_balances().values())[-1])
+
+    def test_list_reads_balances_without_closing_months(self):
+        other = Owner.objects.create(name="Other")
+        OwnerCashEntry.objects.create(owner=other, date=date.today(), amount=40)
+        OwnerCashSnapshot.objects.order_by("-month").first().delete()  # last month still open
+        snapshots = OwnerCashSnapshot.objects.count()
+
+        self.client.force_login(User.objects.create_user("clerk", password="pw"))
+        response = self.client.get("/owners/cash/")
+
+        self.assertEqual(OwnerCashSnapshot.objects.count(), snapshots)
+        self.assertEqual(
+            {row["owner"].name: row["balance"] for row in response.context["summary"]},
+            {"Owner": owner_cash.owner_balance(self.owner.id)["balance"], "Other": 40},
+        )
+
+
+def silence_query_log(test):
+    """Seeding through site_detail trips the N+1 warnings; keep test output clean."""
+    log = logging.getLogger("civil_app.queries")
+    log.disabled = True
+    test.addCleanup(setattr, log, "disabled", False)
+
+
+class LedgerFixtures:
+    """The site / team / rate / material rows most ledger tests start from."""
+
+    def make_site_team(self, *rates, site="Site", team="Masons"):
+        """Sets self.site and self.team; ``rates`` are (mason, helper, days after FROM_DATE)."""
+        self.site = Site.objects.create(name=site)
+        self.team = Team.objects.create(name=team)
+        return [
+            TeamRate.objects.create(
+                team=self.team, mason_full_rate=mason, helper_full_rate=helper,
+                from_date=FROM_DATE + timedelta(days=days),
+            )
+            for mason, helper, days in rates
+        ]
+
+    def buy(self, day, agent, rate, qty=10, item="Cement"):
+        return MaterialEntry.objects.create(
+            site=self.site, date=day, agent=agent, item=MaterialItem.resolve(item),
+            quantity=qty, unit="bags", rate=rate, total=rate * qty,
+        )
+
+
+class PayablesTests(TestCase):
+
+    def setUp(self):
+        silence_query_log(self)
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(self.user)
+
+        self.site = Site.objects.create(name="Site")
+        self.team = Team.objects.create(name="Team")
+        TeamRate.objects.create(
+            team=self.team, mason_full_rate=800, helper_full_rate=600,
+            from_date=date(2020, 1, 1),
+        )
+
+    def save_day(self, day, **extra):
+        data = {
+            "date": day.isoformat(),
+            f"mason_full_{self.team.id}": "2",
+            f"helper_full_{self.team.id}": "1",
+            "agent_name_0": "Ravi",
+            "material_name_0": "Cement",
+            "material_qty_0": "10",
+            "material_rate_0": "400",
+            "material_advance_0": "500",
+            "expense_title_0": "Tea",
+            "expense_amount_0": "120",
+        }
+        data.update(extra)
+        self.client.post(f"/site/{self.site.id}/", data)
+
+    def test_blank_material_name_is_skipped(self):
+        day = date(2026, 2, 2)
+        self.save_day(day, material_name_0="   ", material_name_1="Sand", material_qty_1="2", material_rate_1="50")
+        self.assertEqual(list(MaterialEntry.objects.values_list("item__name", "total")), [("Sand", 100)])
+
+    def snapshot(self):
+        return {
+            (p.kind, p.ref_id): (round(p.billed, 2), round(p.paid, 2))
+            for p in Payable.objects.all()
+        }
+
+    def test_incremental_payables_match_full_rebuild(self):
+        day = date(2026, 2, 2)
+        self.save_day(day)
+        self.save_day(day, **{f"mason_full_{self.team.id}": "3", "material_qty_0": "4"})
+        self.save_day(day + timedelta(days=1))
+        self.client.get(
+            f"/site/{self.site.id}/copy-previous/",
+            {"date": (day + timedelta(days=2)).isoformat(), "civil": "1", "material": "1"},
+        )
+        self.client.get(f"/site/{self.site.id}/reset/date/", {"date": day.isoformat()})
+
+        agent = Agent.objects.get()
+        BillPayment.objects.create(bill_type="agent", reference=str(agent.id), amount=1000)
+
+        incremental = self.snapshot()
+        payables.rebuild()
+
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(
+            payables.outstanding("agent", agent.id),
+            sum(m.total - m.advance for m in MaterialEntry.objects.all()) - 1000,
+        )
+
+    def test_payment_form_reduces_outstanding(self):
+        self.save_day(date(2026, 2, 2))
+        before = payables.outstanding("team", self.team.id)
+
+        self.client.post("/bills/outstanding/", {
+            "bill_type": "team", "ref_id": self.team.id, "amount": "700",
+        })
+
+        self.assertEqual(payables.outstanding("team", self.team.id), before - 700)
+
+        self.client.force_login(User.objects.create_user("supervisor", password="pw", is_staff=True))
+        self.client.post("/bills/outstanding/", {
+            "bill_type": "team", "ref_id": self.team.id, "amount": "700",
+        })
+        self.assertEqual(payables.outstanding("team", self.team.id), before - 700)
+
+
+class QueryBudgetMixin:
+    """Fails a test when a view runs more queries than its ``@query_budget``."""
+
+    def assertWithinQueryBudget(self, url, data=None):
+        # budget the uncached path
+        cache.clear()
+        response = self.client.get(url, data)
+        stats = response.wsgi_request.query_stats
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(stats.budget)
+        self.assertFalse(stats.over_budget, msg=stats.report())
+        return stats
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    RANGE = {"from_date": "2026-01-01", "to_date": "2026-01-31"}
+
+    def setUp(self):
+        silence_query_log(self)
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(self.user)
+
+    def add_site(self):
+        n = Site.objects.count()
+        site = Site.objects.create(name=f"Site {n}")
+        team = Team.objects.create(name=f"Team {n}")
+        TeamRate.objects.create(
+            team=team, mason_full_rate=800, helper_full_rate=600,
+            from_date=date(2020, 1, 1),
+        )
+        for day in range(3):
+            self.client.post(f"/site/{site.id}/", {
+                "date": date(2026, 1, 5 + day).isoformat(),
+                f"mason_full_{team.id}": "2",
+                "agent_name_0": f"Agent {n}",
+                "material_name_0": f"Item {n}",
+                "material_qty_0": "3",
+                "material_rate_0": "10",
+                "expense_title_0": f"Expense {n}",
+                "expense_amount_0": "5",
+            })
+
+    def test_bounded_views_do_not_grow_with_data(self):
+        urls = [
+            ("/bills/", self.RANGE),
+            ("/api/bills/details/", self.RANGE),
+            ("/api/day-full/", {"date": "2026-01-05"}),
+            ("/bills/outstanding/", None),
+        ]
+
+        self.add_site()
+        small = [self.assertWithinQueryBudget(url, data).count for url, data in urls]
+
+        for _ in range(4):
+            self.add_site()
+        large = [self.assertWithinQueryBudget(url, data).count for url, data in urls]
+
+        self.assertEqual(small, large)
+
+    def test_single_bill_views_within_budget(self):
+        self.add_site()
+        for url in (
+            f"/api/bill/civil/{Team.objects.get().id}/",
+            f"/api/bill/department/{Department.objects.first().id}/",
+            f"/api/bill/material/{Agent.objects.get().id}/",
+            f"/api/bill/expense/{ExpenseCategory.objects.get().id}/",
+        ):
+            self.assertWithinQueryBudget(url, self.RANGE)
+
+    def test_repeated_query_shape_is_logged(self):
+        for _ in range(6):
+            self.add_site()
+
+        logging.getLogger("civil_app.queries").disabled = False
+        with self.assertLogs("civil_app.queries", level="WARNING") as logs:
+            self.client.get("/sites/")
+
+        self.assertIn("site_entry", logs.output[0])
+
+    def test_fingerprint_ignores_literals_and_in_list_length(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s) AND name = 'y'"),
+        )
+
+
+class ScaleDataTests(TestCase):
+
+    def generate(self, **extra):
+        call_command(
+            "generate_scale_data", sites=3, teams=4, days=40,
+            end=date(2026, 3, 1), stdout=StringIO(), **extra,
+        )
+        return list(
+            CivilDailyWork.objects.order_by("site__name", "team__name", "date")
+            .values_list("site__name", "team__name", "date", "total_amount")
+        )
+
+    def test_same_seed_regenerates_same_data(self):
+        first = self.generate()
+        self.assertTrue(first)
+        self.assertEqual(first, self.generate(flush=True))
+        self.assertEqual(Site.objects.count(), 3)
+
+
+class BillDetailsApiTests(TestCase):
+    """The batch bill / day APIs against the per-bill and per-day answers they replace."""
+
+    RANGE = {"from_date": "2026-01-01", "to_date": "2026-01-31"}
+
+    def setUp(self):
+        silence_query_log(self)
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        call_command(
+            "generate_scale_data", sites=3, teams=4, days=40,
+            end=date(2026, 2, 1), stdout=StringIO(),
+        )
+
+    def rounded(self, bill):
+        rows = sorted(
+            ({k: round(v, 2) if isinstance(v, float) else v for k, v in row.items()} for row in bill["rows"]),
+            key=lambda row: (row["site__name"], row.get("site__owner__name", "")),
+        )
+        return rows, {k: round(v, 2) for k, v in bill["team_total"].items()}
+
+    def test_bill_details_match_the_single_bill_apis(self):
+        details = self.client.get("/api/bills/details/", self.RANGE).json()
+
+        for kind, url in [
+            ("civil", "/api/bill/civil/{}/"),
+            ("dept", "/api/bill/department/{}/"),
+            ("material", "/api/bill/material/{}/"),
+            ("expense", "/api/bill/expense/{}/"),
+        ]:
+            self.assertTrue(details[kind], kind)
+            for ref_id, bill in details[kind].items():
+                if ref_id == "None":
+                    continue  # material without an agent: on no single bill
+                single = self.client.get(url.format(ref_id), self.RANGE).json()
+                self.assertEqual(self.rounded(bill), self.rounded(single), f"{kind} {ref_id}")
+
+    def test_day_range_matches_single_days(self):
+        month = self.client.get("/api/day-full/", self.RANGE).json()
+        self.assertEqual(month["sites"], month["days"].get("2026-01-01", []))
+
+        for day in (date(2026, 1, 1) + timedelta(days=n) for n in range(31)):
+            single = self.client.get("/api/day-full/", {"date": day.isoformat()}).json()
+            self.assertEqual(month["days"].get(day.isoformat(), []), single["sites"])
+        self.assertGreater(len(month["days"]), 20)
+
+    def test_day_range_is_capped(self):
+        response = self.client.get("/api/day-full/", {"from_date": "2026-01-01", "to_date": "2026-02-01"})
+        self.assertEqual(response.status_code, 400)
+
+
+class LedgerCacheTests(TestCase):
+
+    def setUp(self):
+        silence_query_log(self)
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(self.user)
+        cache.clear()
+
+        # run the masters' invalidation now so it does not land mid-test
+        with self.captureOnCommitCallbacks(execute=True):
+            self.site = Site.objects.create(name="Site")
+            self.team = Team.objects.create(name="Team")
+            TeamRate.objects.create(
+                team=self.team, mason_full_rate=800, helper_full_rate=600,
+                from_date=date(2020, 1, 1),
+            )
+
+    def add_work(self, day):
+        with self.captureOnCommitCallbacks(execute=True):
+            CivilDailyWork.objects.create(
+                site=self.site, team=self.team, date=day, total_amount=100,
+            )
+
+    def test_site_detail_save_refreshes_cached_bill_details(self):
+        params = {"from_date": "2026-01-01", "to_date": "2026-01-31"}
+        before = self.client.get("/api/bills/details/", params).json()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/site/{self.site.id}/", {
+                "date": "2026-01-10", f"mason_full_{self.team.id}": "2",
+            })
+
+        after = self.client.get("/api/bills/details/", params).json()
+        self.assertEqual(before["civil"], {})
+        self.assertEqual(after["civil"][str(self.team.id)]["team_total"]["grand_total"], 1600)
+
+    def test_write_only_retires_entries_for_its_months(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return len(calls)
+
+        def january():
+            return ledger_cache.cached(
+                "test", "jan", compute, start=date(2026, 1, 1), end=date(2026, 1, 31),
+            )
+
+        self.assertEqual(january(), 1)
+        self.add_work(date(2026, 2, 3))
+        self.assertEqual(january(), 1)
+        self.add_work(date(2026, 1, 3))
+        self.assertEqual(january(), 2)
+
+    def test_write_in_one_worker_retires_entry_in_another(self):
+        workers = [LocMemCache(f"worker-{i}", {}) for i in range(2)]
+
+        def lookup(worker):
+            with mock.patch.object(ledger_cache, "cache", worker):
+                return ledger_cache.cached(
+                    "test", "all", lambda: CivilDailyWork.objects.count(),
+                )
+
+        self.assertEqual([lookup(w) for w in workers], [0, 0])
+
+        # the write is handled by worker 0; worker 1 still holds its local entry
+        with mock.patch.object(ledger_cache, "cache", workers[0]):
+            self.add_work(date(2026, 1, 3))
+
+        self.assertEqual(lookup(workers[1]), 1)
+
+
+class SQLiteTuningTests(TestCase):
+
+    def test_connection_init_applies_pragmas(self):
+        options = settings.DATABASES["default"].get("OPTIONS", {})
+        if connection.vendor != "sqlite" or not options.get("init_command"):
+            self.skipTest("SQLite tuning is off")
+
+        with connection.cursor() as cursor:
+            for pragma in ("synchronous", "cache_size", "busy_timeout"):
+                if pragma not in settings.SQLITE_PRAGMAS:
+                    continue
+                cursor.execute(f"PRAGMA {pragma}")
+                value = cursor.fetchone()[0]
+                expected = settings.SQLITE_PRAGMAS[pragma]
+                self.assertEqual(value, 1 if expected == "NORMAL" else expected)
+
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+
+
+class AsyncServingTests(TestCase):
+
+    def setUp(self):
+        silence_query_log(self)
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.site = Site.objects.create(name="Site")
+        self.team = Team.objects.create(name="Team")
+        CivilDailyWork.objects.create(
+            site=self.site, team=self.team, date=date(2026, 1, 5),
+            mason_full=2, total_amount=1600,
+        )
+
+    async def test_bill_api_runs_async_through_the_middleware(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(
+            f"/api/bill/civil/{self.team.id}/",
+            {"from_date": "2026-01-01", "to_date": "2026-01-31"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["team_total"]["grand_total"], 1600)
+        stats = response.asgi_request.query_stats
+        self.assertEqual(stats.view_name, "bill_civil_detail")
+        self.assertGreater(stats.count, 0)
+
+    def test_saturated_pdf_renderer_answers_503(self):
+        self.client.force_login(self.user)
+        busy = mock.Mock(**{"acquire.return_value": False})
+
+        with mock.patch("civil_app.utils.pdf._slots", busy):
+            response = self.client.get(
+                "/bills/all/pdf/", {"from_date": "2026-01-01", "to_date": "2026-01-31"},
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "5")
+
+
+class ReadReplicaRouterTests(TestCase):
+
+    def test_read_only_views_read_from_replica_and_write_to_primary(self):
+        @db_router.read_only
+        def view(request):
+            return router.db_for_read(Site), router.db_for_write(Site)
+
+        with mock.patch.object(db_router, "replica_alias", return_value="replica"):
+            self.assertEqual(view(None), ("replica", "default"))
+        self.assertEqual(router.db_for_read(Site), "default")
+
+        # no replica configured / reachable: the primary
+        with mock.patch.object(db_router, "replica_alias", return_value=None):
+            self.assertEqual(view(None), ("default", "default"))
+
+    def test_snapshot_copies_primary_file(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        primary, replica = os.path.join(tmp, "primary.sqlite3"), os.path.join(tmp, "replica.sqlite3")
+
+        with closing(sqlite3.connect(primary)) as db, db:
+            db.execute("CREATE TABLE t (n INTEGER)")
+            db.execute("INSERT INTO t VALUES (1), (2)")
+        db_router.snapshot_sqlite(primary, replica)
+
+        with closing(sqlite3.connect(replica)) as db:
+            self.assertEqual(db.execute("SELECT SUM(n) FROM t").fetchone()[0], 3)
+
+
+class StaticBundleTests(TestCase):
+
+    def test_pages_link_bundles_instead_of_inline_blocks(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(user)
+        site = Site.objects.create(name="Site")
+
+        html = self.client.get(f"/site/{site.id}/").content.decode()
+
+        self.assertNotIn("<style", html)
+        self.assertNotIn("<script>", html)
+        self.assertIn("/static/css/site_detail.css", html)
+        self.assertIn("/static/js/site_detail.js", html)
+
+    def test_bundles_hold_no_template_syntax(self):
+        # template tags would reach the browser verbatim from a static file
+        for folder in ("css", "js"):
+            root = settings.BASE_DIR / "static" / folder
+            for path in root.iterdir():
+                text = path.read_text()
+                self.assertNotIn("{{", text, path.name)
+                self.assertNotIn("{%", text, path.name)
+
+
+class CompressionMiddlewareTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(user)
+
+    def get(self, accept):
+        with self.settings(MIDDLEWARE=[*settings.MIDDLEWARE, "civil_project.middleware.CompressionMiddleware"]):
+            return self.client.get("/sites/", HTTP_ACCEPT_ENCODING=accept)
+
+    def test_brotli_when_accepted(self):
+        import brotli
+
+        response = self.get("gzip, deflate, br")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertIn(b"<html", brotli.decompress(response.content).lower())
+
+    def test_brotli_length_is_padded(self):
+        import brotli
+
+        page = self.get("").content
+        bodies = [brotli_compress(page, 5, 100) for _ in range(8)]
+
+        self.assertGreater(len({len(body) for body in bodies}), 1)
+        self.assertEqual({brotli.decompress(body) for body in bodies}, {page})
+
+    def test_gzip_otherwise(self):
+        self.assertEqual(self.get("gzip")["Content-Encoding"], "gzip")
+        self.assertFalse(self.get("").has_header("Content-Encoding"))
+
+
+class SearchTests(LedgerFixtures, TestCase):
+
+    def setUp(self):
+        self.make_site_team()
+        self.cement = self.buy(FROM_DATE, Agent.resolve("Sharma Traders"), 400, qty=20)
+        OtherExpense.objects.create(
+            site=self.site, date=TO_DATE, category=ExpenseCategory.resolve("Diesel"),
+            amount=500, notes="generator",
+        )
+        SiteDailyNote.objects.create(site=self.site, date=TO_DATE, description="Cement slab poured")
+
+    def test_ranked_prefix_matches_across_kinds(self):
+        rows, has_next = search.search("cem")
+
+        self.assertEqual({r["kind"] for r in rows}, {"material", "note"})
+        self.assertFalse(has_next)
+
+        rows, _ = search.search("cement 20 sharma")
+        self.assertEqual([(r["kind"], r["id"]) for r in rows], [("material", self.cement.id)])
+
+        rows, _ = search.search("cement", from_date=TO_DATE)
+        self.assertEqual([r["kind"] for r in rows], ["note"])
+
+    def test_index_follows_writes_and_master_renames(self):
+        agent = self.cement.agent
+        agent.name = "Verma Suppliers"
+        agent.save()
+        self.assertEqual(len(search.search("verma")[0]), 1)
+        self.assertEqual(search.search("sharma")[0], [])
+
+        self.cement.delete()
+        self.assertEqual(SearchEntry.objects.filter(kind="material").count(), 0)
+        self.assertEqual(search.search("verma")[0], [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(search.search('"cement* OR ( NEAR')[0], [])
+        self.assertEqual(search.search("   ")[0], [])
+
+    def test_api_pages(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        for i in range(25):
+            SiteDailyNote.objects.create(site=self.site, date=FROM_DATE + timedelta(days=i + 1), description="cement")
+
+        first = self.client.get("/api/search/", {"q": "cement"}).json()
+        second = self.client.get("/api/search/", {"q": "cement", "page": 2}).json()
+
+        self.assertEqual(len(first["results"]), search.PAGE_SIZE)
+        self.assertTrue(first["has_next"])
+        self.assertEqual(len(second["results"]), 27 - search.PAGE_SIZE)
+        self.assertFalse(second["has_next"])
+
+
+class AutocompleteTests(TestCase):
+
+    def setUp(self):
+        autocomplete.reset()
+        self.addCleanup(autocomplete.reset)
+        self.site = Site.objects.create(name="Site")
+
+    def material(self, item, day, agent="", unit="bags"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return MaterialEntry.objects.create(
+                site=self.site, date=day, agent=Agent.resolve(agent), item=MaterialItem.resolve(item),
+                quantity=1, unit=unit, rate=1, total=1,
+            )
+
+    def values(self, field, q):
+        return [s.value for s in autocomplete.complete(field, q)]
+
+    def test_ranked_by_use_and_recency(self):
+        today = date.today()
+        for i in range(3):
+            self.material("Cement OPC", today - timedelta(days=365 + i))
+        self.material("Cement PPC", today - timedelta(days=1))
+
+        # one use yesterday beats three a year ago
+        self.assertEqual(self.values("material", "cem"), ["Cement PPC", "Cement OPC"])
+        # any word of the name matches
+        self.assertEqual(self.values("material", "opc"), ["Cement OPC"])
+        self.assertEqual(self.values("unit", "ba"), ["bags"])
+
+    def test_updates_without_rebuilding(self):
+        self.assertEqual(self.values("agent", "sh"), [])
+        self.assertEqual(self.values("unit", "to"), [])
+        with mock.patch.object(autocomplete, "build", side_effect=AssertionError("rebuilt")):
+            row = self.material("Sand", TO_DATE, agent="Sharma Traders", unit="Tonne")
+            self.assertEqual(self.values("agent", "sh"), ["Sharma Traders"])
+            self.assertEqual(self.values("unit", "to"), ["Tonne"])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                row.agent.name = "Sharma & Sons"
+                row.agent.save()
+            self.assertEqual(self.values("agent", "sh"), ["Sharma & Sons"])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                row.delete()
+            self.assertEqual(autocomplete.complete("unit", "to")[0].count, 0)
+
+    def test_update_reads_old_row_once(self):
+        row = self.material("Sand", TO_DATE, unit="Tonne")
+        table = MaterialEntry._meta.db_table
+        for unit in ("Bags", "Kg"):
+            row.unit = unit
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                row.save()
+            reads = [q["sql"] for q in queries if q["sql"].startswith("SELECT") and f'FROM "{table}"' in q["sql"]]
+            self.assertEqual(len(reads), 1, reads)
+        # the second save saw "Bags" as the old row, not the first save's "Tonne"
+        self.assertEqual([(s.value, s.count) for s in autocomplete.complete("unit", "")], [("Kg", 1)])
+
+    def test_api(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        self.material("Cement", TO_DATE)
+
+        response = self.client.get("/api/autocomplete/", {"field": "material", "q": "CEM"})
+        self.assertEqual(response.json()["results"][0]["value"], "Cement")
+        self.assertEqual(self.client.get("/api/autocomplete/", {"field": "site"}).status_code, 400)
+
+
+class PriceAnalyticsTests(LedgerFixtures, TestCase):
+
+    def setUp(self):
+        price_analytics.reset()
+        self.addCleanup(price_analytics.reset)
+
+        self.make_site_team()
+        self.cement = MaterialItem.resolve("Cement")
+        self.cheap, self.dear = Agent.resolve("Cheap"), Agent.resolve("Dear")
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(20):
+                self.buy(FROM_DATE + timedelta(days=i), self.cheap, 400 + i % 3)
+                self.buy(FROM_DATE + timedelta(days=i), self.dear, 420 + i % 3)
+
+    def test_item_history(self):
+        spike = self.buy(FROM_DATE + timedelta(days=5), self.dear, 900, qty=1)
+
+        h = price_analytics.item_history(self.cement.id, FROM_DATE, TO_DATE, window=7)
+
+        self.assertEqual(h["purchases"], 41)
+        self.assertEqual([a["agent"] for a in h["agents"]], ["Cheap", "Dear"])
+        self.assertLess(h["agents"][0]["vs_item_pct"], 0)
+        self.assertEqual([o["id"] for o in h["outliers"]], [spike.id])
+        # days 21-31 have no purchases: the 7-day window runs dry on day 27
+        self.assertEqual(len(h["series"]), 26)
+        first = h["series"][0]
+        self.assertAlmostEqual(first["rate"], (400 * 10 + 420 * 10) / 20)
+
+    def test_columns_reload_on_material_writes_only(self):
+        before = price_analytics.table()
+        self.assertIs(price_analytics.table(), before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CivilAdvance.objects.create(site=self.site, team=self.team, date=FROM_DATE, amount=5)
+        self.assertIs(price_analytics.table(), before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.buy(TO_DATE, self.cheap, 500)
+        self.assertEqual(price_analytics.table().id.size, before.id.size + 1)
+
+    def test_overview_api(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+
+        response = self.client.get("/api/material-prices/", {
+            "from_date": FROM_DATE.isoformat(), "to_date": TO_DATE.isoformat(), "window": 10,
+        })
+
+        [row] = response.json()["items"]
+        self.assertEqual(row["item"], "Cement")
+        self.assertEqual(row["purchases"], 40)
+        self.assertEqual(row["outliers"], 0)
+        self.assertEqual(row["recent_avg_rate"], None)  # nothing after Jan 20
+
+
+class PivotSnapshotTests(LedgerFixtures, TestCase):
+
+    def setUp(self):
+        ledger_snapshot.reset()
+        self.addCleanup(ledger_snapshot.reset)
+
+        self.make_site_team(site="North")
+        self.south = Site.objects.create(name="South")
+        with self.captureOnCommitCallbacks(execute=True):
+            for site, day, amount in [
+                (self.site, FROM_DATE, 100), (self.site, FROM_DATE + timedelta(days=40), 50),
+                (self.south, FROM_DATE, 30),
+            ]:
+                CivilAdvance.objects.create(site=site, team=self.team, date=day, amount=amount)
+
+    def test_team_by_site(self):
+        p = ledger_snapshot.pivot("team", "site", kinds=["advance"])
+
+        self.assertEqual(p["rows"]["labels"], ["Masons"])
+        self.assertEqual(p["cols"]["labels"], ["North", "South"])
+        self.assertEqual(p["values"], [[150, 30]])
+        self.assertEqual(p["total"], 180)
+
+        by_month = ledger_snapshot.pivot("month", measure="count")
+        self.assertEqual(by_month["rows"]["labels"], ["2026-01", "2026-02"])
+        self.assertEqual(by_month["values"], [2, 1])
+
+    def test_refresh_replays_journal(self):
+        before = ledger_snapshot.snapshot().lines.copy()
+        with self.assertNumQueries(2):
+            self.assertTrue((ledger_snapshot.snapshot().lines == before).all())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            advance = CivilAdvance.objects.create(site=self.south, team=self.team, date=TO_DATE, amount=20)
+        self.assertEqual(ledger_snapshot.pivot("site")["values"], [150, 50])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            advance.amount = 70
+            advance.save()
+        self.assertEqual(ledger_snapshot.pivot("site")["values"], [150, 100])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            advance.delete()
+        self.assertEqual(ledger_snapshot.pivot("site")["values"], [150, 30])
+
+    def test_api_rejects_unknown_dimension(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+
+        self.assertEqual(self.client.get("/api/pivot/", {"rows": "colour"}).status_code, 400)
+        response = self.client.get("/api/pivot/", {"rows": "site", "kind": "advance", "site": self.site.id})
+        self.assertEqual(response.json()["values"], [150])
+
+
+class LedgerArchiveTests(LedgerFixtures, TestCase):
+
+    def test_round_trip_keeps_ids_and_nulls(self):
+        self.make_site_team()
+        advance = CivilAdvance.objects.create(site=self.site, team=self.team, date=FROM_DATE, amount=75, remarks="ok")
+        material = MaterialEntry.objects.create(
+            site=self.site, date=TO_DATE, item=MaterialItem.resolve("Sand"),
+            quantity=2, unit="unit", rate=3000, total=6000,
+        )
+        payment = BillPayment.objects.create(bill_type="team", reference=str(self.team.id), amount=20)
+        BillPayment.objects.filter(pk=payment.pk).update(paid_on=FROM_DATE)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ledger.npz")
+            call_command("export_ledger", path, stdout=StringIO())
+            with self.assertRaises(ledger_archive.ArchiveError):
+                ledger_archive.restore(path)
+
+            CivilAdvance.objects.all().delete()
+            # a site missing from the archive, with a search entry pointing at it
+            later = Site.objects.create(name="Later")
+            OtherExpense.objects.create(site=later, date=TO_DATE, category=ExpenseCategory.resolve("Tea"), amount=10)
+            # the commit comes before search.rebuild(): nothing may still point at the dropped site
+            with mock.patch.object(search, "rebuild", return_value=0):
+                ledger_archive.restore(path, flush=True)
+            connection.check_constraints()
+            search.rebuild()
+
+        restored = CivilAdvance.objects.get()
+        self.assertEqual((restored.pk, restored.site_id, restored.team_id), (advance.pk, self.site.pk, self.team.pk))
+        self.assertEqual((restored.date, restored.amount, restored.remarks), (FROM_DATE, 75, "ok"))
+        self.assertIsNone(MaterialEntry.objects.get(pk=material.pk).agent_id)
+        self.assertEqual(BillPayment.objects.get().paid_on, FROM_DATE)
+        self.assertEqual(Payable.objects.get(kind="team").paid, 20)
+        self.assertGreater(CivilAdvance.objects.create(site=self.site, team=self.team, date=TO_DATE).pk, advance.pk)
+        self.assertFalse(Site.objects.filter(name="Later").exists())
+        self.assertEqual(SearchEntry.objects.count(), 1)
+
+
+class DayImportTests(LedgerFixtures, TestCase):
+
+    def setUp(self):
+        self.make_site_team((800, 500, 0), (900, 600, 10), site="North Block")
+
+    def test_civil_rows_use_the_rate_of_their_date(self):
+        sheet = StringIO(
+            "Site,Team,Date,Mason Full,Helper Full,Mason Half,Helper Half,Advance\n"
+            "north block,Masons,2026-01-02,2,1,0,0,100\n"
+            "North Block,Masons,15/01/2026,1,0,0,2,\n"
+            "North Block,Masons,2026-01-02,3,1,0,0,100\n"  # same day again: replaces the first
+            "Nowhere,Masons,2026-01-03,1,0,0,0,\n"
+            "North Block,Masons,2026-01-04,x,0,0,0,\n"
+        )
+        result = day_import.import_csv("civil", sheet, chunk_size=2)
+
+        self.assertEqual((result.rows, result.error_count), (5, 2))
+        self.assertEqual([line for line, _ in result.errors], [5, 6])
+        early, late = CivilDailyWork.objects.order_by("date")
+        self.assertEqual((early.mason_full, early.labour_amount, early.total_amount), (3, 2900, 2800))
+        self.assertEqual(late.labour_amount, 900 + 600)
+        self.assertEqual(CivilAdvance.objects.get().amount, 100)
+        self.assertEqual(Payable.objects.get(kind="team", ref_id=self.team.id).billed, 2800 + 1500)
+
+    def test_upload_materials(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        upload = SimpleUploadedFile("m.csv", (
+            "\ufeffsite,date,item,quantity,unit,rate,agent\n"
+            "North Block,2026-01-05,Cement,10,bags,400,Ravi Traders\n"
+        ).encode())
+
+        response = self.client.post("/api/import/material/", {"file": upload})
+
+        self.assertEqual(response.json()["written"], 1)
+        entry = MaterialEntry.objects.select_related("agent", "item").get()
+        self.assertEqual((entry.item.name, entry.agent.name, entry.total), ("Cement", "Ravi Traders", 4000))
+        self.assertEqual(search.search("ravi")[0][0]["id"], entry.id)
+        self.assertEqual(self.client.post("/api/import/bricks/", {"file": upload}).status_code, 400)
+
+
+class LabourRecomputeTests(LedgerFixtures, TestCase):
+
+    def setUp(self):
+        self.old, self.new = self.make_site_team((800, 500, 0), (900, 500, 10))
+        # entered at the old rate, with a 100 advance netted into the total
+        self.early = CivilDailyWork.objects.create(
+            site=self.site, team=self.team, date=FROM_DATE, mason_full=2, helper_half=1,
+            labour_amount=1850, total_amount=1750,
+        )
+        self.late = CivilDailyWork.objects.create(
+            site=self.site, team=self.team, date=FROM_DATE + timedelta(days=12), mason_full=1,
+            labour_amount=800, total_amount=800,
+        )
+
+    def test_team_periods_follow_get_team_rate(self):
+        locked = TeamRate.objects.create(team=self.team, mason_full_rate=1, helper_full_rate=1, from_date=FROM_DATE + timedelta(days=5), is_locked=True)
+        periods = team_periods(TeamRate.objects.filter(team=self.team))
+
+        self.assertEqual(
+            [(start, end, rate.pk) for start, end, rate in periods],
+            [(FROM_DATE, FROM_DATE + timedelta(days=5), self.old.pk), (FROM_DATE + timedelta(days=5), None, locked.pk)],
+        )
+
+    def test_dry_run_then_apply(self):
+        diff = Recompute.for_teams(self.team.id).preview()
+        self.assertEqual([(r["id"], r["new_labour"], r["new_total"]) for r in diff["sample"]], [(self.late.id, 900, 900)])
+        self.late.refresh_from_db()
+        self.assertEqual(self.late.labour_amount, 800)
+
+        TeamRate.objects.filter(pk=self.old.pk).update(mason_full_rate=850)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Recompute.for_teams(self.team.id).apply(), 2)
+
+        self.early.refresh_from_db()
+        self.assertEqual((self.early.labour_amount, self.early.total_amount), (1950, 1850))
+        self.assertEqual(Payable.objects.get(kind="team").billed, 1850 + 900)
+        self.assertEqual(LedgerChange.objects.filter(op="u", kind="civil").count(), 2)
+        self.assertEqual(Recompute.for_teams().preview()["rows"], 0)
+
+    def test_truncated_wages_are_not_a_change(self):
+        TeamRate.objects.filter(pk=self.old.pk).update(mason_full_rate=775)
+        # 775 x 2 + 775 / 2 + 500 / 2 = 2187.5, stored as the save path does
+        CivilDailyWork.objects.filter(pk=self.early.pk).update(mason_half=1, labour_amount=2187, total_amount=2087.5)
+
+        self.assertEqual(Recompute.for_teams(self.team.id).preview()["rows"], 1)  # only the late row
+        Recompute.for_teams(self.team.id).apply()
+        self.early.refresh_from_db()
+        self.assertEqual((self.early.labour_amount, self.early.total_amount), (2187, 2087.5))
+        self.assertEqual(Recompute.for_teams(self.team.id).apply(), 0)
+
+    def test_rate_edit_can_reprice_entered_days(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        response = self.client.post("/masters/recompute-labour/", {"kind": "department"})
+        self.assertEqual(response.status_code, 400)
+
+        self.client.post("/masters/", {
+            "action": "update_team", "rate_id": self.new.id, "mason": "950", "helper": "500", "reprice": "1",
+        })
+        self.late.refresh_from_db()
+        self.early.refresh_from_db()
+        self.assertEqual((self.late.labour_amount, self.early.labour_amount), (950, 1850))
+
+    def test_department_old_rate_keeps_typed_rates(self):
+        electrical, _ = Department.objects.get_or_create(name="Electrical")
+        DefaultRate.objects.filter(department=electrical).update(full_day_rate=700)
+        for rate, site in ((600, self.site), (650, Site.objects.create(name="Other"))):
+            DepartmentWork.objects.create(
+                site=site, department=electrical, date=FROM_DATE, full_day_count=1, half_day_count=1,
+                full_day_rate=rate, half_day_rate=rate // 2, labour_amount=rate * 1.5, total_amount=rate * 1.5,
+            )
+
+        Recompute.for_departments(600, department_id=electrical.id).apply()
+
+        self.assertEqual(
+            sorted(DepartmentWork.objects.values_list("full_day_rate", "half_day_rate", "labour_amount")),
+            [(650, 325, 975), (700, 350, 1050)],
+        )
+
+
+class LedgerVerifyTests(LedgerFixtures, TestCase):
+
+    def setUp(self):
+        self.make_site_team((800, 500, 0), (900, 500, 1))
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+
+    def test_copy_previous_day_reprices(self):
+        CivilDailyWork.objects.create(
+            site=self.site, team=self.team, date=FROM_DATE, mason_full=2,
+            labour_amount=1600, total_amount=1500,
+        )
+        CivilAdvance.objects.create(site=self.site, team=self.team, date=FROM_DATE, amount=100)
+
+        self.client.get(f"/site/{self.site.id}/copy-previous/", {"date": (FROM_DATE + timedelta(days=1)).isoformat(), "civil": "1"})
+
+        copied = CivilDailyWork.objects.get(date=FROM_DATE + timedelta(days=1))
+        self.assertEqual((copied.labour_amount, copied.total_amount), (1800, 1800))
+        self.assertEqual(ledger_verify.mismatches(ledger_verify.check_civil()), [])
+
+    def test_reports_and_fixes_drift(self):
+        dept, _ = Department.objects.get_or_create(name="Electrical")
+        work = DepartmentWork.objects.create(
+            site=self.site, department=dept, date=FROM_DATE, full_day_count=1, half_day_count=1,
+            full_day_rate=800, half_day_rate=350, labour_amount=1200, total_amount=1200,
+        )
+        civil = CivilDailyWork.objects.create(
+            site=self.site, team=self.team, date=FROM_DATE + timedelta(days=3), mason_full=1,
+            labour_amount=800, total_amount=800,
+        )
+
+        check = ledger_verify.check_department()
+        self.assertEqual(
+            [(m["id"], m["field"], m["expected"]) for m in ledger_verify.mismatches(check)],
+            [(work.id, "half_day_rate", 400)],
+        )
+        check = ledger_verify.check_civil()
+        self.assertEqual(
+            [(m["field"], m["stored"], m["expected"]) for m in ledger_verify.mismatches(check)],
+            [("labour_amount", 800, 900), ("total_amount", 800, 900)],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ledger_verify.fix(check), 1)
+        civil.refresh_from_db()
+        self.assertEqual((civil.labour_amount, civil.total_amount), (900, 900))
+        self.assertEqual(Payable.objects.get(kind="team").billed, 900)
+        self.assertEqual(ledger_verify.check_civil().bad.sum(), 0)
+
+    def test_floored_wages_and_large_ids_check_clean(self):
+        # under a fixed 23-bit packing (2**30, far team) and (2**30 + 1, team) share a key
+        far = Team.objects.create(id=self.team.id + 2 ** 23, name="Far")
+        TeamRate.objects.create(team=far, mason_full_rate=801, helper_full_rate=500, from_date=FROM_DATE)
+        site = Site.objects.create(id=2 ** 30, name="Site A")
+        other = Site.objects.create(id=2 ** 30 + 1, name="Site B")
+        CivilAdvance.objects.create(site=other, team=self.team, date=FROM_DATE, amount=75)
+        CivilDailyWork.objects.create(
+            site=site, team=far, date=FROM_DATE, mason_half=1,
+            labour_amount=400, total_amount=400.5,
+        )
+        dept, _ = Department.objects.get_or_create(name="Electrical")
+        DepartmentWork.objects.create(
+            site=site, department=dept, date=FROM_DATE, full_day_count=1, half_day_count=1,
+            full_day_rate=801, half_day_rate=400, labour_amount=1201, total_amount=1201.5,
+        )
+
+        self.assertEqual(ledger_verify.mismatches(ledger_verify.check_civil()), [])
+        self.assertEqual(ledger_verify.mismatches(ledger_verify.check_department()), [])
+
+
+class ChangeFeedTests(LedgerFixtures, TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("clerk", password="pw"))
+        self.make_site_team()
+
+    def feed(self, **params):
+        response = self.client.get("/api/changes/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_batches_collapse_to_latest_rows(self):
+        start = self.feed()
+        self.assertTrue(start["reset"])
+
+        kept = CivilAdvance.objects.create(site=self.site, team=self.team, date=FROM_DATE, amount=10)
+        kept.amount = 25
+        kept.save()
+        gone = CivilAdvance.objects.create(site=self.site, team=self.team, date=TO_DATE, amount=5).id
+        CivilAdvance.objects.get(id=gone).delete()
+
+        batch = self.feed(since=start["cursor"], epoch=start["epoch"], limit=3)
+        self.assertFalse(batch["reset"])
+        self.assertTrue(batch["more"])
+        advances = batch["kinds"]["advance"]
+        row = dict(zip(advances["fields"], advances["rows"][0]))
+        self.assertEqual((row["id"], row["amount"]), (kept.id, 25))
+        # created in this batch, deleted in the next: already reported gone
+        self.assertEqual(advances["deleted"], [gone])
+
+        rest = self.feed(since=batch["cursor"], epoch=start["epoch"])
+        self.assertEqual((rest["changes"], rest["more"]), (1, False))
+        self.assertEqual(rest["kinds"]["advance"], {"fields": advances["fields"], "rows": [], "deleted": [gone]})
+        self.assertEqual(self.feed(since=rest["cursor"], epoch=start["epoch"])["kinds"], {})
+
+    def test_bulk_load_resets_clients(self):
+        start = self.feed()
+        ledger_cache.invalidate_all()
+        self.assertTrue(self.feed(since=start["cursor"], epoch=start["epoch"])["reset"])
+        self.assertEqual(self.client.get("/api/changes/", {"since": "x"}).status_code, 400)
+
+        CivilAdvance.objects.create(site=self.site, team=self.team, date=FROM_DATE, amount=10)
+        page = self.client.get("/api/changes/snapshot/", {"kind": "advance"}).json()
+        self.assertEqual((len(page["rows"]), page["more"]), (1, False))
+
+
+class OfflineSyncTests(LedgerFixtures, TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("super", password="pw", is_staff=True))
+        self.make_site_team((800, 500, 0))
+
+    def sync(self, *edits):
+        response = self.client.post("/api/sync/", {"edits": list(edits)}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"]
+
+    def edit(self, edit_id, base, masons, **extra):
+        return {
+            "id": edit_id, "site": self.site.id, "date": FROM_DATE.isoformat(),
+            "base": base, "epoch": changes.epoch(),
+            "fields": [[f"mason_full_{self.team.id}", str(masons)], ["daily_description", "slab"]],
+            **extra,
+        }
+
+    def test_applies_queued_days_and_detects_conflicts(self):
+        page = self.client.get(f"/site/{self.site.id}/", {"date": FROM_DATE.isoformat()})
+        base = page.context["day_version"]
+
+        [applied] = self.sync(self.edit("a", base, 2))
+        self.assertEqual(applied["status"], "applied")
+        work = CivilDailyWork.objects.get(site=self.site, date=FROM_DATE)
+        self.assertEqual((work.mason_full, work.labour_amount), (2, 1600))
+        self.assertEqual(SiteDailyNote.objects.get(site=self.site).description, "slab")
+
+        # a lost response, resent to another worker: answers as before, writes nothing
+        cache.clear()
+        self.assertEqual(self.sync(self.edit("a", base, 2)), [applied])
+
+        # a phone still on the old version
+        stale, bad = self.sync(self.edit("b", base, 3), {"id": "c", "site": self.site.id, "date": "soon"})
+        self.assertEqual((stale["status"], stale["version"]), ("conflict", applied["version"]))
+        self.assertEqual(bad["status"], "error")
+        self.assertEqual(CivilDailyWork.objects.get(id=work.id).mason_full, 2)
+
+        [forced] = self.sync(self.edit("b", base, 3, force=True))
+        self.assertEqual(forced["status"], "applied")
+        self.assertEqual(CivilDailyWork.objects.get(id=work.id).mason_full, 3)
+
+    def test_import_of_the_day_is_a_conflict(self):
+        edit = self.edit("a", 0, 2)
+        day_import.import_csv("civil", StringIO(
+            "Site,Team,Date,Mason Full,Helper Full,Mason Half,Helper Half,Advance\n"
+            f"Site,Masons,{FROM_DATE.isoformat()},5,0,0,0,\n"
+        ))
+
+        [stale] = self.sync(edit)
+        self.assertEqual((stale["status"], stale["epoch"]), ("conflict", changes.epoch()))
+        self.assertEqual(CivilDailyWork.objects.get(site=self.site).mason_full, 5)
+
+    def test_failed_edit_rolls_back_alone(self):
+        other = Site.objects.create(name="Other")
+        real_save = sync_views.save_day
+
+        def save_day(site, work_date, data):
+            real_save(site, work_date, data)
+            if site.id == other.id:
+                raise IntegrityError("constraint failed")
+
+        broken = {**self.edit("b", 0, 4), "site": other.id}
+        with mock.patch.object(sync_views, "save_day", save_day), self.assertLogs("civil_app.sync"):
+            applied, failed = self.sync(self.edit("a", 0, 2), broken)
+
+        self.assertEqual((applied["status"], failed["status"]), ("applied", "error"))
+        self.assertTrue(CivilDailyWork.objects.filter(site=self.site).exists())
+        self.assertFalse(CivilDailyWork.objects.filter(site=other).exists())
+        self.assertEqual(list(SyncedEdit.objects.values_list("edit_id", flat=True)), ["a"])
+
+    def test_edits_past_the_query_budget_wait_for_the_next_request(self):
+        later = self.edit("b", 0, 3)
+        later["date"] = TO_DATE.isoformat()
+
+        with mock.patch.object(sync_views, "SYNC_BUDGET", 1):
+            applied, queued = self.sync(self.edit("a", 0, 2), later)
+        self.assertEqual((applied["status"], queued["status"]), ("applied", "queued"))
+        self.assertFalse(CivilDailyWork.objects.filter(date=TO_DATE).exists())
+
+        self.assertEqual([r["status"] for r in self.sync(self.edit("a", 0, 2), later)], ["applied", "applied"])
 
-# Create your tests here.
+    def test_service_worker_lists_offline_assets(self):
+        response = self.client.get("/sw.js")
+        self.assertEqual(response["Content-Type"], "application/javascript")
+        self.assertContains(response, "js/offline.js")
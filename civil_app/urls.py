@@ -1,58 +1,78 @@
 from django.urls import path
-from . import views
+from .views import bills, dashboard, imports, masters, owners, pdfs, reports, search, sites, sync
 
 urlpatterns = [
 
     # ================= Dashboard =================
-    path("", views.dashboard, name="dashboard"),
+    path("", dashboard.dashboard, name="dashboard"),
     
 
     # ================= SITE =================
-    path("sites/", views.site_entry, name="site_entry"),
+    path("sites/", sites.site_entry, name="site_entry"),
     
-    path("site/<int:site_id>/", views.site_detail, name="site_detail"),
-    path("site/<int:site_id>/copy-previous/", views.copy_previous_day, name="copy_previous_day",),
+    path("site/<int:site_id>/", sites.site_detail, name="site_detail"),
+    path("site/<int:site_id>/copy-previous/", sites.copy_previous_day, name="copy_previous_day",),
 
-    path("add-site/", views.add_site, name="add_site"),
-    path("edit-site/<int:id>/", views.edit_site, name="edit_site"),
-    path("delete-site/<int:id>/", views.delete_site, name="delete_site"),
+    path("add-site/", sites.add_site, name="add_site"),
+    path("edit-site/<int:id>/", sites.edit_site, name="edit_site"),
+    path("delete-site/<int:id>/", sites.delete_site, name="delete_site"),
     
-    path("owners/cash/", views.owner_cash_list, name="owner_cash_list"),
-    path("owners/cash/add/", views.owner_cash_add, name="owner_cash_add"),
+    path("owners/cash/", owners.owner_cash_list, name="owner_cash_list"),
+    path("owners/cash/add/", owners.owner_cash_add, name="owner_cash_add"),
+    path("owners/<int:owner_id>/ledger/", owners.owner_cash_ledger, name="owner_cash_ledger"),
 
     
     # ================= MASTERS =================
-    # path("masters/", views.masters, name="masters"),
-    path("masters/team/delete/<int:team_id>/", views.delete_team, name="delete_team"),
-    path("masters/department/delete/<int:dept_id>/", views.delete_department, name="delete_department"),
-    path("masters/", views.masters_and_payments, name="masters_and_payments"),
+    # path("masters/", masters.masters, name="masters"),
+    path("masters/team/delete/<int:team_id>/", masters.delete_team, name="delete_team"),
+    path("masters/department/delete/<int:dept_id>/", masters.delete_department, name="delete_department"),
+    path("masters/", masters.masters_and_payments, name="masters_and_payments"),
+    path("masters/recompute-labour/", masters.api_recompute_labour, name="api_recompute_labour"),
 
 
     # ================= REPORTS =================
-    path("reports/", views.reports, name="reports"),
-    path("reports/pdf/", views.report_pdf, name="report_pdf"),
+    path("reports/", reports.reports, name="reports"),
+    path("reports/pdf/", pdfs.report_pdf, name="report_pdf"),
+    path("api/material-prices/", reports.api_material_prices, name="api_material_prices"),
+    path("api/material-prices/<int:item_id>/", reports.api_material_price_history, name="api_material_price_history"),
+    path("api/pivot/", reports.api_pivot, name="api_pivot"),
 
     # ================= RESET ACTIONS =================
-    path("site/<int:site_id>/reset/today/", views.reset_site_today, name="reset_site_today"),
-    path("site/<int:site_id>/reset/month/", views.reset_site_month, name="reset_site_month"),
-    path("site/<int:site_id>/reset/all/", views.reset_site_all, name="reset_site_all"),
-    path("site/<int:site_id>/reset/date/", views.reset_site_date, name="reset_site_date"),
+    path("site/<int:site_id>/reset/today/", sites.reset_site_today, name="reset_site_today"),
+    path("site/<int:site_id>/reset/month/", sites.reset_site_month, name="reset_site_month"),
+    path("site/<int:site_id>/reset/all/", sites.reset_site_all, name="reset_site_all"),
+    path("site/<int:site_id>/reset/date/", sites.reset_site_date, name="reset_site_date"),
 
     # ================= BILLS =================
-    path("bills/", views.all_bills, name="all_bills"),
-    path("bills/all/pdf/", views.all_bills_pdf, name="all_bills_pdf"),
+    path("bills/", bills.all_bills, name="all_bills"),
+    path("bills/all/pdf/", pdfs.all_bills_pdf, name="all_bills_pdf"),
+    path("bills/outstanding/", bills.payables_outstanding, name="payables_outstanding"),
 
     # ================= BILL DETAIL API (MODAL) =================
-    path("api/bill/civil/<int:team_id>/", views.bill_civil_detail, name="bill_civil_detail"),
-    path("api/bill/department/<int:department_id>/", views.bill_department_detail, name="bill_department_detail"),
-    path("api/bill/material/<str:agent_name>/", views.bill_material_detail, name="bill_material_detail"),
-    path("api/bill/expense/<str:name>/",views.api_bill_expense,name="api_bill_expense"),
-    path("api/day-full/", views.api_day_full_detail, name="api_day_full_detail"),
+    path("api/bill/civil/<int:team_id>/", bills.bill_civil_detail, name="bill_civil_detail"),
+    path("api/bill/department/<int:department_id>/", bills.bill_department_detail, name="bill_department_detail"),
+    path("api/bill/material/<int:agent_id>/", bills.bill_material_detail, name="bill_material_detail"),
+    path("api/bill/expense/<int:category_id>/",bills.api_bill_expense,name="api_bill_expense"),
+    path("api/bills/details/", bills.api_bill_details, name="api_bill_details"),
+    path("api/day-full/", bills.api_day_full_detail, name="api_day_full_detail"),
 
     # ================= BILL PDF (MODAL DOWNLOAD) =================
-    path("bill/team/<int:team_id>/", views.bill_civil_pdf, name="bill_civil_pdf"),
-    path("bill/department/<int:department_id>/", views.bill_department_pdf, name="bill_department_pdf"),
-    path("bill/agent/<str:agent_name>/", views.bill_material_pdf, name="bill_material_pdf"),
-    path("bill/expense/<str:name>/", views.bill_expense_pdf, name="bill_expense_pdf"),
+    path("bill/team/<int:team_id>/", pdfs.bill_civil_pdf, name="bill_civil_pdf"),
+    path("bill/department/<int:department_id>/", pdfs.bill_department_pdf, name="bill_department_pdf"),
+    path("bill/agent/<int:agent_id>/", pdfs.bill_material_pdf, name="bill_material_pdf"),
+    path("bill/expense/<int:category_id>/", pdfs.bill_expense_pdf, name="bill_expense_pdf"),
+
+    # ================= SEARCH =================
+    path("api/search/", search.api_search, name="api_search"),
+    path("api/autocomplete/", search.api_autocomplete, name="api_autocomplete"),
+
+    # ================= IMPORT =================
+    path("api/import/<str:kind>/", imports.api_import, name="api_import"),
+
+    # ================= SYNC =================
+    path("api/changes/", sync.api_changes, name="api_changes"),
+    path("api/changes/snapshot/", sync.api_changes_snapshot, name="api_changes_snapshot"),
+    path("api/sync/", sync.api_sync, name="api_sync"),
+    path("sw.js", sync.service_worker, name="service_worker"),
 ]
 
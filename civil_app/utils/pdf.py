@@ -1,8 +1,61 @@
-from django.template.loader import render_to_string
+"""PDF rendering for every download in the app.
+
+WeasyPrint (Pango / cairo) and xhtml2pdf (reportlab) are imported on the
+first render rather than at import time, so a worker that never builds a PDF
+never loads them.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from io import BytesIO
+
+from django.template.loader import get_template, render_to_string
 from django.http import HttpResponse
-from weasyprint import HTML
 from django.conf import settings
-import os
+
+
+# ===== BOUNDED RENDER POOL =====
+# WeasyPrint renders are CPU- and memory-heavy. Every render in this process
+# runs on a small shared pool; at most PDF_RENDER_QUEUE more wait for it, and
+# anything beyond that gets a 503 instead of piling up.
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PDF_RENDER_WORKERS,
+    thread_name_prefix="pdf-render",
+)
+_slots = threading.BoundedSemaphore(settings.PDF_RENDER_WORKERS + settings.PDF_RENDER_QUEUE)
+
+
+class RendererBusy(Exception):
+    pass
+
+
+def _render(html_string, base_url):
+    from weasyprint import HTML
+
+    return HTML(string=html_string, base_url=base_url).write_pdf()
+
+
+def write_pdf(html_string, base_url=None):
+    """Render HTML to PDF bytes on the shared render pool."""
+    if not _slots.acquire(timeout=settings.PDF_RENDER_WAIT):
+        raise RendererBusy
+    try:
+        return _executor.submit(_render, html_string, base_url).result()
+    finally:
+        _slots.release()
+
+
+def pdf_view(view_func):
+    """Answer 503 + Retry-After when the render pool is saturated."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view_func(request, *args, **kwargs)
+        except RendererBusy:
+            response = HttpResponse("PDF renderer busy, try again shortly.", status=503)
+            response["Retry-After"] = "5"
+            return response
+    return wrapper
 
 
 def render_to_pdf_weasy(template_src, context_dict={}):
@@ -11,8 +64,24 @@ def render_to_pdf_weasy(template_src, context_dict={}):
     # Base URL is IMPORTANT for static files
     base_url = settings.BASE_DIR
 
-    pdf_file = HTML(string=html_string, base_url=base_url).write_pdf()
+    pdf_file = write_pdf(html_string, base_url=str(base_url))
 
     response = HttpResponse(pdf_file, content_type="application/pdf")
     response["Content-Disposition"] = 'inline; filename="report.pdf"'
-    return response
\ No newline at end of file
+    return response
+
+
+def render_to_pdf(template_src, context):
+    """xhtml2pdf fallback renderer; ``None`` when the template fails to convert."""
+    from xhtml2pdf import pisa
+
+    template = get_template(template_src)
+    html = template.render(context)
+
+    result = BytesIO()
+    pdf = pisa.CreatePDF(html, dest=result)
+
+    if not pdf.err:
+        return HttpResponse(result.getvalue(), content_type="application/pdf")
+
+    return None
@@ -0,0 +1,17 @@
+"""Views, one module per area of the app.
+
+    common      permission decorators and form / date helpers
+    dashboard   the landing page
+    sites       site list, daily entry and resets
+    reports     the report page
+    masters     teams, departments, rates and bill payments
+    owners      owner cash in / out and ledgers
+    bills       bill pages and the JSON APIs behind the bill modals
+    pdfs        every PDF download
+    search      full-text search and autocomplete APIs
+    imports     CSV upload of historical day sheets
+    sync        the change feed, offline day-sheet sync and its service worker
+
+``civil_app.urls`` imports the modules directly; PDF engines are only
+loaded on the first render (see ``civil_app.utils.pdf``).
+"""
@@ -0,0 +1,728 @@
+from django.db.models.functions import Coalesce
+from django.contrib.auth.decorators import login_required
+from collections import defaultdict
+from django.http import JsonResponse
+from datetime import date
+from django.shortcuts import render, redirect, aget_object_or_404
+from asgiref.sync import sync_to_async
+from django.db.models import Sum, Value, FloatField
+from django.contrib import messages
+from ..models import (
+    Team, Department, CivilDailyWork, DepartmentWork, CivilAdvance, MaterialEntry,
+    BillPayment, OtherExpense, Agent, ExpenseCategory, Payable, PAYABLE_KINDS,
+)
+from .. import ledger_cache, ledger_queries
+from ..query_budget import query_budget
+from ..db_router import read_only
+from .common import admin_required, to_int, parse_date
+
+
+@login_required
+@query_budget(10)
+@read_only
+def all_bills(request):
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+
+    if not to_date:
+        to_date = date.today()
+
+    # =================================================
+    # ================= CIVIL =========================
+    # =================================================
+
+    civil_totals = ledger_queries.civil_totals(from_date, to_date)
+    civil_advance = ledger_queries.civil_advances(from_date, to_date)
+
+    # map advances
+    advance_map = {
+        a["team_id"]: a["total_advance"]
+        for a in civil_advance
+    }
+
+    civil_bills = []
+    for c in civil_totals:
+        civil_bills.append({
+            "team__id": c["team_id"],
+            "team__name": c["team__name"],
+            "total_amount": c["total_amount"] or 0,
+            "total_advance": advance_map.get(c["team_id"], 0),
+        })
+
+    # =================================================
+    # ================= DEPARTMENT ====================
+    # =================================================
+
+    dept_bills = ledger_queries.department_totals(from_date, to_date)
+
+    # =================================================
+    # ================= MATERIAL ======================
+    # =================================================
+
+    material_bills = ledger_queries.material_totals(from_date, to_date)
+    expense_bills = ledger_queries.expense_totals(from_date, to_date)
+    # =================================================
+    # ================= GRAND TOTAL ===================
+    # =================================================
+
+    grand_total = (
+        sum(c["total_amount"] for c in civil_bills) +
+        sum(d["total_amount"] for d in dept_bills) +
+        sum((m["total_amount"] or 0) - (m.get("total_advance") or 0) for m in material_bills)
+
+    )
+
+    return render(request, "all_bills.html", {
+        "civil_bills": civil_bills,
+        "dept_bills": dept_bills,
+        "material_bills": material_bills,
+        "expense_bills": expense_bills,
+        "from_date": from_date,
+        "to_date": to_date,
+        "grand_total": grand_total,
+    })
+
+@admin_required
+def record_payment(request):
+    """POST of a Pay form on the payables page; admins only, as on masters_and_payments."""
+    bill_type = request.POST.get("bill_type")
+    ref_id = to_int(request.POST.get("ref_id"))
+
+    try:
+        amount = float(request.POST.get("amount") or 0)
+    except ValueError:
+        amount = 0
+
+    if bill_type in dict(PAYABLE_KINDS) and ref_id and amount > 0:
+        BillPayment.objects.create(
+            bill_type=bill_type,
+            reference=str(ref_id),
+            amount=amount,
+        )
+        messages.success(request, "Payment recorded")
+
+    return redirect("payables_outstanding")
+
+
+@login_required
+@query_budget(10)
+def payables_outstanding(request):
+
+    if request.method == "POST":
+        return record_payment(request)
+
+    # ⭐ one keyed read per payable, no ledger aggregation
+    names = {
+        "team": dict(Team.objects.values_list("id", "name")),
+        "department": dict(Department.objects.values_list("id", "name")),
+        "agent": dict(Agent.objects.values_list("id", "name")),
+        "expense": dict(ExpenseCategory.objects.values_list("id", "name")),
+    }
+
+    sections = {kind: [] for kind, _label in PAYABLE_KINDS}
+
+    for p in Payable.objects.order_by("kind", "ref_id"):
+        sections[p.kind].append({
+            "kind": p.kind,
+            "ref_id": p.ref_id,
+            "name": names[p.kind].get(p.ref_id, "-"),
+            "billed": p.billed,
+            "paid": p.paid,
+            "outstanding": p.outstanding,
+        })
+
+    for rows in sections.values():
+        rows.sort(key=lambda r: r["outstanding"], reverse=True)
+
+    return render(request, "payables.html", {
+        "sections": [
+            (label, sections[kind])
+            for kind, label in PAYABLE_KINDS
+        ],
+        "total_outstanding": sum(
+            r["outstanding"] for rows in sections.values() for r in rows
+        ),
+        "recent_payments": [
+            {
+                "payment": pay,
+                "name": names.get(pay.bill_type, {}).get(to_int(pay.reference), pay.reference),
+            }
+            for pay in BillPayment.objects.order_by("-paid_on", "-id")[:20]
+        ],
+    })
+
+@login_required
+@query_budget(6)
+@read_only
+async def bill_civil_detail(request, team_id):
+
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date   = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+    if not to_date:
+        to_date = date.today()
+
+    # ================= WORK =================
+    work_qs = (
+        ledger_queries.team_bill(team_id, from_date, to_date)
+        .annotate(
+
+            total=Coalesce(
+                Sum("total_amount"),
+                Value(0),
+                output_field=FloatField()
+            ),
+
+            mason_full=Coalesce(Sum("mason_full"), Value(0)),
+            mason_half=Coalesce(Sum("mason_half"), Value(0)),
+
+            helper_full=Coalesce(Sum("helper_full"), Value(0)),
+            helper_half=Coalesce(Sum("helper_half"), Value(0)),
+        )
+    )
+
+    # ================= ADVANCE =================
+    adv_qs = (
+        ledger_queries.team_bill_advances(team_id, from_date, to_date)
+        .annotate(
+            advance=Coalesce(
+                Sum("amount"),
+                Value(0),
+                output_field=FloatField()
+            )
+        )
+    )
+
+    adv_map = {a["site_id"]: a["advance"] async for a in adv_qs}
+
+    rows = []
+    total_amt = 0
+    total_adv = 0
+
+    async for w in work_qs:
+
+        adv = adv_map.get(w["site_id"], 0)
+
+        total_amt += w["total"]
+        total_adv += adv
+
+        rows.append({
+
+            "site__name": w["site__name"],
+
+            "mason_full": w["mason_full"],
+            "mason_half": w["mason_half"],
+
+            "helper_full": w["helper_full"],
+            "helper_half": w["helper_half"],
+
+            "advance": adv,
+            "total": w["total"],
+        })
+
+    return JsonResponse({
+        "rows": rows,
+        "team_total": {
+            "advance_total": total_adv,
+            "grand_total": total_amt,
+        }
+    })
+
+@login_required
+@query_budget(6)
+@read_only
+async def bill_department_detail(request, department_id):
+
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date   = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+    if not to_date:
+        to_date = date.today()
+
+    department = await aget_object_or_404(Department, id=department_id)
+
+    # =============================
+    # SITE-WISE GROUPING
+    # =============================
+    qs = (
+        ledger_queries.department_bill(department.id, from_date, to_date)
+        .annotate(
+
+            advance=Coalesce(
+                Sum("advance_amount"),
+                Value(0),
+                output_field=FloatField()
+            ),
+
+            total=Coalesce(
+                Sum("total_amount"),
+                Value(0),
+                output_field=FloatField()
+            ),
+
+            # ⭐ labour counts
+            full=Coalesce(Sum("full_day_count"), Value(0)),
+            half=Coalesce(Sum("half_day_count"), Value(0)),
+        )
+        .order_by("site__name")
+    )
+
+    rows = []
+    total_adv = 0
+    total_amt = 0
+
+    async for r in qs:
+
+        adv = r["advance"] or 0
+        tot = r["total"] or 0
+
+        total_adv += adv
+        total_amt += tot
+
+        rows.append({
+
+            "site__name": r["site__name"],
+
+            "full": r["full"],
+            "half": r["half"],
+
+            "advance": adv,
+            "total": tot,
+        })
+
+    return JsonResponse({
+        "rows": rows,
+        "team_total": {
+            "advance_total": total_adv,
+            "grand_total": total_amt,
+        }
+    })
+
+@login_required
+@query_budget(6)
+@read_only
+async def bill_material_detail(request, agent_id):
+
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date   = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+    if not to_date:
+        to_date = date.today()
+
+    agent = await aget_object_or_404(Agent, id=agent_id)
+
+    # =============================
+    # SITE-WISE GROUPING
+    # =============================
+    qs = (
+        ledger_queries.agent_bill(agent.id, from_date, to_date)
+        .annotate(
+            advance=Coalesce(
+                Sum("advance"),
+                Value(0),
+                output_field=FloatField()
+            ),
+            total_raw=Coalesce(
+                Sum("total"),
+                Value(0),
+                output_field=FloatField()
+            ),
+        )
+        .order_by("site__name")
+    )
+
+    rows = []
+    total_adv = 0
+    total_amt = 0
+
+    async for r in qs:
+        adv = r["advance"] or 0
+        raw = r["total_raw"] or 0
+        payable = raw - adv
+
+        total_adv += r["advance"]
+        total_amt += payable
+
+        rows.append({
+            "site__name": r["site__name"],
+            "advance": r["advance"],
+            "total": payable,  # 👈 payable shown in UI
+        })
+
+    return JsonResponse({
+        "rows": rows,
+        "team_total": {
+            "advance_total": total_adv,
+            "grand_total": total_amt,
+        }
+    })
+
+
+@login_required
+@query_budget(6)
+@read_only
+async def api_bill_expense(request, category_id):
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date   = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+    if not to_date:
+        to_date = date.today()
+
+    category = await aget_object_or_404(ExpenseCategory, id=category_id)
+
+    # =============================
+    # SITE + OWNER GROUPING
+    # =============================
+    qs = (
+        ledger_queries.category_bill(category.id, from_date, to_date)   # owner optional
+        .annotate(
+            total=Coalesce(
+                Sum("amount"),
+                Value(0),
+                output_field=FloatField()
+            )
+        )
+        .order_by("site__name")
+    )
+
+    rows = []
+    total_amt = 0
+
+    async for r in qs:
+        total_amt += r["total"]
+
+        rows.append({
+            "site__name": r["site__name"] or "-",
+            "site__owner__name": r.get("owner__name") or "-",  # ✅ safe
+            "advance": 0,
+            "total": r["total"],
+        })
+
+    return JsonResponse({
+        "rows": rows,
+        "team_total": {
+            "advance_total": 0,
+            "grand_total": total_amt,
+        }
+    })
+
+
+def build_bill_details(from_date, to_date):
+    """Site-wise breakdown for every bill in the range, keyed like the modal APIs."""
+
+    # ================= CIVIL =================
+    civil = {}
+
+    adv_map = {
+        (a["team_id"], a["site_id"]): a["advance"]
+        for a in (
+            CivilAdvance.objects
+            .filter(date__range=[from_date, to_date])
+            .values("team_id", "site_id")
+            .annotate(
+                advance=Coalesce(
+                    Sum("amount"),
+                    Value(0),
+                    output_field=FloatField()
+                )
+            )
+        )
+    }
+
+    work_qs = (
+        CivilDailyWork.objects
+        .filter(date__range=[from_date, to_date])
+        .values("team_id", "site_id", "site__name")
+        .annotate(
+            total=Coalesce(
+                Sum("total_amount"),
+                Value(0),
+                output_field=FloatField()
+            ),
+            mason_full=Coalesce(Sum("mason_full"), Value(0)),
+            mason_half=Coalesce(Sum("mason_half"), Value(0)),
+            helper_full=Coalesce(Sum("helper_full"), Value(0)),
+            helper_half=Coalesce(Sum("helper_half"), Value(0)),
+        )
+        .order_by("team_id", "site__name")
+    )
+
+    for w in work_qs:
+        bill = civil.setdefault(str(w["team_id"]), {
+            "rows": [],
+            "team_total": {"advance_total": 0, "grand_total": 0},
+        })
+        adv = adv_map.get((w["team_id"], w["site_id"]), 0)
+
+        bill["team_total"]["advance_total"] += adv
+        bill["team_total"]["grand_total"] += w["total"]
+
+        bill["rows"].append({
+            "site__name": w["site__name"],
+            "mason_full": w["mason_full"],
+            "mason_half": w["mason_half"],
+            "helper_full": w["helper_full"],
+            "helper_half": w["helper_half"],
+            "advance": adv,
+            "total": w["total"],
+        })
+
+    # ================= DEPARTMENT =================
+    dept = {}
+
+    dept_qs = (
+        DepartmentWork.objects
+        .filter(date__range=[from_date, to_date])
+        .values("department_id", "site_id", "site__name")
+        .annotate(
+            advance=Coalesce(
+                Sum("advance_amount"),
+                Value(0),
+                output_field=FloatField()
+            ),
+            total=Coalesce(
+                Sum("total_amount"),
+                Value(0),
+                output_field=FloatField()
+            ),
+            full=Coalesce(Sum("full_day_count"), Value(0)),
+            half=Coalesce(Sum("half_day_count"), Value(0)),
+        )
+        .order_by("department_id", "site__name")
+    )
+
+    for r in dept_qs:
+        bill = dept.setdefault(str(r["department_id"]), {
+            "rows": [],
+            "team_total": {"advance_total": 0, "grand_total": 0},
+        })
+
+        bill["team_total"]["advance_total"] += r["advance"]
+        bill["team_total"]["grand_total"] += r["total"]
+
+        bill["rows"].append({
+            "site__name": r["site__name"],
+            "full": r["full"],
+            "half": r["half"],
+            "advance": r["advance"],
+            "total": r["total"],
+        })
+
+    # ================= MATERIAL =================
+    material = {}
+
+    material_qs = (
+        MaterialEntry.objects
+        .filter(date__range=[from_date, to_date])
+        .values("agent_id", "site_id", "site__name")
+        .annotate(
+            advance=Coalesce(
+                Sum("advance"),
+                Value(0),
+                output_field=FloatField()
+            ),
+            total_raw=Coalesce(
+                Sum("total"),
+                Value(0),
+                output_field=FloatField()
+            ),
+        )
+        .order_by("agent_id", "site__name")
+    )
+
+    for r in material_qs:
+        bill = material.setdefault(str(r["agent_id"]), {
+            "rows": [],
+            "team_total": {"advance_total": 0, "grand_total": 0},
+        })
+        payable = r["total_raw"] - r["advance"]
+
+        bill["team_total"]["advance_total"] += r["advance"]
+        bill["team_total"]["grand_total"] += payable
+
+        bill["rows"].append({
+            "site__name": r["site__name"],
+            "advance": r["advance"],
+            "total": payable,
+        })
+
+    # ================= EXPENSE =================
+    expense = {}
+
+    expense_qs = (
+        OtherExpense.objects
+        .filter(date__range=[from_date, to_date])
+        .values("category_id", "site_id", "site__name", "owner__name")
+        .annotate(
+            total=Coalesce(
+                Sum("amount"),
+                Value(0),
+                output_field=FloatField()
+            )
+        )
+        .order_by("category_id", "site__name")
+    )
+
+    for r in expense_qs:
+        bill = expense.setdefault(str(r["category_id"]), {
+            "rows": [],
+            "team_total": {"advance_total": 0, "grand_total": 0},
+        })
+
+        bill["team_total"]["grand_total"] += r["total"]
+
+        bill["rows"].append({
+            "site__name": r["site__name"] or "-",
+            "site__owner__name": r["owner__name"] or "-",
+            "advance": 0,
+            "total": r["total"],
+        })
+
+    return {
+        "civil": civil,
+        "dept": dept,
+        "material": material,
+        "expense": expense,
+    }
+
+
+@login_required
+@query_budget(10)
+@read_only
+def api_bill_details(request):
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date   = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+    if not to_date:
+        to_date = date.today()
+
+    return JsonResponse(ledger_cache.cached(
+        "bill_details", (from_date, to_date),
+        lambda: build_bill_details(from_date, to_date),
+        start=from_date, end=to_date,
+    ))
+
+
+# the reports page prefetches one month of day blocks at a time
+DAY_DETAIL_MAX_DAYS = 31
+
+
+def build_day_detail(from_date, to_date):
+    """Per-day site blocks for api_day_full_detail."""
+    # (date, site_id) -> site block
+    grouped = {}
+
+    def site_block(row):
+        key = (row.date, row.site_id)
+        if key not in grouped:
+            grouped[key] = {
+                "site": row.site.name,
+                "civil": [],
+                "material": [],
+                "department": [],
+                "expense": [],
+            }
+        return grouped[key]
+
+    # ================= CIVIL =================
+    for c in (
+        CivilDailyWork.objects
+        .filter(date__range=[from_date, to_date])
+        .select_related("site", "team")
+        .order_by("id")
+    ):
+        site_block(c)["civil"].append({
+            "team": c.team.name,
+            "mason_full": c.mason_full,
+            "mason_half": c.mason_half,
+            "helper_full": c.helper_full,
+            "helper_half": c.helper_half,
+        })
+
+    # ================= MATERIAL =================
+    for m in (
+        MaterialEntry.objects
+        .filter(date__range=[from_date, to_date])
+        .select_related("site", "agent")
+        .order_by("id")
+    ):
+        site_block(m)["material"].append({
+            "agent": m.agent.name if m.agent else "-",
+            "qty": m.quantity,
+        })
+
+    # ================= DEPARTMENT =================
+    for d in (
+        DepartmentWork.objects
+        .filter(date__range=[from_date, to_date])
+        .select_related("site", "department")
+        .order_by("id")
+    ):
+        site_block(d)["department"].append({
+            "department": d.department.name,
+            "full": d.full_day_count,
+            "half": d.half_day_count,
+        })
+
+    # ================= EXPENSE =================
+    for e in (
+        OtherExpense.objects
+        .filter(date__range=[from_date, to_date])
+        .select_related("site", "owner", "category")
+        .order_by("id")
+    ):
+        site_block(e)["expense"].append({
+            "title": e.category.name,
+            "owner": e.owner.name if e.owner else "-",
+        })
+
+    # empty sites never get a block, so only sort what exists
+    days = defaultdict(list)
+
+    for (day, _site_id), block in sorted(
+        grouped.items(),
+        key=lambda item: (item[0][0], item[1]["site"], item[0][1])
+    ):
+        days[day.isoformat()].append(block)
+
+    return {
+        "sites": days.get(from_date.isoformat(), []),
+        "days": dict(days),
+    }
+
+
+@login_required
+@query_budget(8)
+@read_only
+async def api_day_full_detail(request):
+
+    # ⭐ single day (?date=) or a whole range (?from_date=&to_date=)
+    if request.GET.get("date"):
+        from_date = to_date = parse_date(request.GET.get("date"))
+    else:
+        from_date = parse_date(request.GET.get("from_date"))
+        to_date = parse_date(request.GET.get("to_date"))
+
+    if not from_date or not to_date:
+        return JsonResponse({"sites": [], "days": {}})
+    if (to_date - from_date).days >= DAY_DETAIL_MAX_DAYS:
+        return JsonResponse({"error": f"a range covers at most {DAY_DETAIL_MAX_DAYS} days"}, status=400)
+
+    return JsonResponse(await sync_to_async(ledger_cache.cached)(
+        "day_detail", (from_date, to_date),
+        lambda: build_day_detail(from_date, to_date),
+        start=from_date, end=to_date,
+    ))
@@ -0,0 +1,50 @@
+from django.contrib.auth.decorators import user_passes_test
+from datetime import date, datetime
+from ..models import TeamRate
+
+
+def staff_required(view_func):
+    return user_passes_test(lambda u: u.is_staff, login_url="login")(view_func)
+
+def admin_required(view_func):
+    return user_passes_test(lambda u: u.is_superuser, login_url="login")(view_func)
+
+
+
+# =========================================================
+# HELPERS
+# =========================================================
+
+def to_int(val):
+    try:
+        return int(val)
+    except (TypeError, ValueError):
+        return 0
+
+
+def get_team_rate(team, work_date):
+    return (
+        TeamRate.objects
+        .filter(team=team, from_date__lte=work_date)
+        .order_by("-is_locked", "-from_date")
+        .first()
+    )
+
+
+def calculate_civil_labour(team, mf, hf, mh, hh, work_date):
+    rate = get_team_rate(team, work_date)
+    if not rate:
+        return 0
+    return rate.labour(mf, hf, mh, hh)
+
+# ===== SAFE GET PARAM HELPER =====
+def clean_id(val):
+    if not val or val in ["None", "null", ""]:
+        return None
+    return val
+
+def parse_date(val):
+    try:
+        return datetime.strptime(val, "%Y-%m-%d").date()
+    except:
+        return date.today()
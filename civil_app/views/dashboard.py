@@ -0,0 +1,178 @@
+import json
+from django.contrib.auth.decorators import login_required
+from datetime import date, timedelta
+from django.shortcuts import render
+from django.db.models import Sum
+from ..models import Site, CivilDailyWork, DepartmentWork, MaterialEntry, OtherExpense
+from .. import ledger_cache
+from ..db_router import read_only
+
+
+def dashboard_data(today, selected_range):
+    """Chart series, top sites and today's totals for the dashboard."""
+    labels = []
+    values = []
+
+    # ================= WEEK DATA =================
+    if selected_range == "week":
+
+        start = today - timedelta(days=6)
+
+        for i in range(7):
+
+            d = start + timedelta(days=i)
+
+            civil = CivilDailyWork.objects.filter(date=d)\
+                .aggregate(v=Sum("labour_amount"))["v"] or 0
+
+            dept = DepartmentWork.objects.filter(date=d)\
+                .aggregate(v=Sum("labour_amount"))["v"] or 0
+
+            material = MaterialEntry.objects.filter(date=d)\
+                .aggregate(v=Sum("total"))["v"] or 0
+
+            expense = OtherExpense.objects.filter(date=d)\
+                .aggregate(v=Sum("amount"))["v"] or 0
+
+            total = civil + dept + material + expense
+
+            labels.append(d.strftime("%d %b"))
+            values.append(float(total))
+
+    # ================= MONTH DATA =================
+    else:
+
+        start = today.replace(day=1)
+
+        for i in range(31):
+
+            d = start + timedelta(days=i)
+
+            if d.month != today.month:
+                break
+
+            civil = CivilDailyWork.objects.filter(date=d)\
+                .aggregate(v=Sum("labour_amount"))["v"] or 0
+
+            dept = DepartmentWork.objects.filter(date=d)\
+                .aggregate(v=Sum("labour_amount"))["v"] or 0
+
+            material = MaterialEntry.objects.filter(date=d)\
+                .aggregate(v=Sum("total"))["v"] or 0
+
+            expense = OtherExpense.objects.filter(date=d)\
+                .aggregate(v=Sum("amount"))["v"] or 0
+
+            total = civil + dept + material + expense
+
+            labels.append(d.strftime("%d"))
+            values.append(float(total))
+
+    # ================= TOP SITES =================
+    top_sites = []
+
+    sites = Site.objects.all()
+
+    for site in sites:
+
+        civil = CivilDailyWork.objects.filter(site=site)\
+            .aggregate(v=Sum("labour_amount"))["v"] or 0
+
+        dept = DepartmentWork.objects.filter(site=site)\
+            .aggregate(v=Sum("labour_amount"))["v"] or 0
+
+        material = MaterialEntry.objects.filter(site=site)\
+            .aggregate(v=Sum("total"))["v"] or 0
+
+        expense = OtherExpense.objects.filter(site=site)\
+            .aggregate(v=Sum("amount"))["v"] or 0
+
+        total = civil + dept + material + expense
+
+        if total > 0:
+            top_sites.append({
+                "site": site,
+                "total": total
+            })
+
+    top_sites = sorted(top_sites, key=lambda x: x["total"], reverse=True)[:5]
+
+    # ================= TODAY STATS =================
+
+    today_labour = (
+        CivilDailyWork.objects.filter(date=today)
+        .aggregate(v=Sum("labour_amount"))["v"] or 0
+    ) + (
+        DepartmentWork.objects.filter(date=today)
+        .aggregate(v=Sum("labour_amount"))["v"] or 0
+    )
+
+    material_total = MaterialEntry.objects.filter(
+        date=today
+    ).aggregate(
+        v=Sum("total")
+    )["v"] or 0
+
+    expense_total = OtherExpense.objects.filter(
+        date=today
+    ).aggregate(
+        v=Sum("amount")
+    )["v"] or 0
+
+
+    # ================= SITE COMPARISON =================
+
+    site_labels = []
+    site_costs = []
+
+    for site in Site.objects.all():
+
+        civil = CivilDailyWork.objects.filter(site=site)\
+            .aggregate(v=Sum("labour_amount"))["v"] or 0
+
+        dept = DepartmentWork.objects.filter(site=site)\
+            .aggregate(v=Sum("labour_amount"))["v"] or 0
+
+        material = MaterialEntry.objects.filter(site=site)\
+            .aggregate(v=Sum("total"))["v"] or 0
+
+        expense = OtherExpense.objects.filter(site=site)\
+            .aggregate(v=Sum("amount"))["v"] or 0
+
+        total = civil + dept + material + expense
+
+        if total > 0:
+            site_labels.append(site.name)
+            site_costs.append(float(total))
+        
+    context = {
+        "chart_labels": json.dumps(labels),
+        "chart_values": json.dumps(values),
+
+        "site_labels": json.dumps(site_labels),
+        "site_costs": json.dumps(site_costs),
+
+        "selected_range": selected_range,
+        "top_sites": top_sites,
+        "today_labour": today_labour,
+        "material_total": material_total,
+        "expense_total": expense_total,
+        "total_sites": Site.objects.count(),
+    }
+
+    return context
+
+
+@login_required
+@read_only
+def dashboard(request):
+
+    today = date.today()
+    selected_range = request.GET.get("range", "week")
+
+    context = ledger_cache.cached(
+        "dashboard", (today, selected_range),
+        lambda: dashboard_data(today, selected_range),
+    )
+
+    return render(request, "dashboard.html", context)
@@ -0,0 +1,34 @@
+import io
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+
+from .. import day_import
+from .common import staff_required
+
+
+@login_required
+@staff_required
+def api_import(request, kind):
+    """Stream an uploaded day-sheet CSV into the ledger.
+
+    POST a multipart ``file``; the columns per kind are listed in
+    ``civil_app.day_import``. Answers the row / written / error counts and
+    the first errors by line.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST a CSV as 'file'"}, status=405)
+    upload = request.FILES.get("file")
+    if upload is None:
+        return JsonResponse({"error": "POST a CSV as 'file'"}, status=400)
+
+    # large uploads are spooled to disk by Django; rows are decoded as they are read
+    stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        result = day_import.import_csv(kind, stream)
+    except (day_import.SheetError, UnicodeDecodeError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    finally:
+        stream.detach()
+
+    return JsonResponse(result.as_dict())
@@ -0,0 +1,180 @@
+from django.contrib.auth.decorators import login_required
+from datetime import date
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib import messages
+from django.http import JsonResponse
+from ..models import (
+    Team, Department, CivilDailyWork, DepartmentWork, TeamRate, DefaultRate,
+)
+from .. import ledger_cache
+from ..labour_recompute import Recompute
+from .common import admin_required, clean_id, parse_date, to_int
+
+
+@login_required
+@admin_required
+def masters(request):
+    if request.method == "POST":
+        form_type = request.POST.get("form_type")
+        name = request.POST.get("name", "").strip()
+
+        if name:
+            if form_type == "department":
+                Department.objects.get_or_create(name=name)
+
+            elif form_type == "team":
+                Team.objects.get_or_create(name=name)
+
+        return redirect("masters")  # 🔥 VERY IMPORTANT
+
+    return render(request, "masters.html", {
+        "departments": Department.objects.all().order_by("name"),
+        "teams": Team.objects.all().order_by("name"),
+    })
+
+def delete_team(request, team_id):
+    if request.method == "POST":
+        team = get_object_or_404(Team, id=team_id)
+
+        if CivilDailyWork.objects.filter(team=team).exists() or \
+           TeamRate.objects.filter(team=team).exists():
+            messages.error(request, "Team already used. Cannot delete.")
+        else:
+            team.delete()
+            messages.success(request, "Team deleted successfully.")
+
+    return redirect("masters")   # 🔥 ALWAYS back to masters
+
+def delete_department(request, dept_id):
+    if request.method == "POST":
+        department = get_object_or_404(Department, id=dept_id)
+
+        if DepartmentWork.objects.filter(department=department).exists():
+            messages.error(request, "Department already used. Cannot delete.")
+        else:
+            department.delete()
+            messages.success(request, "Department deleted successfully.")
+
+    return redirect("masters")   # 🔥 ALWAYS back to masters
+
+@login_required
+@admin_required
+def masters_and_payments(request):
+
+    if request.method == "POST":
+        action = request.POST.get("action")
+
+        # ================= ADD DEPARTMENT + PAYMENT =================
+        if action == "add_department":
+            name = request.POST.get("name", "").strip()
+            full = to_int(request.POST.get("full"))
+
+            if name and full > 0:
+                dept, _ = Department.objects.get_or_create(name=name)
+                DefaultRate.objects.update_or_create(
+                    department=dept,
+                    defaults={"full_day_rate": full}
+                )
+
+        # ================= UPDATE DEPARTMENT =================
+        elif action == "update_department":
+            rate_id = request.POST.get("rate_id")
+            full = to_int(request.POST.get("full"))
+
+            rate = DefaultRate.objects.filter(id=rate_id).first() if rate_id else None
+            if rate and full > 0:
+                DefaultRate.objects.filter(id=rate.id).update(
+                    full_day_rate=full
+                )
+                # only days entered at the old rate; rates typed in on a day stay
+                if request.POST.get("reprice") and rate.full_day_rate > 0:
+                    repriced = Recompute.for_departments(
+                        rate.full_day_rate, department_id=rate.department_id,
+                    ).apply()
+                    messages.success(request, f"{repriced} day(s) repriced.")
+
+        # ================= DELETE DEPARTMENT =================
+        elif action == "delete_department":
+            rate_id = request.POST.get("rate_id")
+            DefaultRate.objects.filter(id=rate_id).delete()
+
+        # ================= ADD TEAM + PAYMENT =================
+        elif action == "add_team":
+            name = request.POST.get("name", "").strip()
+            mason = to_int(request.POST.get("mason"))
+            helper = to_int(request.POST.get("helper"))
+
+            if name and mason > 0 and helper > 0:
+                team, _ = Team.objects.get_or_create(name=name)
+                TeamRate.objects.update_or_create(
+                    team=team,
+                    defaults={
+                        "mason_full_rate": mason,
+                        "helper_full_rate": helper,
+                        "from_date": date.today(),
+                        "is_locked": False,
+                    }
+                )
+
+        # ================= UPDATE TEAM =================
+        elif action == "update_team":
+            rate_id = request.POST.get("rate_id")
+            mason = to_int(request.POST.get("mason"))
+            helper = to_int(request.POST.get("helper"))
+
+            rate = TeamRate.objects.filter(id=rate_id).first() if rate_id else None
+            if rate and mason > 0 and helper > 0:
+                TeamRate.objects.filter(id=rate.id).update(
+                    mason_full_rate=mason,
+                    helper_full_rate=helper
+                )
+                if request.POST.get("reprice"):
+                    repriced = Recompute.for_teams(rate.team_id, since=rate.from_date).apply()
+                    messages.success(request, f"{repriced} day(s) repriced.")
+
+        # ================= DELETE TEAM =================
+        elif action == "delete_team":
+            rate_id = request.POST.get("rate_id")
+            TeamRate.objects.filter(id=rate_id).delete()
+
+        # queryset .update() above sends no signals
+        ledger_cache.notify_masters()
+
+        return redirect("masters_and_payments")
+
+    context = {
+        "dept_rates": DefaultRate.objects.select_related("department").order_by("department__name"),
+        "team_rates": TeamRate.objects.select_related("team").order_by("team__name"),
+    }
+
+    return render(request, "masters_and_payments.html", context)
+
+
+@login_required
+@admin_required
+def api_recompute_labour(request):
+    """Reprice stored wages after a rate change.
+
+    kind (civil / department), optional id, since (YYYY-MM-DD) and, for
+    departments, old_rate: the full-day rate the days to reprice were
+    entered at (required; days priced by hand keep their rate). GET answers
+    the dry-run diff; POST writes it.
+    """
+    params = request.POST if request.method == "POST" else request.GET
+    kind = params.get("kind")
+    if kind not in ("civil", "department"):
+        return JsonResponse({"error": "kind must be civil or department"}, status=400)
+
+    ref_id = to_int(clean_id(params.get("id"))) or None
+    since = parse_date(params["since"]) if params.get("since") else None
+    if kind == "civil":
+        recompute = Recompute.for_teams(ref_id, since=since)
+    else:
+        old_rate = to_int(params.get("old_rate"))
+        if old_rate <= 0:
+            return JsonResponse({"error": "old_rate must be the full-day rate the days were entered at"}, status=400)
+        recompute = Recompute.for_departments(old_rate, department_id=ref_id, since=since)
+
+    if request.method == "POST":
+        return JsonResponse({"kind": kind, "repriced": recompute.apply()})
+    return JsonResponse(recompute.preview())
@@ -0,0 +1,78 @@
+from django.contrib.auth.decorators import login_required
+from datetime import date
+from django.shortcuts import render, redirect, get_object_or_404
+from django.db.models import Q
+from ..models import Owner, OwnerCashEntry
+from .. import ledger_queries, owner_cash
+from ..query_budget import query_budget
+
+
+@login_required
+@query_budget(8)
+def owner_cash_list(request):
+    owners = list(Owner.objects.all())
+
+    # ⭐ last monthly snapshot + rows since, for every owner at once
+    balances = owner_cash.balances(owner.id for owner in owners)
+    summary = [{"owner": owner, **balances[owner.id]} for owner in owners]
+
+    # ================= KEYSET PAGE =================
+    entries = ledger_queries.owner_cash_entries()
+
+    before = owner_cash.parse_cursor(request.GET.get("before"))
+    if before:
+        before_date, _kind, before_id = before
+        entries = entries.filter(
+            Q(date__lt=before_date) | Q(date=before_date, id__lt=before_id)
+        )
+
+    entries = list(entries[:owner_cash.PAGE_SIZE + 1])
+    next_cursor = None
+
+    if len(entries) > owner_cash.PAGE_SIZE:
+        entries = entries[:owner_cash.PAGE_SIZE]
+        last = entries[-1]
+        next_cursor = f"{last.date.isoformat()}:in:{last.id}"
+
+    return render(request, "owner_cash_list.html", {
+        "summary": summary,
+        "entries": entries,
+        "next_cursor": next_cursor,
+    })
+
+@login_required
+@query_budget(12)
+def owner_cash_ledger(request, owner_id):
+    owner = get_object_or_404(Owner, id=owner_id)
+
+    owner_cash.close_months(owner.id)
+
+    rows, next_cursor = owner_cash.ledger_page(
+        owner.id,
+        before=owner_cash.parse_cursor(request.GET.get("before")),
+    )
+
+    return render(request, "owner_cash_ledger.html", {
+        "owner": owner,
+        "rows": rows,
+        "next_cursor": next_cursor,
+        **owner_cash.owner_balance(owner.id),
+    })
+
+@login_required
+def owner_cash_add(request):
+    owners = Owner.objects.all()
+
+    if request.method == "POST":
+        OwnerCashEntry.objects.create(
+            owner_id=request.POST.get("owner"),
+            date=request.POST.get("date"),
+            amount=request.POST.get("amount"),
+            notes=request.POST.get("notes", "")
+        )
+        return redirect("owner_cash_list")
+
+    return render(request, "owner_cash_add.html", {
+        "owners": owners,
+        "today": date.today(),
+    })
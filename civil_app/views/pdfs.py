@@ -0,0 +1,753 @@
+from django.template.loader import render_to_string
+from django.db.models.functions import Coalesce
+from civil_app.utils.pdf import pdf_view, render_to_pdf_weasy, write_pdf
+from django.utils import timezone
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponse
+from datetime import date
+from django.shortcuts import get_object_or_404
+from django.db.models import Sum, Value, FloatField
+from ..models import (
+    Team, Department, CivilDailyWork, DepartmentWork, CivilAdvance, MaterialEntry,
+    OtherExpense, Agent, ExpenseCategory,
+)
+from .. import ledger_queries
+from ..db_router import read_only
+from .common import clean_id, parse_date
+
+
+@pdf_view
+@read_only
+def report_pdf(request):
+    today = date.today()
+
+    from_date = parse_date(request.GET.get("from_date")) or today
+    to_date = parse_date(request.GET.get("to_date")) or today
+
+    site_id = clean_id(request.GET.get("site"))
+    team_id = clean_id(request.GET.get("team"))
+    dept_id = clean_id(request.GET.get("department"))
+
+    rows = []
+    total_labour = total_material = total_advance = 0
+
+    # ---------------- CIVIL ----------------
+    civil_qs = CivilDailyWork.objects.filter(date__range=[from_date, to_date])
+    if site_id:
+        civil_qs = civil_qs.filter(site_id=site_id)
+    if team_id:
+        civil_qs = civil_qs.filter(team_id=team_id)
+
+    advance_map = {
+        (a["site_id"], a["team_id"], a["date"]): a["total_advance"]
+        for a in (
+            CivilAdvance.objects
+            .filter(date__range=[from_date, to_date])
+            .values("site_id", "team_id", "date")
+            .annotate(total_advance=Sum("amount"))
+        )
+    }
+
+    for r in civil_qs:
+        adv = advance_map.get((r.site_id, r.team_id, r.date), 0)
+        labour_amt = r.labour_amount or 0
+        total = labour_amt - adv
+
+        rows.append({
+            "date": r.date,
+            "site": r.site.name,
+            "department": "Civil",
+            "team": r.team.name,
+            "labour": r.labour_amount,
+            "material": 0,
+            "advance": adv,
+            "total": total,
+        })
+
+        total_labour += labour_amt
+        total_advance += adv
+
+    # ---------------- DEPARTMENT ----------------
+    dept_qs = DepartmentWork.objects.filter(date__range=[from_date, to_date])
+    if site_id:
+        dept_qs = dept_qs.filter(site_id=site_id)
+    if dept_id:
+        dept_qs = dept_qs.filter(department_id=dept_id)
+
+    for d in dept_qs:
+        rows.append({
+            "date": d.date,
+            "site": d.site.name,
+            "department": d.department.name,
+            "team": "-",
+            "labour": d.labour_amount,
+            "material": 0,
+            "advance": d.advance_amount or 0,
+            "total": d.labour_amount - (d.advance_amount or 0),
+        })
+
+        lab = d.labour_amount or 0
+        adv = d.advance_amount or 0
+
+    # ---------------- MATERIAL ----------------
+    material_qs = (
+        MaterialEntry.objects
+        .filter(date__range=[from_date, to_date])
+        .select_related("agent")
+    )
+    if site_id:
+        material_qs = material_qs.filter(site_id=site_id)
+
+    for m in material_qs:
+        adv = m.advance or 0
+        net = (m.total or 0) - adv
+
+        rows.append({
+            "date": m.date,
+            "site": m.site.name,
+            "department": "Material",
+            "team": m.agent.name if m.agent else "-",
+            "labour": 0,
+            "material": m.total,
+            "advance": adv,
+            "total": net,
+        })
+
+        mat_total = m.total or 0
+        adv = m.advance or 0
+    
+    # ---------------- EXPENSE ----------------
+    expense_qs = (
+        OtherExpense.objects
+        .filter(date__range=[from_date, to_date])
+        .select_related("category")
+    )
+
+    if site_id:
+        expense_qs = expense_qs.filter(site_id=site_id)
+
+    for e in expense_qs:
+        amt = e.amount or 0
+
+        rows.append({
+            "date": e.date,
+            "site": e.site.name,
+            "department": "Expense",
+            "team": e.category.name,
+            "labour": 0,
+            "material": amt,
+            "advance": 0,
+            "total": amt,
+        })
+
+        total_material += amt
+
+    rows = sorted(
+        rows,
+        key=lambda x: (
+            x.get("date"),
+            str(x.get("site")),
+            str(x.get("department")),
+            str(x.get("team")),
+        )
+    )
+
+    grand_total = total_labour + total_material - total_advance
+
+    context = {
+        "rows": rows,
+        "from_date": from_date,
+        "to_date": to_date,
+        "total_labour": total_labour,
+        "total_material": total_material,
+        "total_advance": total_advance,
+        "grand_total": grand_total,
+        "now": timezone.now(),
+    }
+
+    return render_to_pdf_weasy("reports_pdf.html", context)
+
+@login_required
+@pdf_view
+@read_only
+def all_bills_pdf(request):
+
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+
+    if not to_date:
+        to_date = date.today()
+
+    # =================================================
+    # ================= CIVIL =========================
+    # =================================================
+
+    teams = (
+        CivilDailyWork.objects
+        .filter(date__range=[from_date, to_date])
+        .values("team_id", "team__name")
+        .distinct()
+    )
+
+    civil_rows = []
+
+    for t in teams:
+
+        team_id = t["team_id"]
+
+        site_qs = (
+            ledger_queries.team_bill(team_id, from_date, to_date)
+            .annotate(
+                labour=Coalesce(
+                    Sum("labour_amount"),
+                    Value(0),
+                    output_field=FloatField()
+                ),
+                total=Coalesce(
+                    Sum("total_amount"),
+                    Value(0),
+                    output_field=FloatField()
+                )
+            )
+            .order_by("site__name")
+        )
+
+        adv_qs = (
+            ledger_queries.team_bill_advances(team_id, from_date, to_date)
+            .annotate(
+                advance=Coalesce(
+                    Sum("amount"),
+                    Value(0),
+                    output_field=FloatField()
+                )
+            )
+        )
+
+        advance_map = {a["site_id"]: a["advance"] for a in adv_qs}
+
+        sites = []
+        team_labour_total = 0
+        team_adv_total = 0
+        team_total = 0
+
+        for s in site_qs:
+
+            adv = advance_map.get(s["site_id"], 0)
+
+            team_labour_total += s["labour"]
+            team_adv_total += adv
+            team_total += s["total"]
+
+            sites.append({
+                "site": s["site__name"],
+                "labour": s["labour"],
+                "advance": adv,
+                "total": s["total"],
+            })
+
+        civil_rows.append({
+            "name": t["team__name"],
+            "labour": team_labour_total,
+            "advance": team_adv_total,
+            "total": team_total,
+            "sites": sites,
+        })
+
+    # =================================================
+    # ================= DEPARTMENT ====================
+    # =================================================
+
+    departments = (
+        DepartmentWork.objects
+        .filter(date__range=[from_date, to_date])
+        .values("department_id", "department__name")
+        .distinct()
+    )
+
+    dept_rows = []
+
+    for d in departments:
+
+        dept_id = d["department_id"]
+
+        site_qs = (
+            ledger_queries.department_bill(dept_id, from_date, to_date)
+            .annotate(
+                labour=Coalesce(
+                    Sum("labour_amount"),
+                    Value(0),
+                    output_field=FloatField()
+                ),
+                advance=Coalesce(
+                    Sum("advance_amount"),
+                    Value(0),
+                    output_field=FloatField()
+                ),
+                total=Coalesce(
+                    Sum("total_amount"),
+                    Value(0),
+                    output_field=FloatField()
+                ),
+            )
+            .order_by("site__name")
+        )
+
+        sites = []
+        lab_total = 0
+        adv_total = 0
+        amt_total = 0
+
+        for s in site_qs:
+
+            lab_total += s["labour"]
+            adv_total += s["advance"]
+            amt_total += s["total"]
+
+            sites.append({
+                "site": s["site__name"],
+                "labour": s["labour"],
+                "advance": s["advance"],
+                "total": s["total"],
+            })
+
+        dept_rows.append({
+            "name": d["department__name"],
+            "labour": lab_total,
+            "advance": adv_total,
+            "total": amt_total,
+            "sites": sites,
+        })
+
+    # =================================================
+    # ================= MATERIAL ======================
+    # =================================================
+
+    agents = (
+        MaterialEntry.objects
+        .filter(date__range=[from_date, to_date])
+        .values("agent_id", "agent__name")
+        .distinct()
+    )
+
+    material_rows = []
+
+    for a in agents:
+
+        name = a["agent__name"] or "-"
+
+        site_qs = (
+            ledger_queries.agent_bill(a["agent_id"], from_date, to_date)
+            .annotate(
+                advance=Coalesce(
+                    Sum("advance"),
+                    Value(0),
+                    output_field=FloatField()
+                ),
+                total_raw=Coalesce(
+                    Sum("total"),
+                    Value(0),
+                    output_field=FloatField()
+                ),
+            )
+            .order_by("site__name")
+        )
+
+        sites = []
+        adv_total = 0
+        amt_total = 0
+
+        for s in site_qs:
+
+            payable = (s["total_raw"] or 0) - (s["advance"] or 0)
+
+            adv_total += s["advance"]
+            amt_total += payable
+
+            sites.append({
+                "site": s["site__name"],
+                "advance": s["advance"],
+                "total": payable,
+            })
+
+        material_rows.append({
+            "name": name,
+            "advance": adv_total,
+            "total": amt_total,
+            "sites": sites,
+        })
+
+    # =================================================
+    # ================= EXPENSE =======================
+    # =================================================
+
+    site_qs = (
+        OtherExpense.objects
+        .filter(date__range=[from_date, to_date])
+        .values("site_id", "site__name")
+        .annotate(
+            total=Coalesce(
+                Sum("amount"),
+                Value(0),
+                output_field=FloatField()
+            )
+        )
+        .order_by("site__name")
+    )
+
+    expense_rows = []
+
+    for s in site_qs:
+
+        exp_qs = (
+            OtherExpense.objects
+            .filter(site_id=s["site_id"], date__range=[from_date, to_date])
+            .values("category__name", "owner__name")
+            .annotate(
+                total=Coalesce(
+                    Sum("amount"),
+                    Value(0),
+                    output_field=FloatField()
+                )
+            )
+        )
+
+        expenses = []
+
+        for e in exp_qs:
+            expenses.append({
+                "name": e["category__name"],
+                "owner": e["owner__name"] or "-",
+                "total": e["total"],
+            })
+
+        expense_rows.append({
+            "site": s["site__name"],
+            "total": s["total"],
+            "expenses": expenses,
+        })
+
+    # =================================================
+    # ================= GRAND TOTAL ===================
+    # =================================================
+
+    civil_sum = sum(r["total"] for r in civil_rows)
+    dept_sum = sum(r["total"] for r in dept_rows)
+    material_sum = sum(r["total"] for r in material_rows)
+    expense_sum = sum(r["total"] for r in expense_rows)
+
+    grand_total = civil_sum + dept_sum + material_sum + expense_sum
+
+    return render_to_pdf_weasy(
+        "all_bills_pdf.html",
+        {
+            "from_date": from_date,
+            "to_date": to_date,
+            "civil_rows": civil_rows,
+            "dept_rows": dept_rows,
+            "material_rows": material_rows,
+            "expense_rows": expense_rows,
+            "grand_total": grand_total,
+            "now": timezone.now(),
+        },
+    )
+
+
+@login_required
+@pdf_view
+@read_only
+def bill_civil_pdf(request, team_id):
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date   = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+    if not to_date:
+        to_date = date.today()
+
+    team = get_object_or_404(Team, id=team_id)
+
+    # ================= SITE WISE =================
+    work_qs = (
+        ledger_queries.team_bill(team_id, from_date, to_date)
+        .annotate(
+            total=Coalesce(
+                Sum("total_amount"),
+                Value(0),
+                output_field=FloatField()
+            )
+        )
+        .order_by("site__name")
+    )
+
+    # ================= ADVANCE MAP (SAFE) =================
+    adv_qs = (
+        ledger_queries.team_bill_advances(team_id, from_date, to_date)  # ⚠️ works only if site exists
+        .annotate(
+            advance=Coalesce(
+                Sum("amount"),
+                Value(0),
+                output_field=FloatField()
+            )
+        )
+    )
+
+    adv_map = {a["site_id"]: a["advance"] for a in adv_qs}
+
+    rows = []
+    grand_total = 0
+    advance_total = 0
+
+    for w in work_qs:
+        adv = adv_map.get(w["site_id"], 0)
+
+        grand_total += w["total"]
+        advance_total += adv
+
+        rows.append({
+            "site": w["site__name"],
+            "advance": adv,
+            "total": w["total"],
+        })
+
+    advance_total = (
+        CivilAdvance.objects
+        .filter(team_id=team_id, date__range=[from_date, to_date])
+        .aggregate(
+            total=Coalesce(
+                Sum("amount"),
+                Value(0),
+                output_field=FloatField()
+            )
+        )["total"]
+    )
+
+    html = render_to_string(
+        "civil_team_pdf.html",
+        {
+            "team": team,
+            "rows": rows,
+            "advance_total": advance_total,
+            "grand_total": grand_total,
+            "from_date": from_date,
+            "to_date": to_date,
+        },
+    )
+
+    pdf = write_pdf(html)
+
+    response = HttpResponse(pdf, content_type="application/pdf")
+    response["Content-Disposition"] = (
+        f'inline; filename="team_{team_id}_bill.pdf"'
+    )
+    return response
+
+
+@login_required
+@pdf_view
+@read_only
+def bill_department_pdf(request, department_id):
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date   = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+    if not to_date:
+        to_date = date.today()
+
+    department = get_object_or_404(Department, id=department_id)
+
+    # ================= SITE-WISE =================
+    qs = (
+        DepartmentWork.objects
+        .filter(department=department, date__range=[from_date, to_date])
+        .values("site__name")
+        .annotate(
+            advance=Coalesce(
+                Sum("advance_amount"),
+                Value(0),
+                output_field=FloatField()
+            ),
+            total=Coalesce(
+                Sum("total_amount"),
+                Value(0),
+                output_field=FloatField()
+            ),
+        )
+        .order_by("site__name")
+    )
+
+    rows = []
+    total_adv = 0
+    total_amt = 0
+
+    for r in qs:
+        adv = r["advance"] or 0
+        tot = r["total"] or 0
+
+        total_adv += adv
+        total_amt += tot
+
+        rows.append({
+            "site": r["site__name"],
+            "advance": adv,
+            "total": tot,
+        })
+
+    html = render_to_string(
+        "civil_team_pdf.html",  # ✅ reuse same premium template
+        {
+            "team": department,  # template expects .name
+            "rows": rows,
+            "advance_total": total_adv,
+            "grand_total": total_amt,
+            "from_date": from_date,
+            "to_date": to_date,
+            "now": timezone.now(),
+        },
+    )
+
+    pdf = write_pdf(html)
+
+    response = HttpResponse(pdf, content_type="application/pdf")
+    response["Content-Disposition"] = (
+        f'inline; filename="department_{department_id}_bill.pdf"'
+    )
+    return response
+
+@login_required
+@pdf_view
+@read_only
+def bill_material_pdf(request, agent_id):
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date   = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+    if not to_date:
+        to_date = date.today()
+
+    agent = get_object_or_404(Agent, id=agent_id)
+
+    qs = (
+        MaterialEntry.objects
+        .filter(agent=agent, date__range=[from_date, to_date])
+        .values("site__name")
+        .annotate(
+            advance=Coalesce(
+                Sum("advance"),
+                Value(0),
+                output_field=FloatField()
+            ),
+            total_raw=Coalesce(
+                Sum("total"),
+                Value(0),
+                output_field=FloatField()
+            ),
+        )
+        .order_by("site__name")
+    )
+
+    rows = []
+    total_adv = 0
+    total_amt = 0
+
+    for r in qs:
+        adv = r["advance"] or 0
+        raw = r["total_raw"] or 0
+        payable = raw - adv
+
+        total_adv += adv
+        total_amt += payable
+
+        rows.append({
+            "site": r["site__name"],
+            "advance": adv,
+            "total": payable,
+        })
+
+    html = render_to_string(
+        "civil_team_pdf.html",
+        {
+            "team": agent,  # template expects .name
+            "rows": rows,
+            "advance_total": total_adv,
+            "grand_total": total_amt,
+            "from_date": from_date,
+            "to_date": to_date,
+            "now": timezone.now(),
+        },
+    )
+
+    pdf = write_pdf(html)
+
+    response = HttpResponse(pdf, content_type="application/pdf")
+    response["Content-Disposition"] = (
+        f'inline; filename="material_{agent_id}_bill.pdf"'
+    )
+    return response
+
+@login_required
+@pdf_view
+@read_only
+def bill_expense_pdf(request, category_id):
+    
+    from_date = parse_date(request.GET.get("from_date"))
+    to_date   = parse_date(request.GET.get("to_date"))
+
+    if not from_date:
+        from_date = date.today()
+    if not to_date:
+        to_date = date.today()
+
+    category = get_object_or_404(ExpenseCategory, id=category_id)
+
+    qs = (
+        OtherExpense.objects
+        .filter(category=category, date__range=[from_date, to_date])
+        .values("site__name")
+        .annotate(
+            total=Coalesce(
+                Sum("amount"),
+                Value(0),
+                output_field=FloatField()
+            )
+        )
+        .order_by("site__name")
+    )
+
+    rows = []
+    total_amt = 0
+
+    for r in qs:
+        tot = r["total"] or 0
+        total_amt += tot
+
+        rows.append({
+            "site": r["site__name"] or "-",
+            "advance": 0,
+            "total": tot,
+        })
+
+    html = render_to_string(
+        "civil_team_pdf.html",
+        {
+            "team": category,
+            "rows": rows,
+            "advance_total": 0,
+            "grand_total": total_amt,
+            "from_date": from_date,
+            "to_date": to_date,
+            "now": timezone.now(),
+        },
+    )
+
+    pdf = write_pdf(html)
+
+    response = HttpResponse(pdf, content_type="application/pdf")
+    response["Content-Disposition"] = (
+        f'inline; filename="expense_{category_id}_bill.pdf"'
+    )
+    return response
@@ -0,0 +1,306 @@
+from django.contrib.auth.decorators import login_required
+from collections import defaultdict
+from datetime import date, timedelta
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.db.models import Sum
+from ..models import (
+    Site, Team, Department, CivilDailyWork, DepartmentWork, CivilAdvance,
+    MaterialEntry, OtherExpense,
+)
+from ..db_router import read_only
+from ..query_budget import query_budget
+from .common import clean_id, parse_date, to_int
+
+
+@login_required
+@read_only
+def reports(request):
+    today = date.today()
+
+    from_date = parse_date(request.GET.get("from_date")) or today
+    to_date = parse_date(request.GET.get("to_date")) or today
+
+    site_id = request.GET.get("site")
+    team_id = request.GET.get("team")
+    dept_id = request.GET.get("department")
+    material_only = request.GET.get("material") == "yes"
+
+    sites = Site.objects.all()
+    teams = Team.objects.all()
+    departments = Department.objects.all()
+
+    rows = []
+
+    total_labour = 0
+    total_material = 0
+    total_advance = 0
+
+    # ===================== CIVIL =====================
+    if not material_only and not dept_id:
+        civil_qs = CivilDailyWork.objects.filter(date__range=[from_date, to_date])
+
+        if site_id:
+            civil_qs = civil_qs.filter(site_id=site_id)
+        if team_id:
+            civil_qs = civil_qs.filter(team_id=team_id)
+
+        
+        advance_qs = (
+            CivilAdvance.objects
+            .filter(date__range=[from_date, to_date])
+            .values("team_id", "date")
+            .annotate(total_advance=Sum("amount"))
+        )
+        
+        advance_map = {
+            (a["site_id"], a["team_id"], a["date"]): a["total_advance"]
+            for a in (
+                CivilAdvance.objects
+                .filter(date__range=[from_date, to_date])
+                .values("site_id", "team_id", "date")
+                .annotate(total_advance=Sum("amount"))
+            )
+        }
+
+        for r in civil_qs:
+            adv = advance_map.get((r.site_id, r.team_id, r.date), 0)
+            total = (r.labour_amount or 0) - (adv or 0)
+
+            rows.append({
+                "date": r.date,
+                "site": r.site,
+                "department": "Civil",
+                "team": r.team.name,
+                "labour": r.labour_amount,
+                "material": 0,
+                "advance": adv,
+                "total": total,
+            })
+
+            total_labour += r.labour_amount
+            total_advance += adv
+
+    # ===================== DEPARTMENT =====================
+    if not material_only and not team_id:
+        dept_qs = DepartmentWork.objects.filter(date__range=[from_date, to_date])
+
+        if site_id:
+            dept_qs = dept_qs.filter(site_id=site_id)
+        if dept_id:
+            dept_qs = dept_qs.filter(department_id=dept_id)
+
+        for d in dept_qs:
+            total = d.labour_amount - (d.advance_amount or 0)
+
+            rows.append({
+                "date": d.date,
+                "site": d.site,
+                "department": d.department.name,
+                "team": "-",
+                "labour": d.labour_amount,
+                "material": 0,
+                "advance": d.advance_amount or 0,
+                "total": total,
+            })
+
+            total_labour += d.labour_amount
+            total_advance += d.advance_amount or 0
+
+    # ===================== MATERIAL =====================
+    if material_only or (not team_id and not dept_id):
+        material_qs = (
+            MaterialEntry.objects
+            .filter(date__range=[from_date, to_date])
+            .select_related("agent")
+        )
+
+        if site_id:
+            material_qs = material_qs.filter(site_id=site_id)
+
+        for m in material_qs:
+            adv = m.advance or 0
+            net = (m.total or 0) - adv
+
+            rows.append({
+                "date": m.date,
+                "site": m.site,
+                "department": "Material",
+                "team": m.agent.name if m.agent else "-",
+                "labour": 0,
+                "material": m.total,
+                "advance": adv,
+                "total": net,
+            })
+
+            total_material += m.total
+            total_advance += adv
+
+    # ===================== EXPENSE =====================
+    if not material_only and not team_id and not dept_id:
+        expense_qs = OtherExpense.objects.filter(
+            date__range=[from_date, to_date]
+        ).select_related("category")
+
+        if site_id:
+            expense_qs = expense_qs.filter(site_id=site_id)
+
+        for e in expense_qs:
+            rows.append({
+                "date": e.date,
+                "site": e.site,
+                "department": "Expense",
+                "team": e.category.name,
+                "labour": 0,
+                "material": 0,
+                "advance": 0,
+                "total": e.amount or 0,
+            })
+
+            # IMPORTANT
+            total_material += e.amount or 0
+
+    # ================= SORT =================
+    rows = sorted(
+        rows,
+        key=lambda x: (
+            x["date"],
+            (x["site"].name if x["site"] else ""),
+            (x["department"] or ""),
+            (x["team"] or ""),
+        )
+    )
+
+    grand_total = total_labour + total_material - total_advance
+
+    # ================= SUMMARY =================
+    
+    team_site_totals = defaultdict(lambda: defaultdict(float))
+    dept_site_totals = defaultdict(lambda: defaultdict(float))
+    material_site_totals = defaultdict(lambda: defaultdict(float))
+
+    for r in rows:
+        site = r["site"].name
+
+        if r["department"] == "Civil":
+            team_site_totals[r["team"]][site] += r["total"]
+
+        elif r["department"] == "Material":
+            material_site_totals["Material"][site] += r["total"]
+
+        elif r["department"] == "Expense":
+            material_site_totals["Expense"][site] += r["total"]
+
+        else:
+            dept_site_totals[r["department"]][site] += r["total"]
+
+    return render(request, "reports.html", {
+        "sites": sites,
+        "teams": teams,
+        "departments": departments,
+        "rows": rows,
+
+        "total_labour": total_labour,
+        "total_material": total_material,
+        "total_advance": total_advance,
+        "grand_total": grand_total,
+
+        "team_site_totals": dict(team_site_totals),
+        "dept_site_totals": dict(dept_site_totals),
+        "material_site_totals": dict(material_site_totals),
+
+        "from_date": from_date,
+        "to_date": to_date,
+        "selected_site": site_id,
+        "selected_team": team_id,
+        "selected_department": dept_id,
+        "selected_material": request.GET.get("material"),
+    })
+
+
+# =========================================================
+# MATERIAL PRICE ANALYTICS (JSON)
+# =========================================================
+# price_analytics imports NumPy; like the PDF engines it loads on first use
+
+WINDOW_DAYS = 30
+
+
+def price_range(request):
+    """from_date / to_date, defaulting to the year up to today."""
+    to_date = parse_date(request.GET.get("to_date"))
+    if request.GET.get("from_date"):
+        from_date = parse_date(request.GET.get("from_date"))
+    else:
+        from_date = to_date - timedelta(days=364)
+    window = min(max(to_int(request.GET.get("window")) or WINDOW_DAYS, 1), 365)
+    return from_date, to_date, window
+
+
+@login_required
+@query_budget(6)
+@read_only
+def api_material_prices(request):
+    from .. import price_analytics
+
+    from_date, to_date, window = price_range(request)
+    return JsonResponse({
+        "from_date": from_date,
+        "to_date": to_date,
+        "window_days": window,
+        "items": price_analytics.overview(from_date, to_date, window),
+    })
+
+
+@login_required
+@query_budget(7)
+@read_only
+def api_material_price_history(request, item_id):
+    from .. import price_analytics
+
+    from_date, to_date, window = price_range(request)
+    return JsonResponse({
+        "from_date": from_date,
+        "to_date": to_date,
+        **price_analytics.item_history(
+            item_id, from_date, to_date, window,
+            agent_id=to_int(clean_id(request.GET.get("agent"))) or None,
+        ),
+    })
+
+
+# =========================================================
+# LEDGER PIVOTS (JSON)
+# =========================================================
+# over the in-memory snapshot in ledger_snapshot (NumPy, loaded on first use)
+
+@login_required
+@query_budget(6)
+def api_pivot(request):
+    from .. import ledger_snapshot
+
+    rows = request.GET.get("rows")
+    cols = request.GET.get("cols") or None
+    kinds = request.GET.getlist("kind")
+    measure = request.GET.get("measure", "amount")
+
+    for name, values, options in (
+        ("rows", [rows], ledger_snapshot.DIMENSIONS),
+        ("cols", [cols] if cols else [], ledger_snapshot.DIMENSIONS),
+        ("kind", kinds, ledger_snapshot.KINDS),
+        ("measure", [measure], ledger_snapshot.MEASURES),
+    ):
+        if any(value not in options for value in values):
+            return JsonResponse({"error": f"{name} must be one of {', '.join(options)}"}, status=400)
+
+    from_date = request.GET.get("from_date")
+    to_date = request.GET.get("to_date")
+
+    return JsonResponse(ledger_snapshot.pivot(
+        rows, cols,
+        kinds=kinds,
+        start=parse_date(from_date) if from_date else None,
+        end=parse_date(to_date) if to_date else None,
+        site_id=to_int(clean_id(request.GET.get("site"))) or None,
+        measure=measure,
+    ))
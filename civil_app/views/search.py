@@ -0,0 +1,68 @@
+from datetime import date
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+
+from .. import autocomplete, search as search_index
+from ..db_router import read_only
+from ..query_budget import query_budget
+from .common import clean_id, to_int
+
+
+def optional_date(val):
+    try:
+        return date.fromisoformat(val)
+    except (TypeError, ValueError):
+        return None
+
+
+@login_required
+@query_budget(4)
+@read_only
+def api_search(request):
+    """Ranked matches over materials, expenses and daily notes.
+
+    GET q, optional site / from_date / to_date, page (20 per page).
+    """
+    query = request.GET.get("q", "")
+    page = max(to_int(request.GET.get("page")), 1)
+
+    results, has_next = search_index.search(
+        query,
+        site_id=to_int(clean_id(request.GET.get("site"))) or None,
+        from_date=optional_date(request.GET.get("from_date")),
+        to_date=optional_date(request.GET.get("to_date")),
+        page=page,
+    )
+
+    return JsonResponse({
+        "query": query,
+        "page": page,
+        "has_next": has_next,
+        "results": results,
+    })
+
+
+@login_required
+@query_budget(6)
+def api_autocomplete(request):
+    """Suggestions for the typed-in names on site_detail.
+
+    GET field (agent / material / unit / expense), q, optional limit.
+    Ranked by how often and how recently each name was used.
+    """
+    field = request.GET.get("field")
+    if field not in autocomplete.FIELDS:
+        return JsonResponse({"error": f"field must be one of {', '.join(autocomplete.FIELDS)}"}, status=400)
+
+    query = request.GET.get("q", "")
+    limit = min(to_int(request.GET.get("limit")) or autocomplete.LIMIT, 50)
+
+    return JsonResponse({
+        "field": field,
+        "query": query,
+        "results": [
+            {"value": s.value, "count": s.count, "last_used": s.last_used}
+            for s in autocomplete.complete(field, query, limit)
+        ],
+    })
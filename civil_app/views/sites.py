@@ -0,0 +1,781 @@
+import json
+from django.db import transaction
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from datetime import date, timedelta, datetime
+from django.shortcuts import render, redirect, get_object_or_404
+from django.db.models import Sum
+from django.contrib import messages
+from .. import changes, ledger_queries
+from ..day_import import TeamRates
+from ..models import (
+    Site, Team, Department, CivilDailyWork, DepartmentWork, DefaultRate,
+    CivilAdvance, MaterialEntry, SiteDailyNote, OtherExpense, Owner,
+    Agent, MaterialItem, ExpenseCategory,
+)
+from .common import (
+    staff_required, admin_required, to_int, calculate_civil_labour,
+    parse_date,
+)
+
+
+# =========================================================
+# Site_Entry
+# =========================================================
+@login_required
+def site_entry(request):
+    today = date.today()
+    
+    week_start = today - timedelta(days=(today.weekday() + 1) % 7)
+    week_end = week_start + timedelta(days=6)
+
+    sites = Site.objects.all()
+    data = []
+
+    for site in sites:
+
+        # ================= TODAY =================
+        civil_today = CivilDailyWork.objects.filter(
+            site=site, date=today
+        ).aggregate(labour=Sum("labour_amount"))
+
+        dept_today = DepartmentWork.objects.filter(
+            site=site, date=today
+        ).aggregate(
+            labour=Sum("labour_amount"),
+            advance=Sum("advance_amount")
+        )
+
+        civil_advance_today = CivilAdvance.objects.filter(
+            site=site, date=today
+        ).aggregate(total=Sum("amount"))
+
+        material_today = MaterialEntry.objects.filter(
+            site=site, date=today
+        ).aggregate(
+            total=Sum("total"),
+            advance=Sum("advance"),
+        )
+
+        # ================= EXPENSE TODAY =================
+        expense_today = OtherExpense.objects.filter(
+            site=site,
+            date=today
+        ).aggregate(total=Sum("amount"))
+
+        today_labour = (civil_today["labour"] or 0) + (dept_today["labour"] or 0)
+        today_advance = (civil_advance_today["total"] or 0) + (dept_today["advance"] or 0)
+        today_material = material_today["total"] or 0
+        material_adv_today = material_today["advance"] or 0
+        expense_today_total = expense_today["total"] or 0
+
+        today_total = (
+            today_labour
+            + today_material
+            + expense_today_total
+            - (today_advance + material_adv_today)
+        )
+
+
+        # ================= WEEK =================
+        civil_week = CivilDailyWork.objects.filter(
+            site=site,
+            date__range=[week_start, week_end]
+        ).aggregate(labour=Sum("labour_amount"))
+
+        dept_week = DepartmentWork.objects.filter(
+            site=site,
+            date__range=[week_start, week_end]
+        ).aggregate(
+            labour=Sum("labour_amount"),
+            advance=Sum("advance_amount")
+        )
+
+        civil_adv_week = CivilAdvance.objects.filter(
+            site=site,
+            date__range=[week_start, week_end]
+        ).aggregate(total=Sum("amount"))
+
+        material_week = MaterialEntry.objects.filter(
+            site=site,
+            date__range=[week_start, week_end]
+        ).aggregate(
+            total=Sum("total"),
+            advance=Sum("advance"),
+        )
+
+        # ================= EXPENSE WEEK =================
+        expense_week = OtherExpense.objects.filter(
+            site=site,
+            date__range=[week_start, week_end]
+        ).aggregate(total=Sum("amount"))
+
+        week_labour = (civil_week["labour"] or 0) + (dept_week["labour"] or 0)
+        week_advance = (civil_adv_week["total"] or 0) + (dept_week["advance"] or 0)
+        week_material = material_week["total"] or 0
+        material_adv_week = material_week["advance"] or 0
+        expense_week_total = expense_week["total"] or 0
+        weekly_advance = week_advance + material_adv_week
+
+        weekly_total = (
+            week_labour
+            + week_material
+            + expense_week_total
+            - (week_advance + material_adv_week)
+        )
+
+        data.append({
+            "site": site,
+            "today_total": today_total,
+            "weekly_total": weekly_total,
+            "today_advance": today_advance,
+            "weekly_advance": weekly_advance,
+            "today_expense": expense_today_total,
+        })
+
+    return render(request, "site_entry.html", {
+        "sites": data
+    })
+
+# =========================================================
+# SITE MANAGEMENT
+# =========================================================
+@login_required
+@admin_required
+def site_manage(request):
+
+    if request.method == "POST":
+        name = request.POST.get("name")
+
+        if name:
+            Site.objects.create(name=name)
+
+        return redirect("site_manage")
+
+    sites = Site.objects.all().order_by("name")
+
+    return render(request, "site_manage.html", {
+        "sites": sites
+    })
+
+
+
+@login_required
+def add_site(request):
+
+    if request.method == "POST":
+
+        data = json.loads(request.body)
+
+        name = data.get("name")
+
+        site = Site.objects.create(name=name)
+
+        return JsonResponse({
+            "status": "ok",
+            "id": site.id
+        })
+    
+@login_required
+def edit_site(request, id):
+
+    site = get_object_or_404(Site, id=id)
+
+    if request.method == "POST":
+
+        data = json.loads(request.body)
+
+        name = data.get("name")
+
+        if name:
+            site.name = name
+            site.save()
+
+        return JsonResponse({"status": "ok"})
+
+
+@login_required
+@staff_required
+def delete_site(request, id):
+    Site.objects.filter(id=id).delete()
+    return redirect("site_entry")
+
+
+# =========================================================
+# DAILY ENTRY (SITE DETAIL)
+# =========================================================
+def save_day(site, work_date, data):
+    """Write one day sheet (the site_detail form, or a queued copy of it).
+
+    ``data`` is the form as a QueryDict. The whole day is written in one
+    transaction (BEGIN IMMEDIATE on SQLite), holding the site row so saves
+    of the same site never interleave.
+    """
+    with transaction.atomic():
+        Site.objects.select_for_update().get(id=site.id)
+        desc = data.get("daily_description", "").strip()
+
+        if desc:
+            # ✅ create or update
+            SiteDailyNote.objects.update_or_create(
+                site=site,
+                date=work_date,
+                defaults={"description": desc}
+            )
+        else:
+            # ✅ delete if user cleared
+            SiteDailyNote.objects.filter(
+                site=site,
+                date=work_date
+            ).delete()
+
+
+
+        # =================================================
+        # ================= CIVIL =========================
+        # =================================================
+        team_ids = set()
+
+        for key in data:
+
+            if key.startswith("mason_full_") \
+            or key.startswith("helper_full_") \
+            or key.startswith("mason_half_") \
+            or key.startswith("helper_half_") \
+            or key.startswith("advance_"):
+
+                team_ids.add(int(key.split("_")[-1]))
+
+        for team_id in team_ids:
+
+            team = Team.objects.get(id=team_id)
+
+            mf = to_int(data.get(f"mason_full_{team.id}"))
+            hf = to_int(data.get(f"helper_full_{team.id}"))
+            mh = to_int(data.get(f"mason_half_{team.id}"))
+            hh = to_int(data.get(f"helper_half_{team.id}"))
+
+            adv_raw = data.get(f"advance_{team.id}")
+            adv = float(adv_raw) if adv_raw not in [None, ""] else 0
+
+            if (
+                data.get(f"mason_full_{team.id}") is None and
+                data.get(f"helper_full_{team.id}") is None and
+                data.get(f"mason_half_{team.id}") is None and
+                data.get(f"helper_half_{team.id}") is None and
+                adv_raw is None
+            ):
+                continue
+            # Save advance separately
+            if adv_raw not in [None, ""]:
+                CivilAdvance.objects.update_or_create(
+                    site=site,
+                    team=team,
+                    date=work_date,
+                    defaults={"amount": adv}
+                )
+
+            labour = calculate_civil_labour(team, mf, hf, mh, hh, work_date)
+            total = labour - adv
+
+            if mf or hf or mh or hh or adv:
+                CivilDailyWork.objects.update_or_create(
+                    site=site,
+                    team=team,
+                    date=work_date,
+                    defaults={
+                        "mason_full": mf,
+                        "helper_full": hf,
+                        "mason_half": mh,
+                        "helper_half": hh,
+                        "labour_amount": labour,
+                        "total_amount": total,
+                    }
+                )
+            else:
+                CivilDailyWork.objects.filter(
+                    site=site,
+                    team=team,
+                    date=work_date
+                ).delete()
+
+        # =================================================
+        # =============== OTHER DEPARTMENTS ===============
+        # =================================================
+        dept_ids = set()
+
+        for key in data:
+
+            if key.startswith("dept_full_") \
+            or key.startswith("dept_half_") \
+            or key.startswith("dept_advance_") \
+            or key.startswith("dept_rate_"):
+
+                dept_ids.add(int(key.split("_")[-1]))
+
+
+        for dept_id in dept_ids:
+
+            dept = Department.objects.get(id=dept_id)
+
+            full = to_int(data.get(f"dept_full_{dept.id}"))
+            half = to_int(data.get(f"dept_half_{dept.id}"))
+
+            adv_raw = data.get(f"dept_advance_{dept.id}")
+            adv = float(adv_raw) if adv_raw not in [None, ""] else 0
+
+            rate = DefaultRate.objects.filter(department=dept).first()
+            if not rate:
+                continue
+
+            rate_input = data.get(f"dept_rate_{dept.id}")
+
+            try:
+                rate_val = float(rate_input) if rate_input else rate.full_day_rate
+            except ValueError:
+                rate_val = rate.full_day_rate
+
+            labour = (full * rate_val) + (half * rate_val / 2)
+            total = labour - adv
+
+            if full or half or adv:
+                DepartmentWork.objects.update_or_create(
+                    site=site,
+                    department=dept,
+                    date=work_date,
+                    defaults={
+                        "full_day_count": full,
+                        "half_day_count": half,
+                        "full_day_rate": rate_val,
+                        "half_day_rate": int(rate_val) // 2,
+                        "labour_amount": labour,
+                        "advance_amount": adv,
+                        "total_amount": total,
+                    }
+                )
+            else:
+                DepartmentWork.objects.filter(
+                    site=site,
+                    department=dept,
+                    date=work_date
+                ).delete()
+
+        # =================================================
+        # ================= MATERIAL ======================
+        # =================================================
+        MaterialEntry.objects.filter(site=site, date=work_date).delete()
+
+        i = 0
+        while True:
+            name = data.get(f"material_name_{i}")
+            if not name:
+                break
+
+            qty = float(data.get(f"material_qty_{i}", 0))
+            rate = float(data.get(f"material_rate_{i}", 0))
+            advance = float(data.get(f"material_advance_{i}", 0) or 0)
+            unit = data.get(f"material_unit_{i}", "").strip()
+            agent = data.get(f"agent_name_{i}", "")
+
+            item = MaterialItem.resolve(name, unit=unit)
+            if item is None:
+                # a name of only spaces: no item to book it against
+                i += 1
+                continue
+            if unit and item.unit != unit:
+                item.unit = unit
+                item.save(update_fields=["unit"])
+
+            MaterialEntry.objects.create(
+                site=site,
+                date=work_date,
+                item=item,
+                agent=Agent.resolve(agent),
+                quantity=qty,
+                unit=unit,
+                rate=rate,
+                advance=advance,
+                total=qty * rate,
+            )
+            i += 1
+
+        # ================= OTHER EXPENSE =================
+    
+        OtherExpense.objects.filter(site=site, date=work_date).delete()
+
+        i = 0
+        while True:
+            title = data.get(f"expense_title_{i}")
+            if title is None:
+                break
+
+            owner_id = data.get(f"expense_owner_{i}")
+            amount = data.get(f"expense_amount_{i}") or 0
+            notes = data.get(f"expense_notes_{i}") or ""
+
+            # ✅ CONVERT OWNER
+            owner_obj = None
+            if owner_id:
+                try:
+                    owner_obj = Owner.objects.get(id=owner_id)
+                except Owner.DoesNotExist:
+                    owner_obj = None
+
+            # ✅ SAVE
+            if title.strip():
+                OtherExpense.objects.create(
+                    site=site,
+                    date=work_date,
+                    category=ExpenseCategory.resolve(title),
+                    owner=owner_obj,   # ⭐ VERY IMPORTANT
+                    amount=float(amount or 0),
+                    notes=notes.strip(),
+                )
+
+            i += 1
+
+
+@login_required
+@staff_required
+def site_detail(request, site_id):
+    site = get_object_or_404(Site, id=site_id)
+    sites = Site.objects.all().order_by("name")
+
+    # ---------------- DATE ----------------
+    raw_date = request.GET.get("date") or request.POST.get("date")
+    if isinstance(raw_date, str) and raw_date:
+        work_date = parse_date(raw_date)
+    else:
+        work_date = None
+
+    work_date = work_date or date.today()
+
+    teams = Team.objects.all()
+    departments = Department.objects.exclude(name="Civil")
+
+    # ================= SAVE =================
+    if request.method == "POST":
+        save_day(site, work_date, request.POST)
+
+    # ================= DISPLAY =================
+
+    civil_map = {
+        c.team_id: c
+        for c in CivilDailyWork.objects.filter(site=site, date=work_date)
+    }
+
+    advance_map = {
+        a.team_id: a.amount
+        for a in CivilAdvance.objects.filter(site=site, date=work_date)
+    }
+
+    # every rate loaded once; each team's for this day (also offered to add-team)
+    team_rates = TeamRates()
+    team_options = [(team, team_rates.at(team.id, work_date)) for team in teams]
+
+    civil_rows = []
+
+    for team, rate in team_options:
+        if not rate:
+            continue
+
+        work = civil_map.get(team.id)
+        advance = advance_map.get(team.id, 0)
+
+        # ⭐ ONLY SHOW teams with entry
+        if not work and advance == 0:
+            continue
+
+        civil_rows.append({
+            "team": team,
+            "rate": rate,
+            "work": work,
+            "labour": work.labour_amount if work else 0,
+            "advance": advance,
+            "total": work.total_amount if work else 0,
+        })
+
+    dept_map = {
+        d.department_id: d
+        for d in DepartmentWork.objects.filter(site=site, date=work_date)
+    }
+
+    materials = (
+        ledger_queries.day_materials(site.id, work_date)
+        .select_related("agent", "item")
+    )
+
+    default_rates = {
+        r.department_id: r.full_day_rate
+        for r in DefaultRate.objects.all()
+    }
+
+    note_obj = SiteDailyNote.objects.filter(
+        site=site,
+        date=work_date
+    ).first()
+
+    existing_description = note_obj.description if note_obj else ""
+    other_expenses = ledger_queries.day_expenses(
+        site.id,
+        work_date
+    ).select_related("owner", "category")
+    owners = ledger_queries.owner_cash_entries()
+    owner_cash_entries = ledger_queries.owner_cash_entries()
+
+    return render(request, "site_detail.html", {
+        
+        "site": site,
+        "sites": sites,
+        "teams": teams,
+        "work_date": work_date,
+        "civil_rows": civil_rows,
+        "dept_map": dept_map,
+        "materials": materials,
+        "other_depts": departments,
+        "default_rates": default_rates,
+        "daily_description": existing_description,
+        "other_expenses": other_expenses,
+        "owners": owners,
+        "owner_cash_entries": owner_cash_entries,
+        "team_options": team_options,
+        # the offline queue sends both back; newer ones on the server are a conflict
+        "day_version": changes.day_version(site.id, work_date),
+        "epoch": changes.epoch(),
+    })
+
+
+# =========================================================
+# RESET
+# =========================================================
+@login_required
+@staff_required
+@transaction.atomic
+def reset_site_today(request, site_id):
+    site = get_object_or_404(Site, id=site_id)
+    today = date.today()
+
+    CivilDailyWork.objects.filter(site=site, date=today).delete()
+    DepartmentWork.objects.filter(site=site, date=today).delete()
+    CivilAdvance.objects.filter(site=site, date=today).delete()
+    MaterialEntry.objects.filter(site=site, date=today).delete()
+    SiteDailyNote.objects.filter(site=site, date=today).delete()
+    OtherExpense.objects.filter(site=site, date=today).delete()
+
+    return redirect("site_detail", site_id=site.id)
+
+@login_required
+@staff_required
+@transaction.atomic
+def reset_site_month(request, site_id):
+    site = get_object_or_404(Site, id=site_id)
+    today = date.today()
+
+    CivilDailyWork.objects.filter(
+        site=site,
+        date__year=today.year,
+        date__month=today.month
+    ).delete()
+
+    DepartmentWork.objects.filter(
+        site=site,
+        date__year=today.year,
+        date__month=today.month
+    ).delete()
+
+    CivilAdvance.objects.filter(
+        site=site,
+        date__year=today.year,
+        date__month=today.month
+    ).delete()
+
+    MaterialEntry.objects.filter(
+        site=site,
+        date__year=today.year,
+        date__month=today.month
+    ).delete()
+
+    SiteDailyNote.objects.filter(
+        site=site,
+        date__year=today.year,
+        date__month=today.month
+    ).delete()
+
+    OtherExpense.objects.filter(
+        site=site,
+        date__year=today.year,
+        date__month=today.month
+    ).delete()
+
+    return redirect("site_detail", site_id=site.id)
+
+@login_required
+@staff_required
+@transaction.atomic
+def reset_site_all(request, site_id):
+    site = get_object_or_404(Site, id=site_id)
+
+    CivilDailyWork.objects.filter(site=site).delete()
+    DepartmentWork.objects.filter(site=site).delete()
+    CivilAdvance.objects.filter(site=site).delete()
+    MaterialEntry.objects.filter(site=site).delete()
+    SiteDailyNote.objects.filter(site=site).delete()
+    OtherExpense.objects.filter(site=site).delete()
+    
+    return redirect("site_detail", site_id=site.id)
+
+@transaction.atomic
+def reset_site_date(request, site_id):
+    site = get_object_or_404(Site, id=site_id)
+
+    date_str = request.GET.get("date")
+    if not date_str:
+        return redirect("site_detail", site_id=site.id)
+
+    try:
+        selected_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    except:
+        return redirect("site_detail", site_id=site.id)
+
+    
+    CivilDailyWork.objects.filter(site=site, date=selected_date).delete()
+    DepartmentWork.objects.filter(site=site, date=selected_date).delete()
+    MaterialEntry.objects.filter(site=site, date=selected_date).delete()
+    CivilAdvance.objects.filter(site=site, date=selected_date).delete()
+    OtherExpense.objects.filter(site=site, date=selected_date).delete()
+
+    return redirect(f"/site/{site.id}/?date={selected_date}")
+
+@login_required
+def copy_previous_day(request, site_id):
+    site = get_object_or_404(Site, id=site_id)
+
+    date_str = request.GET.get("date")
+    if not date_str:
+        messages.error(request, "Date missing")
+        return redirect(f"/site/{site_id}/")
+
+    today = parse_date(date_str)
+    prev_date = today - timedelta(days=1)
+
+    # ✅ flags from modal
+    copy_civil = request.GET.get("civil") == "1"
+    copy_dept = request.GET.get("dept") == "1"
+    copy_material = request.GET.get("material") == "1"
+    copy_desc = request.GET.get("desc") == "1"
+    replace = request.GET.get("replace") == "1"
+
+    with transaction.atomic():
+
+        # ================= CIVIL =================
+        if copy_civil:
+            prev_rows = CivilDailyWork.objects.filter(
+                site=site,
+                date=prev_date
+            )
+
+            advances = dict(
+                CivilAdvance.objects.filter(site=site, date=today).values_list("team_id", "amount")
+            )
+
+            for row in prev_rows:
+
+                if replace:
+                    CivilDailyWork.objects.filter(
+                        site=site,
+                        team=row.team,
+                        date=today
+                    ).delete()
+
+                # priced at today's rate, net of today's advance (not yesterday's)
+                labour = calculate_civil_labour(
+                    row.team, row.mason_full, row.helper_full, row.mason_half, row.helper_half, today
+                )
+                CivilDailyWork.objects.update_or_create(
+                    site=site,
+                    team=row.team,
+                    date=today,
+                    defaults={
+                        "mason_full": row.mason_full,
+                        "helper_full": row.helper_full,
+                        "mason_half": row.mason_half,
+                        "helper_half": row.helper_half,
+                        "labour_amount": labour,
+                        "total_amount": labour - advances.get(row.team_id, 0),
+                    }
+                )
+
+        # ================= DEPARTMENT =================
+
+        if copy_dept:
+            prev_rows = DepartmentWork.objects.filter(
+                site=site,
+                date=prev_date
+            )
+
+            for row in prev_rows:
+
+                if replace:
+                    DepartmentWork.objects.filter(
+                        site=site,
+                        department=row.department,
+                        date=today
+                    ).delete()
+
+                DepartmentWork.objects.update_or_create(
+                    site=site,
+                    department=row.department,
+                    date=today,
+                    defaults={
+                        "full_day_count": row.full_day_count,
+                        "half_day_count": row.half_day_count,
+                        "full_day_rate": row.full_day_rate,
+                        "half_day_rate": row.half_day_rate,   # ✅ ⭐ CRITICAL FIX
+                        "advance_amount": row.advance_amount,
+                        "labour_amount": row.labour_amount,
+                        "total_amount": row.total_amount,
+                    }
+                )
+
+        # ================= MATERIAL =================
+        if copy_material:
+            if replace:
+                MaterialEntry.objects.filter(
+                    site=site,
+                    date=today
+                ).delete()
+
+            prev_rows = MaterialEntry.objects.filter(
+                site=site,
+                date=prev_date
+            )
+
+            for m in prev_rows:
+                MaterialEntry.objects.create(
+                    site=site,
+                    date=today,
+                    agent_id=m.agent_id,
+                    item_id=m.item_id,
+                    quantity=m.quantity,
+                    unit=m.unit,
+                    rate=m.rate,
+                    advance=m.advance,
+                    total=m.total,
+                )
+
+        # ================= DESCRIPTION =================
+        if copy_desc:
+            prev_desc = SiteDailyNote.objects.filter(
+                site=site,
+                date=prev_date
+            ).first()
+
+            if prev_desc:
+                SiteDailyNote.objects.update_or_create(
+                    site=site,
+                    date=today,
+                    defaults={"description": prev_desc.description}
+                )
+
+    messages.success(request, "✅ Previous day copied successfully")
+    return redirect(f"/site/{site_id}/?date={today}")
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+from datetime import date, timedelta
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.http import JsonResponse, QueryDict
+from django.shortcuts import render
+from django.templatetags.static import static
+from django.utils import timezone
+
+from .. import changes
+from ..models import Site, SyncedEdit
+from ..query_budget import query_budget
+from .common import staff_required, to_int
+from .sites import save_day
+
+
+SYNC_MAX = 20  # queued day sheets per request
+# a day sheet costs ~45 queries plus ~25 per material / expense row; edits
+# that would take a request past this wait for the next one
+SYNC_BUDGET = 400
+SYNC_SEEN = timedelta(days=1)  # how long an applied edit id is remembered
+SYNC_ID_MAX = SyncedEdit._meta.get_field("edit_id").max_length
+
+logger = logging.getLogger("civil_app.sync")
+
+# cached by the service worker at install; site pages are cached as visited
+OFFLINE_ASSETS = [
+    "css/base.css", "css/site_detail.css", "images/logo.jpeg",
+    "js/base.js", "js/site_detail.js", "js/offline.js",
+]
+
+
+# =========================================================
+# CHANGE FEED (JSON)
+# =========================================================
+# clients keep a local copy of the ledger: page every kind once, then poll
+# /api/changes/?since=<cursor>&epoch=<epoch> (see civil_app.changes)
+
+def _limit(request):
+    limit = to_int(request.GET.get("limit"))
+    return min(limit, changes.FEED_MAX) if limit > 0 else changes.FEED_LIMIT
+
+
+@login_required
+@query_budget(12)
+def api_changes(request):
+    """The next batch of ledger changes after ``since``.
+
+    Answers ``reset`` with a fresh cursor instead when the client has no
+    cursor, one from the future, or an old epoch (a bulk load or restore
+    happened since): it should copy every kind again through
+    ``api/changes/snapshot/`` and carry on from that cursor.
+    """
+    since = request.GET.get("since")
+    limit = _limit(request)
+    epoch = changes.epoch()
+    latest = changes.latest()
+
+    if since is None or not since.isdigit():
+        if since:
+            return JsonResponse({"error": "since must be a cursor"}, status=400)
+        reset = True
+    else:
+        reset = int(since) > latest or request.GET.get("epoch") != epoch
+    if reset:
+        return JsonResponse({"reset": True, "epoch": epoch, "cursor": latest, "kinds": list(changes.KIND_MODELS)})
+
+    batch = changes.feed(int(since), limit)
+    return JsonResponse({"reset": False, "epoch": epoch, **batch})
+
+
+@login_required
+@query_budget(4)
+def api_changes_snapshot(request):
+    """One page of a kind's current rows, in the feed's column layout."""
+    kind = request.GET.get("kind")
+    if kind not in changes.KIND_MODELS:
+        return JsonResponse({"error": f"kind must be one of {', '.join(changes.KIND_MODELS)}"}, status=400)
+    limit = _limit(request)
+    return JsonResponse(changes.page(kind, to_int(request.GET.get("after")), limit))
+
+
+# =========================================================
+# OFFLINE DAY SHEETS
+# =========================================================
+# static/js/offline.js queues each site_detail save in IndexedDB and sends
+# the queue here; templates/sw.js serves cached site pages while offline
+
+class EditError(ValueError):
+    pass
+
+
+def _edit(raw):
+    """(site_id, date, base version, form) of one queued day sheet."""
+    try:
+        site_id, base = int(raw["site"]), int(raw["base"])
+        day = date.fromisoformat(raw["date"])
+        form = QueryDict(mutable=True)
+        for name, value in raw["fields"]:
+            form.appendlist(str(name), str(value))
+    except (KeyError, TypeError, ValueError):
+        raise EditError("an edit needs site, date (YYYY-MM-DD), base and fields [[name, value]]")
+    form["date"] = day.isoformat()
+    return site_id, day, base, form
+
+
+def _apply(raw):
+    """Save one queued day sheet unless the day changed since the client loaded it."""
+    site_id, day, base, form = _edit(raw)
+    # held to the end of this edit's transaction: no other save of the site
+    # lands between the version check and the write
+    site = Site.objects.select_for_update().filter(id=site_id).first()
+    if site is None:
+        raise EditError(f"site {site_id} does not exist")
+
+    # imports, restores and generated data rewrite days without journalling
+    # them; they move the epoch instead
+    current, epoch = changes.day_version(site_id, day), changes.epoch()
+    if (current != base or str(raw.get("epoch")) != epoch) and not raw.get("force"):
+        return {"status": "conflict", "version": current, "epoch": epoch}
+    try:
+        save_day(site, day, form)
+    except (ValueError, ObjectDoesNotExist) as e:
+        raise EditError(f"could not save the day: {e}")
+    return {"status": "applied", "version": changes.day_version(site_id, day), "epoch": epoch}
+
+
+@login_required
+@staff_required
+@query_budget(SYNC_BUDGET)
+def api_sync(request):
+    """Apply queued day-sheet saves, each in its own transaction.
+
+    POST ``{"edits": [{"id", "site", "date", "base", "epoch", "fields", "force"?}]}``
+    where ``fields`` is the site_detail form as [name, value] pairs and
+    ``base`` / ``epoch`` the day_version and journal epoch the page was
+    loaded with. Each edit answers ``applied`` (with the day's new version),
+    ``conflict`` (someone saved the day since ``base``, or a bulk load moved
+    the epoch; nothing written, resend with ``force`` to overwrite), ``error`` (that edit rolled back, the others still apply)
+    or ``queued`` (the request's query budget is spent; send it again).
+    Applied edit ids are stored with their answer (SyncedEdit) in the
+    edit's own transaction, so a batch whose response was lost can be sent
+    again to any worker and answers as it did then.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "POST the queued edits as JSON"}, status=405)
+    try:
+        edits = json.loads(request.body)["edits"]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": "POST the queued edits as JSON"}, status=400)
+    if not isinstance(edits, list) or len(edits) > SYNC_MAX:
+        return JsonResponse({"error": f"edits must be a list of at most {SYNC_MAX}"}, status=400)
+
+    SyncedEdit.objects.filter(user=request.user, at__lt=timezone.now() - SYNC_SEEN).delete()
+    ids = [str(raw.get("id", "")) for raw in edits if isinstance(raw, dict)]
+    seen = dict(
+        SyncedEdit.objects.filter(user=request.user, edit_id__in=ids)
+        .values_list("edit_id", "result")
+    )
+
+    stats = getattr(request, "query_stats", None)
+    heaviest = 0
+    results = []
+    for raw in edits:
+        edit_id = str(raw.get("id", "")) if isinstance(raw, dict) else ""
+        result = seen.get(edit_id)
+        if result is None and stats and heaviest and stats.count + heaviest > SYNC_BUDGET:
+            result = {"status": "queued"}
+        elif result is None:
+            before = stats.count if stats else 0
+            try:
+                # short transactions: the journal rows commit with their edit
+                with transaction.atomic():
+                    if not edit_id or len(edit_id) > SYNC_ID_MAX:
+                        raise EditError(f"an edit needs an id of at most {SYNC_ID_MAX} characters")
+                    result = _apply(raw)
+                    if result["status"] == "applied":
+                        SyncedEdit.objects.create(user=request.user, edit_id=edit_id, result=result)
+                        seen[edit_id] = result
+            except EditError as e:
+                result = {"status": "error", "error": str(e)}
+            except Exception:
+                logger.exception("offline edit %s of user %s failed", edit_id, request.user.id)
+                result = {"status": "error", "error": "could not save the day"}
+            if stats:
+                heaviest = max(heaviest, stats.count - before)
+        results.append({"id": edit_id, **result})
+    return JsonResponse({"results": results})
+
+
+def service_worker(request):
+    """The offline service worker, served from / so it can control site pages."""
+    assets = [static(path) for path in OFFLINE_ASSETS]
+    response = render(request, "sw.js", {
+        "assets": json.dumps(assets),
+        # new static files (hashed names) -> new worker -> fresh cache
+        "version": hashlib.md5("".join(assets).encode()).hexdigest()[:12],
+    }, content_type="application/javascript")
+    response["Cache-Control"] = "no-cache"
+    return response
@@ -0,0 +1,8 @@
+import os
+
+
+def settings_module():
+    """``civil_project.settings_production`` when DJANGO_ENV=production."""
+    if os.environ.get("DJANGO_ENV") == "production":
+        return "civil_project.settings_production"
+    return "civil_project.settings"
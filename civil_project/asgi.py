@@ -3,6 +3,10 @@ ASGI config for civil_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served by uvicorn (the ``asgi`` process in the Procfile). The bill modal and
+day-detail JSON APIs are async views, so one worker keeps answering them
+while PDF renders run on the bounded pool in ``civil_app.utils.pdf``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -11,6 +15,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'civil_project.settings')
+from civil_project import settings_module
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module())
 
 application = get_asgi_application()
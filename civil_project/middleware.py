@@ -0,0 +1,104 @@
+import re
+import secrets
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+re_accepts_brotli = re.compile(r"\bbr\b")
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that stays async under ASGI.
+
+    Stock WhiteNoise is sync-only, which makes Django run everything below it
+    (including async views) through a thread. Static files are looked up in
+    memory and served the same way; everything else is awaited.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that answers with brotli when the browser accepts it.
+
+    Pages and JSON only; static files arrive precompressed from WhiteNoise.
+    Streaming responses (CSV exports) stay on gzip.
+
+    Like Django's gzip (which hides random bytes in the gzip filename field),
+    each brotli body carries up to ``max_random_bytes`` of random padding so
+    its length cannot be used to guess the CSRF token byte by byte (BREACH).
+    The padding sits in a brotli metadata meta-block, which decoders skip.
+    """
+
+    brotli_quality = 5  # fast enough per response, still well ahead of gzip
+
+    def process_response(self, request, response):
+        if (
+            brotli is None
+            or response.streaming
+            or len(response.content) < 200
+            or response.has_header("Content-Encoding")
+            or not re_accepts_brotli.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        compressed = brotli_compress(response.content, self.brotli_quality, self.max_random_bytes)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+
+        return response
+
+
+def brotli_compress(content, quality, max_random_bytes):
+    """Brotli stream of ``content`` followed by 1..max_random_bytes of padding.
+
+    ``flush`` ends the data on a byte boundary, the padding goes in as a
+    metadata meta-block (RFC 7932 9.2: ISLAST=0, MNIBBLES=0, one MSKIPBYTES
+    byte holding MSKIPLEN - 1, then the skipped bytes) and ``finish`` writes
+    the closing empty last meta-block.
+    """
+    compressor = brotli.Compressor(quality=quality)
+    data = compressor.process(content) + compressor.flush()
+
+    length = secrets.randbelow(min(max_random_bytes, 256)) + 1
+    header = (0b11 << 1) | (1 << 4) | ((length - 1) << 6)
+    padding = header.to_bytes(2, "little") + secrets.token_bytes(length)
+
+    return data + padding + compressor.finish()
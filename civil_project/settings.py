@@ -50,7 +50,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'civil_app.query_budget.QueryBudgetMiddleware',
+    'civil_app.ledger_cache.LedgerCacheMiddleware',
+    'civil_project.middleware.AsyncWhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -107,7 +109,28 @@ if DATABASE_URL:
         )
     }
 else:
-    # Local development → SQLite
+    # Local / single-host → SQLite. IMMEDIATE takes the write lock at BEGIN,
+    # so concurrent saves queue on the busy timeout instead of failing
+    # mid-transaction with "database is locked". SQLITE_TUNED=0 restores the
+    # stock setup.
+    SQLITE_PRAGMAS = {
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,           # KiB → 64 MB page cache per connection
+        "busy_timeout": 20000,          # ms
+        "temp_store": "MEMORY",
+    }
+
+    # SQLITE_WAL=1 → WAL as well, so report reads run alongside the one writer.
+    # WAL is stored in the file header: the first connection rewrites
+    # db.sqlite3 and keeps -wal / -shm files next to it, so it stays off for
+    # the committed development database and is for real deployments.
+    if os.environ.get("SQLITE_WAL") == "1":
+        SQLITE_PRAGMAS = {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",    # fsync at checkpoints only; safe with WAL
+            **SQLITE_PRAGMAS,
+        }
+
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
@@ -115,6 +138,89 @@ else:
         }
     }
 
+    if os.environ.get("SQLITE_TUNED", "1") != "0":
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': "; ".join(f"PRAGMA {k}={v}" for k, v in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        }
+
+    # SQLITE_REPLICA=1 → a second SQLite file as the read database, refreshed
+    # from db.sqlite3 by `manage.py snapshot_replica` (to try the router locally)
+    if os.environ.get("SQLITE_REPLICA") == "1":
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'NAME': BASE_DIR / 'db-replica.sqlite3',
+            # readers never write, so they must not hold the write lock the
+            # snapshot needs
+            'OPTIONS': {
+                k: v for k, v in DATABASES['default'].get('OPTIONS', {}).items()
+                if k != 'transaction_mode'
+            },
+        }
+
+# Read database for report / bill / dashboard views (civil_app.db_router).
+# Without one, or while it is unreachable, they read from the primary.
+READ_DATABASE_URL = os.environ.get("READ_DATABASE_URL")
+
+if READ_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        READ_DATABASE_URL,
+        conn_max_age=600,
+        ssl_require=True
+    )
+
+if 'replica' in DATABASES:
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['civil_app.db_router.ReadReplicaRouter']
+REPLICA_RETRY_SECONDS = 30
+
+
+# Cache backend, picked by CACHE_URL. Ledger writes invalidate entries through
+# version counters in the database (civil_app.ledger_cache), so every backend
+# stays correct across gunicorn workers; shared ones also share the entries.
+#   (unset)                  local memory, per worker process
+#   file:///var/tmp/civil    files shared by the workers on one host
+#   redis://host:6379/0      shared Redis (needs the redis package)
+#   db://civil_cache         shared database table (run createcachetable)
+CACHE_URL = os.environ.get("CACHE_URL", "")
+
+if CACHE_URL.startswith("file://"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_URL[len("file://"):],
+        }
+    }
+elif CACHE_URL.startswith(("redis://", "rediss://")):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith("db://"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': CACHE_URL[len("db://"):] or "civil_cache",
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'civil',
+        }
+    }
+
+LEDGER_CACHE_TIMEOUT = 60 * 60
+
+# Autocomplete indexes live in each worker process; writes made in another
+# worker show up once the local copy is this old and gets rebuilt.
+AUTOCOMPLETE_REFRESH = int(os.environ.get("AUTOCOMPLETE_REFRESH", 300))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -154,7 +260,30 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Plain storage here: pages render straight from static/ without a
+# collectstatic run (DEBUG, tests). settings_production swaps in WhiteNoise's
+# hashed, precompressed manifest storage.
+# (STORAGES replaces STATICFILES_STORAGE, which Django 5.1 no longer reads.)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Query budgets: views without @query_budget may run this many queries per
+# request; any single query shape repeated this often is logged as a likely N+1.
+QUERY_BUDGET_DEFAULT = 50
+QUERY_DUPLICATE_THRESHOLD = 5
+
+# PDF rendering runs on a per-process pool of this many threads; up to
+# PDF_RENDER_QUEUE more renders wait (at most PDF_RENDER_WAIT seconds) before
+# the request gets a 503.
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", 2))
+PDF_RENDER_QUEUE = int(os.environ.get("PDF_RENDER_QUEUE", 8))
+PDF_RENDER_WAIT = float(os.environ.get("PDF_RENDER_WAIT", 30))
 
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "/"
@@ -0,0 +1,90 @@
+"""
+Production settings, picked when DJANGO_ENV=production (see
+``civil_project.settings_module``).
+
+Everything in settings.py applies; on top of it:
+
+- DEBUG off: no per-connection SQL log, no debug pages.
+- SECRET_KEY and ALLOWED_HOSTS (comma-separated) from the environment;
+  startup fails if either is missing.
+- Compiled templates cached for the life of the worker.
+- Sessions from the cache (database on a miss), or entirely in a signed
+  cookie with SESSION_BACKEND=signed_cookies.
+- HTML / JSON compressed with brotli or gzip.
+- Persistent database connections, health-checked before reuse.
+- Static files from the hashed, precompressed collectstatic manifest.
+
+Run ``manage.py collectstatic`` on deploy: with DEBUG off every
+``{% static %}`` URL comes from the manifest.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, MIDDLEWARE, STORAGES, TEMPLATES
+
+
+DEBUG = False
+
+
+def _required(name):
+    value = os.environ.get(name, "").strip()
+    if not value:
+        raise ImproperlyConfigured(f"Set the {name} environment variable for DJANGO_ENV=production.")
+    return value
+
+
+# never the key committed in settings.py, never any Host header
+SECRET_KEY = _required("SECRET_KEY")
+
+ALLOWED_HOSTS = [host.strip() for host in _required("ALLOWED_HOSTS").split(",") if host.strip()]
+
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+
+# collectstatic writes content-hashed copies of static/css and static/js plus
+# .gz / .br siblings; WhiteNoise serves the hashed names with a far-future,
+# immutable Cache-Control and picks the smallest encoding the browser accepts.
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get("SESSION_BACKEND", "cached_db")]
+
+
+# below WhiteNoise: static files are served precompressed and never reach it
+_whitenoise = MIDDLEWARE.index('civil_project.middleware.AsyncWhiteNoiseMiddleware')
+MIDDLEWARE = [
+    *MIDDLEWARE[:_whitenoise + 1],
+    'civil_project.middleware.CompressionMiddleware',
+    *MIDDLEWARE[_whitenoise + 1:],
+]
+
+
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(os.environ.get("CONN_MAX_AGE", 600))
+    database['CONN_HEALTH_CHECKS'] = True
@@ -0,0 +1,139 @@
+// page values ride on the <script> tag's data-* attributes
+const BILL_RANGE = document.currentScript.dataset;
+
+// ⭐ all bill breakdowns for the range, fetched once on page load
+let billDetails = null;
+
+const billDetailsReady = fetch(`/api/bills/details/?from_date=${BILL_RANGE.fromDate}&to_date=${BILL_RANGE.toDate}`)
+  .then(res => res.json())
+  .then(data => { billDetails = data; })
+  .catch(() => { billDetails = null; });
+
+function openBill(type, id, title) {
+
+  const modal = document.getElementById("billModal");
+  const body  = document.getElementById("modalBody");
+  const titleEl = document.getElementById("modalTitle");
+  const pdfLink = document.getElementById("pdfLink");
+
+  titleEl.innerText = title;
+  body.innerHTML = "<tr><td colspan='4'>Loading...</td></tr>";
+
+  modal.classList.remove("hidden");
+  modal.classList.add("flex");
+
+  let apiUrl = "";
+  let pdfUrl = "";
+
+  if (type === "civil") {
+    apiUrl = `/api/bill/civil/${id}/`;
+    pdfUrl = `/bill/team/${id}/`;
+  }
+
+  if (type === "dept") {
+    apiUrl = `/api/bill/department/${id}/`;
+    pdfUrl = `/bill/department/${id}/`;
+  }
+
+  if (type === "material") {
+    apiUrl = `/api/bill/material/${id}/`;
+    pdfUrl = `/bill/agent/${id}/`;
+  }
+
+  if (type === "expense") {
+    apiUrl = `/api/bill/expense/${id}/`;
+    pdfUrl = `/bill/expense/${id}/`;
+  }
+
+  pdfLink.href = `${pdfUrl}?from_date=${BILL_RANGE.fromDate}&to_date=${BILL_RANGE.toDate}&pdf=1`;
+
+  billDetailsReady.then(() => {
+
+    // ⭐ instant from memory, single-bill API only as fallback
+    const cached = billDetails && billDetails[type] && billDetails[type][String(id)];
+
+    if (billDetails && billDetails[type]) {
+      renderBill(cached || { rows: [] });
+      return;
+    }
+
+    fetch(`${apiUrl}?from_date=${BILL_RANGE.fromDate}&to_date=${BILL_RANGE.toDate}`)
+      .then(res => res.json())
+      .then(renderBill)
+      .catch(() => {
+        body.innerHTML = "<tr><td colspan='4'>Error loading data</td></tr>";
+      });
+  });
+}
+
+function renderBill(data) {
+
+  const body = document.getElementById("modalBody");
+
+  // 🔥 supports BOTH old + new API
+  const rows = Array.isArray(data) ? data : (data.rows || []);
+  const totals = data.team_total || {};
+
+  if (!rows.length) {
+    body.innerHTML = "<tr><td colspan='4'>No records</td></tr>";
+    return;
+  }
+
+  let html = "";
+
+  rows.forEach(r => {
+    html += `
+      <tr>
+        <td>${r.site__name || r.site || '-'}</td>
+        <td>${r.site__owner__name || '-'}</td>
+        <td class="text-red-600">₹${r.advance ?? 0}</td>
+        <td class="font-bold text-green-700">₹${r.total || 0}</td>
+      </tr>
+    `;
+  });
+
+  // team total (only if exists)
+  if (totals && (totals.advance_total || totals.grand_total)) {
+    html += `
+      <tr class="bg-slate-100 font-extrabold">
+        <td colspan="2">TEAM TOTAL</td>
+        <td class="text-red-700 text-right">₹${totals.advance_total || 0}</td>
+        <td class="text-green-800">₹${totals.grand_total || 0}</td>
+      </tr>
+    `;
+  }
+
+  body.innerHTML = html;
+}
+
+function closeModal(){
+  const modal = document.getElementById("billModal");
+  modal.classList.add("hidden");
+  modal.classList.remove("flex");
+}
+
+document.getElementById("billModal").addEventListener("click", function (e) {
+  if (e.target.id === "billModal") {
+    closeModal();
+  }
+});
+
+
+
+document.addEventListener("DOMContentLoaded", function () {
+
+  const fromInput = document.querySelector("input[name='from_date']");
+  const toInput   = document.querySelector("input[name='to_date']");
+
+  if (!fromInput || !toInput) return; // safety
+
+  const form = fromInput.closest("form");
+
+  function autoSubmit(){
+    form.submit();
+  }
+
+  fromInput.addEventListener("change", autoSubmit);
+  toInput.addEventListener("change", autoSubmit);
+
+});
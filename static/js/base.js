@@ -0,0 +1,19 @@
+function openSidebar(){
+document
+.getElementById("mobileSidebar")
+.classList.remove("-translate-x-full");
+
+document
+.getElementById("sidebarOverlay")
+.classList.remove("hidden");
+}
+
+function closeSidebar(){
+document
+.getElementById("mobileSidebar")
+.classList.add("-translate-x-full");
+
+document
+.getElementById("sidebarOverlay")
+.classList.add("hidden");
+}
@@ -0,0 +1,116 @@
+// page values ride on the <script> tag's data-* attributes
+const CHART_DATA = document.currentScript.dataset;
+
+function changeRange(){
+
+const range = document.getElementById("rangeSelect").value;
+
+window.location.href = "?range=" + range;
+
+}
+
+const labels = JSON.parse(CHART_DATA.chartLabels);
+const values = JSON.parse(CHART_DATA.chartValues);
+
+const ctx = document.getElementById("costChart");
+
+new Chart(ctx, {
+
+type: "line",
+
+data: {
+
+labels: labels,
+
+datasets: [{
+
+label: "Cost",
+
+data: values,
+
+borderColor: "#6366f1",
+
+backgroundColor: "rgba(99,102,241,0.15)",
+
+fill: true,
+
+tension: 0.4,
+
+pointRadius: 4
+
+}]
+
+},
+
+options: {
+
+responsive: true,
+
+plugins: {
+
+legend: { display: false }
+
+},
+
+scales: {
+
+y: {
+
+ticks: {
+
+callback: function(value){
+
+return "₹"+value;
+
+}
+
+}
+
+}
+
+}
+
+}
+
+});
+
+const siteLabels = JSON.parse(CHART_DATA.siteLabels);
+const siteValues = JSON.parse(CHART_DATA.siteCosts);
+
+new Chart(document.getElementById("siteChart"),{
+
+type:"bar",
+
+data:{
+labels:siteLabels,
+
+datasets:[{
+label:"Total Cost",
+
+data:siteValues,
+
+backgroundColor:"#6366f1",
+
+borderRadius:6
+
+}]
+},
+
+options:{
+responsive:true,
+
+plugins:{
+legend:{display:false}
+},
+
+scales:{
+y:{
+ticks:{
+callback:(v)=>"₹"+v
+}
+}
+}
+
+}
+
+});
@@ -0,0 +1,282 @@
+// Offline day-sheet entry for site_detail.
+//
+// Saving the form puts the whole day sheet in an IndexedDB queue (one entry
+// per site and date; a later save replaces an unsent one) and sends the queue
+// to /api/sync/ without reloading the page. While offline the queue waits and
+// is sent when the connection comes back. Each entry carries the day_version
+// and journal epoch the page was loaded with; if the day was saved elsewhere
+// (or a bulk import / restore happened) since, the server answers "conflict"
+// and the user picks their copy or the server's.
+//
+// page values ride on the <script> tag's data-* attributes
+const OFFLINE = document.currentScript.dataset;
+
+const QUEUE_DB = "civil-offline";
+const QUEUE_STORE = "edits";
+const RETRY_MS = 30000;
+const SYNC_MAX = 20; // edits per request, as civil_app.views.sync.SYNC_MAX
+
+const dayKey = `${OFFLINE.site}:${OFFLINE.date}`;
+const dayForm = document.getElementById("dayForm");
+let syncing = null;
+
+
+if ("serviceWorker" in navigator){
+  navigator.serviceWorker.register("/sw.js").catch(() => {});
+}
+
+
+/* ================= QUEUE (IndexedDB) ================= */
+
+function openQueue(){
+  return new Promise((resolve, reject) => {
+    const req = indexedDB.open(QUEUE_DB, 1);
+    req.onupgradeneeded = () => req.result.createObjectStore(QUEUE_STORE, {keyPath: "key"});
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+}
+
+function queueRequest(mode, action){
+  return openQueue().then(db => new Promise((resolve, reject) => {
+    const tx = db.transaction(QUEUE_STORE, mode);
+    const req = action(tx.objectStore(QUEUE_STORE));
+    tx.oncomplete = () => resolve(req.result);
+    tx.onerror = () => reject(tx.error);
+  }));
+}
+
+const queueAll = () => queueRequest("readonly", store => store.getAll());
+const queueGet = key => queueRequest("readonly", store => store.get(key));
+const queuePut = edit => queueRequest("readwrite", store => store.put(edit));
+const queueDelete = key => queueRequest("readwrite", store => store.delete(key));
+
+function newEditId(){
+  return self.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+}
+
+
+/* ================= SAVE ================= */
+
+function formFields(form){
+  return [...new FormData(form).entries()]
+    .filter(([name]) => name !== "csrfmiddlewaretoken")
+    .map(([name, value]) => [name, String(value)]);
+}
+
+function saveDay(event){
+  event.preventDefault();
+
+  queueGet(dayKey).then(previous => queuePut({
+    key: dayKey,
+    id: newEditId(),
+    site: Number(OFFLINE.site),
+    date: OFFLINE.date,
+    // an unsent earlier save of this day still holds the version we started from
+    base: previous ? previous.base : Number(dayForm.dataset.version),
+    epoch: previous ? previous.epoch : dayForm.dataset.epoch,
+    force: previous ? previous.force : false,
+    fields: formFields(dayForm),
+    state: "queued",
+  }))
+  .then(() => {
+    showStatus("queued");
+    return syncQueue();
+  })
+  .catch(() => {
+    // no IndexedDB (private mode, old browser): plain form post
+    dayForm.removeEventListener("submit", saveDay);
+    dayForm.submit();
+  });
+}
+
+
+/* ================= SYNC ================= */
+
+function syncQueue(){
+  if (syncing) return syncing;
+
+  let more = false;
+  syncing = queueAll()
+    .then(all => {
+      const queued = all.filter(e => e.state === "queued");
+      const edits = queued.slice(0, SYNC_MAX);
+      if (!edits.length || !navigator.onLine) return all;
+
+      return fetch("/api/sync/", {
+        method: "POST",
+        headers: {"Content-Type": "application/json", "X-CSRFToken": OFFLINE.csrfToken},
+        body: JSON.stringify({
+          edits: edits.map(({id, site, date, base, epoch, force, fields}) => ({id, site, date, base, epoch, force, fields})),
+        }),
+      })
+      .then(res => {
+        // signed out: the login page answers instead of the API
+        if (res.redirected || res.status === 403) throw new Error("signin");
+        if (!res.ok) throw new Error("offline");
+        return res.json();
+      })
+      .then(data => {
+        // the server answers "queued" for what its query budget left over
+        more = queued.length > edits.length || data.results.some(r => r.status === "queued");
+        return data.results.reduce(
+          (done, result, i) => done.then(() => settle(edits[i].key, result)),
+          Promise.resolve()
+        );
+      })
+      .then(queueAll);
+    })
+    .then(all => {
+      const edit = all.find(e => e.key === dayKey);
+      showStatus(edit ? edit.state : "saved", all);
+    })
+    .catch(err => showStatus(err.message === "signin" ? "signin" : "offline"))
+    .finally(() => {
+      syncing = null;
+      if (more) syncQueue();
+    });
+
+  return syncing;
+}
+
+function settle(key, result){
+  return queueGet(key).then(edit => {
+    if (!edit) return;
+
+    if (result.status === "applied"){
+      if (key === dayKey) Object.assign(dayForm.dataset, {version: result.version, epoch: result.epoch});
+      if (edit.id === result.id) return queueDelete(key);
+      // saved again while this batch was on the way: the newer save builds on this one
+      return queuePut({...edit, base: result.version, epoch: result.epoch});
+    }
+    if (edit.id !== result.id || result.status === "queued") return;
+    if (result.status === "conflict"){
+      return queuePut({...edit, state: "conflict", server_version: result.version});
+    }
+    return queuePut({...edit, state: "error", error: result.error});
+  });
+}
+
+
+/* ================= CONFLICTS ================= */
+
+function keepMine(){
+  queueGet(dayKey).then(edit => {
+    if (!edit) return;
+    return queuePut({...edit, state: "queued", force: true}).then(syncQueue);
+  });
+}
+
+function useServer(){
+  queueDelete(dayKey).then(() => window.location.reload());
+}
+
+
+/* ================= RESTORE ================= */
+// a page opened from the cache (or before the queue was sent) shows the
+// queued copy of the day, not what the server had when the page was cached
+
+function restoreRows(prefix, container, rowClass, setIndex, addRow, fields){
+  const indexes = [...new Set(
+    fields.map(([name]) => name.startsWith(prefix) ? Number(name.slice(prefix.length)) : NaN)
+          .filter(i => !isNaN(i))
+  )].sort((a, b) => a - b);
+
+  document.querySelectorAll(`#${container} .${rowClass}`).forEach(row => row.remove());
+  indexes.forEach(i => { setIndex(i); addRow(); });
+  setIndex(indexes.length ? indexes[indexes.length - 1] + 1 : 0);
+}
+
+function addMissing(selectId, add, ids){
+  const select = document.getElementById(selectId);
+  ids.forEach(id => {
+    if (!select || !select.querySelector(`option[value="${id}"]`)) return;
+    select.value = id;
+    add();
+  });
+  if (select) select.value = "";
+}
+
+function restoreForm(fields){
+  const civil = new Set(), depts = new Set();
+  fields.forEach(([name]) => {
+    let m = name.match(/^(?:mason_full|helper_full|mason_half|helper_half|advance)_(\d+)$/);
+    if (m && !document.getElementById("civil_row_" + m[1])) civil.add(m[1]);
+    m = name.match(/^dept_(?:full|half|rate|advance)_(\d+)$/);
+    if (m && !document.getElementById("dept_row_" + m[1])) depts.add(m[1]);
+  });
+  addMissing("civilTeamSelect", addCivilTeam, civil);
+  addMissing("deptSelect", addDept, depts);
+
+  restoreRows("material_name_", "materialRows", "material-row", i => { materialIndex = i; }, addMaterialRow, fields);
+  restoreRows("expense_title_", "expenseRows", "expense-row", i => { expenseIndex = i; }, addExpenseRow, fields);
+
+  fields.forEach(([name, value]) => {
+    const el = dayForm.querySelector(`[name="${CSS.escape(name)}"]`);
+    if (el) el.value = value;
+  });
+
+  const desc = fields.find(([name]) => name === "daily_description");
+  if (desc){
+    document.getElementById("descPreviewText").innerText = desc[1] || "No description added for this day.";
+  }
+
+  document.querySelectorAll('[id^="dept_total_"]').forEach(el => calcDept(el.id.replace("dept_total_", "")));
+  document.querySelectorAll('[id^="material_total_"]').forEach(el => calcMaterial(el.id.replace("material_total_", "")));
+  updateLiveGrandTotal();
+}
+
+
+/* ================= STATUS ================= */
+
+const STATUS_TEXT = {
+  queued: "⏳ Saved on this phone, sending…",
+  offline: "📴 Offline: saved on this phone, will send when back online",
+  signin: "🔑 Saved on this phone; sign in again to send",
+  saved: "✅ Saved",
+  error: "⚠️ Not saved: ",
+  conflict: "⚠️ Someone else saved this day meanwhile.",
+};
+
+function showStatus(state, all){
+  const box = document.getElementById("syncStatus");
+  if (!box) return;
+
+  const waiting = (all || []).filter(e => e.key !== dayKey && e.state === "queued").length;
+  box.classList.remove("hidden");
+  box.dataset.state = state;
+  box.replaceChildren(STATUS_TEXT[state] || "");
+
+  if (state === "error"){
+    queueGet(dayKey).then(edit => box.append(edit?.error || ""));
+  }
+  if (state === "conflict"){
+    box.append(
+      Object.assign(document.createElement("button"), {type: "button", className: "chip-btn", textContent: "Keep mine", onclick: keepMine}),
+      Object.assign(document.createElement("button"), {type: "button", className: "chip-btn", textContent: "Use theirs", onclick: useServer}),
+    );
+  }
+  if (waiting){
+    box.append(` (${waiting} other day${waiting > 1 ? "s" : ""} waiting)`);
+  }
+}
+
+
+/* ================= START ================= */
+
+if (dayForm && "indexedDB" in window){
+  dayForm.addEventListener("submit", saveDay);
+
+  queueGet(dayKey)
+    .then(edit => {
+      if (edit){
+        restoreForm(edit.fields);
+        showStatus(edit.state);
+      }
+      return syncQueue();
+    })
+    .catch(() => {});
+
+  window.addEventListener("online", syncQueue);
+  setInterval(() => { if (navigator.onLine) syncQueue(); }, RETRY_MS);
+}
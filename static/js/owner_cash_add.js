@@ -0,0 +1,8 @@
+/* prevent double submit */
+document.getElementById("cashForm")?.addEventListener("submit", function(){
+  const btn = document.getElementById("saveBtn");
+  if (btn){
+    btn.disabled = true;
+    btn.innerText = "Saving...";
+  }
+});
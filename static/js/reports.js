@@ -0,0 +1,161 @@
+// ⭐ day details for the whole month, prefetched in one call
+const dayCache = {};
+const dayMonthsLoaded = {};
+
+function prefetchMonth(date){
+
+  const month = date.slice(0, 7);
+
+  if (!dayMonthsLoaded[month]){
+
+    const [y, m] = month.split("-").map(Number);
+    const lastDay = new Date(y, m, 0).getDate();
+
+    dayMonthsLoaded[month] = fetch(`/api/day-full/?from_date=${month}-01&to_date=${month}-${String(lastDay).padStart(2, "0")}`)
+      .then(r => r.json())
+      .then(data => {
+        for (let d = 1; d <= lastDay; d++){
+          const key = `${month}-${String(d).padStart(2, "0")}`;
+          dayCache[key] = (data.days && data.days[key]) || [];
+        }
+      })
+      .catch(err => {
+        delete dayMonthsLoaded[month];
+        throw err;
+      });
+  }
+
+  return dayMonthsLoaded[month];
+}
+
+document.addEventListener("DOMContentLoaded", function(){
+  const dateInput = document.querySelector("input[name='from_date']");
+  if (dateInput && dateInput.value){
+    prefetchMonth(dateInput.value).catch(() => {});
+  }
+});
+
+function openDayModal(){
+
+  const dateInput = document.querySelector("input[name='from_date']");
+  if(!dateInput){
+    alert("Date input not found");
+    return;
+  }
+
+  const date = dateInput.value;
+
+  if (!date){
+    alert("Please select date");
+    return;
+  }
+
+  const modal = document.getElementById("dayModal");
+  const body = document.getElementById("dayModalBody");
+  const title = document.getElementById("dayModalTitle");
+
+  if(title){
+    title.innerText = "Report — " + date;
+  }
+
+  body.innerHTML = "Loading...";
+
+  modal.classList.remove("hidden");
+  modal.classList.add("flex");
+
+  prefetchMonth(date)
+  .then(() => {
+
+    let html = "";
+
+    (dayCache[date] || []).forEach(site => {
+
+      html += `
+      <div class="border rounded-xl p-4 mb-4">
+      <div class="font-bold text-blue-700 mb-2">📍 ${site.site}</div>
+      `;
+
+      // ===== CIVIL =====
+      site.civil.forEach(c=>{
+        html += `
+        <div class="text-sm ml-2 mb-1">
+          ${c.team} —
+          M:${c.mason_full}/${c.mason_half}
+          H:${c.helper_full}/${c.helper_half}
+        </div>
+        `;
+      });
+
+      // ===== DEPARTMENT (LABOUR COUNT ADDED) =====
+      site.department.forEach(d=>{
+        html += `
+        <div class="text-sm ml-2 mb-1">
+          ${d.department} —
+          F:${d.full} H:${d.half}
+        </div>
+        `;
+      });
+
+      // ===== MATERIAL =====
+      site.material.forEach(m=>{
+        html += `
+        <div class="text-sm ml-2 mb-1">
+          ${m.agent} — Qty: ${m.qty || "-"}
+        </div>
+        `;
+      });
+
+      // ===== EXPENSE =====
+      site.expense.forEach(e=>{
+        html += `
+        <div class="text-sm ml-2 mb-1">
+          ${e.title} — ${e.owner}
+        </div>
+        `;
+      });
+
+      html += `</div>`;
+    });
+
+    body.innerHTML = html || "No data for this date";
+
+  })
+  .catch(err=>{
+    body.innerHTML = "Error loading data";
+    console.error(err);
+  });
+
+}
+
+function closeDayModal(){
+  const modal = document.getElementById("dayModal");
+  modal.classList.add("hidden");
+  modal.classList.remove("flex");
+}
+function toggleFilters(){
+
+const panel = document.getElementById("filterPanel");
+const grid = document.querySelector(".dashboard-grid");
+
+if(panel.classList.contains("hidden")){
+
+panel.classList.remove("hidden");
+grid.style.gridTemplateColumns = "220px 1fr";
+
+}else{
+
+panel.classList.add("hidden");
+grid.style.gridTemplateColumns = "1fr";
+
+}
+
+}
+function hideFilters(){
+
+const panel = document.getElementById("filterPanel");
+const grid = document.querySelector(".dashboard-grid");
+
+panel.classList.add("hidden");
+grid.style.gridTemplateColumns = "1fr";
+
+}
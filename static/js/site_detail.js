@@ -0,0 +1,619 @@
+// page values ride on the <script> tag's data-* attributes
+const SITE_DETAIL = document.currentScript.dataset;
+
+/* ===== civil_section ===== */
+  document.getElementById("civilTeamSelect")
+.addEventListener("change", addCivilTeam);
+
+function addCivilTeam(){
+
+  const select = document.getElementById("civilTeamSelect");
+
+  const option = select.options[select.selectedIndex];
+
+  const teamId = option.value;
+  const teamName = option.text;
+
+  const masonRate = option.dataset.mason;
+  const helperRate = option.dataset.helper;
+
+  if(!teamId){
+    alert("Select team first");
+    return;
+  }
+
+  if(document.getElementById("civil_row_"+teamId)){
+    alert("Team already added");
+    return;
+  }
+
+  const container = document.getElementById("civilBody");
+
+  const html = `
+  <div id="civil_row_${teamId}" class="table-row-modern"
+  style="grid-template-columns:
+  minmax(160px,1.4fr)
+  repeat(4,minmax(50px,.6fr))
+  minmax(70px,.7fr)
+  minmax(70px,.7fr)
+  minmax(80px,.8fr)
+  minmax(90px,.9fr)
+  minmax(90px,.9fr);">
+
+    <div class="font-semibold">${teamName}</div>
+
+    <input name="mason_full_${teamId}" class="table-input-modern money"
+    oninput="calcCivil(${teamId}, ${masonRate}, ${helperRate})">
+
+    <input name="helper_full_${teamId}" class="table-input-modern money"
+    oninput="calcCivil(${teamId}, ${masonRate}, ${helperRate})">
+
+    <input name="mason_half_${teamId}" class="table-input-modern money"
+    oninput="calcCivil(${teamId}, ${masonRate}, ${helperRate})">
+
+    <input name="helper_half_${teamId}" class="table-input-modern money"
+    oninput="calcCivil(${teamId}, ${masonRate}, ${helperRate})">
+
+    <div class="table-box-modern">₹${masonRate}</div>
+    <div class="table-box-modern">₹${helperRate}</div>
+
+    <input name="advance_${teamId}" class="table-input-modern money"
+    oninput="calcCivil(${teamId}, ${masonRate}, ${helperRate})">
+
+    <div id="civil_labour_${teamId}" class="table-box-modern labour-modern">0</div>
+    <div id="civil_total_${teamId}" class="table-box-modern total-modern">0</div>
+
+  </div>
+  `;
+
+  container.insertAdjacentHTML("beforeend", html);
+
+}
+
+/* ===== dept_section ===== */
+document.getElementById("deptSelect")
+.addEventListener("change", addDept);
+
+function addDept(){
+
+const select = document.getElementById("deptSelect");
+const option = select.options[select.selectedIndex];
+
+const deptId = option.value;
+const deptName = option.text;
+const rate = option.dataset.rate;
+
+if(!deptId){
+alert("Select department first");
+return;
+}
+
+if(document.getElementById("dept_row_"+deptId)){
+alert("Department already added");
+return;
+}
+
+const container = document.getElementById("deptBody");
+
+const html = `
+
+<div id="dept_row_${deptId}" class="table-row-modern dept-grid dept-row">
+
+<div class="font-semibold">${deptName}</div>
+
+<input name="dept_full_${deptId}" class="table-input-modern money"
+oninput="calcDept(${deptId})">
+
+<input name="dept_half_${deptId}" class="table-input-modern money"
+oninput="calcDept(${deptId})">
+
+<input name="dept_rate_${deptId}" value="${rate}"
+class="table-input-modern money"
+oninput="calcDept(${deptId})">
+
+<input name="dept_advance_${deptId}" class="table-input-modern money"
+oninput="calcDept(${deptId})">
+
+<div id="dept_labour_${deptId}" class="table-box-modern labour-modern">0</div>
+
+<div id="dept_total_${deptId}" class="table-box-modern total-modern">0</div>
+
+</div>
+
+`;
+
+container.insertAdjacentHTML("beforeend", html);
+
+select.value="";
+
+}
+
+
+/* CALCULATION */
+
+function calcDept(id){
+
+let full = +document.querySelector(`[name="dept_full_${id}"]`)?.value || 0;
+let half = +document.querySelector(`[name="dept_half_${id}"]`)?.value || 0;
+let advance = +document.querySelector(`[name="dept_advance_${id}"]`)?.value || 0;
+let rate = +document.querySelector(`[name="dept_rate_${id}"]`)?.value || 0;
+
+let labour = (full * rate) + (half * rate / 2);
+let total = Math.max(labour - advance);
+
+document.getElementById(`dept_labour_${id}`).innerText =
+labour.toLocaleString("en-IN");
+
+document.getElementById(`dept_total_${id}`).innerText =
+total.toLocaleString("en-IN");
+
+updateLiveGrandTotal();
+
+}
+
+/* ===== material_section ===== */
+/* toggle section */
+
+if (typeof toggleSection === "undefined") {
+
+function toggleSection(el){
+
+const card = el.nextElementSibling;
+const arrow = el.querySelector(".section-arrow-modern");
+
+if (!card) return;
+
+card.classList.toggle("hidden");
+
+if (arrow){
+arrow.style.transform =
+card.classList.contains("hidden") ? "rotate(-90deg)" : "rotate(0deg)";
+}
+
+}
+
+}
+
+
+/* material index */
+
+let materialIndex = Number(SITE_DETAIL.materialCount);
+
+
+/* calculation */
+
+function calcMaterial(index){
+
+const qtyEl = document.querySelector(`[name="material_qty_${index}"]`);
+const rateEl = document.querySelector(`[name="material_rate_${index}"]`);
+const advEl = document.querySelector(`[name="material_advance_${index}"]`);
+const totalEl = document.getElementById(`material_total_${index}`);
+
+if (!totalEl) return;
+
+const qty = Number(qtyEl?.value || 0);
+const rate = Number(rateEl?.value || 0);
+const advance = Number(advEl?.value || 0);
+
+const total = Math.max((qty * rate) - advance,0);
+
+totalEl.value = total;
+
+if (typeof updateLiveGrandTotal === "function"){
+updateLiveGrandTotal();
+}
+
+}
+
+
+/* add row */
+
+function addMaterialRow(){
+
+const container = document.getElementById("materialRows");
+if (!container) return;
+
+const row = document.createElement("div");
+
+row.className = "table-row-modern material-row material-grid";
+
+row.innerHTML = `
+
+<input name="agent_name_${materialIndex}" class="table-input-modern">
+
+<input name="material_name_${materialIndex}" class="table-input-modern">
+
+<input name="material_qty_${materialIndex}"
+class="table-input-modern money"
+oninput="calcMaterial(${materialIndex})">
+
+<input name="material_unit_${materialIndex}"
+class="table-input-modern">
+
+<input name="material_rate_${materialIndex}"
+class="table-input-modern money rate-highlight"
+oninput="calcMaterial(${materialIndex})">
+
+<input name="material_advance_${materialIndex}"
+value="0"
+class="table-input-modern money advance-modern"
+oninput="calcMaterial(${materialIndex})">
+
+<input id="material_total_${materialIndex}"
+value="0"
+class="table-input-modern money total-green"
+readonly>
+
+<div class="flex justify-center">
+<button type="button"
+onclick="this.closest('.material-row').remove(); updateLiveGrandTotal?.();"
+class="delete-btn-modern">
+✕
+</button>
+</div>
+
+`;
+
+container.appendChild(row);
+
+row.querySelector("input")?.focus();
+
+materialIndex++;
+
+}
+
+
+/* auto recalc */
+
+document.addEventListener("DOMContentLoaded",()=>{
+
+document.querySelectorAll('[id^="material_total_"]').forEach(el=>{
+
+const index = el.id.replace("material_total_","");
+calcMaterial(index);
+
+});
+
+});
+
+/* ===== expense_section ===== */
+if (typeof toggleSection === "undefined") {
+  function toggleSection(el){
+    const card = el.nextElementSibling;
+    const arrow = el.querySelector(".section-arrow");
+
+    if (!card) return;
+
+    card.classList.toggle("hidden");
+
+    if (arrow) {
+      arrow.style.transform =
+        card.classList.contains("hidden") ? "rotate(-90deg)" : "rotate(0deg)";
+    }
+  }
+}
+
+
+/* ================= EXPENSE INDEX ================= */
+let expenseIndex = Number(SITE_DETAIL.expenseCount);
+
+/* ================= ADD EXPENSE ROW ================= */
+function addExpenseRow(){
+  const container = document.getElementById("expenseRows");
+  if (!container) return;
+
+  const row = document.createElement("div");
+  row.className = "table-row-modern expense-row";
+
+  row.style.gridTemplateColumns = `
+    minmax(180px,1.5fr)
+    minmax(180px,1.5fr)
+    minmax(110px,.9fr)
+    minmax(200px,1.6fr)
+    minmax(70px,.5fr)
+  `;
+
+  row.innerHTML = `
+    <input name="expense_title_${expenseIndex}"
+           class="table-input-modern">
+
+    <select name="expense_owner_${expenseIndex}"
+            class="table-input-modern owner-select"
+            onchange="validateExpenseBalance(this.closest('.expense-row').querySelector('[name^=expense_amount_]'))">
+      <option value="">Select</option>
+      ${document.getElementById("expenseOwnerOptions").innerHTML}
+    </select>
+
+    <input name="expense_amount_${expenseIndex}"
+       value="0"
+       class="table-input-modern money amount-field"
+       oninput="validateExpenseBalance(this); updateLiveGrandTotal?.()">
+
+    <input name="expense_notes_${expenseIndex}"
+           class="table-input-modern">
+
+    <div class="flex justify-center">
+      <button type="button"
+        onclick="this.closest('.expense-row').remove(); updateLiveGrandTotal?.();"
+        class="delete-btn-modern">
+        ✕
+      </button>
+    </div>
+  `;
+
+  container.appendChild(row);
+
+  // focus first field
+  row.querySelector("input")?.focus();
+
+  expenseIndex++;
+}
+
+/* ================= OWNER CASH VALIDATION ================= */
+
+function validateExpenseBalance(amountInput){
+
+  const row = amountInput.closest(".expense-row");
+  if (!row) return;
+
+  const ownerSelect = row.querySelector('[name^="expense_owner_"]');
+  if (!ownerSelect) return;
+
+  const selectedOption = ownerSelect.selectedOptions[0];
+  if (!selectedOption) return;
+
+  // 🔥 SAFE BALANCE PARSE
+  const balanceRaw = selectedOption.dataset.balance || "0";
+  const balance = Number(String(balanceRaw).replace(/,/g,'')) || 0;
+
+  const amount = Number(amountInput.value || 0);
+
+  // remove old warning
+  amountInput.classList.remove("ring-2","ring-red-400");
+
+  // 🚨 IMPORTANT: must check owner selected
+  if (!ownerSelect.value) return;
+
+  if (amount > balance){
+    alert(`⚠️ Amount exceeds owner cash.\nAvailable: ₹${balance.toLocaleString("en-IN")}`);
+    amountInput.classList.add("ring-2","ring-red-400");
+    amountInput.focus();
+  }
+}
+
+function money(n){
+  return "₹" + Number(n || 0).toLocaleString("en-IN");
+}
+
+
+
+
+/* ================= LIVE GRAND ================= */
+
+function updateLiveGrandTotal(){
+  let total = 0;
+
+  // ===== CIVIL =====
+  document.querySelectorAll('[id^="civil_total_"]').forEach(el=>{
+    total += Number((el.innerText || "0").replace(/,/g,'')) || 0;
+  });
+
+  // ===== DEPT =====
+  document.querySelectorAll('[id^="dept_total_"]').forEach(el=>{
+    total += Number((el.innerText || "0").replace(/,/g,'')) || 0;
+  });
+
+  // ===== MATERIAL =====
+  document.querySelectorAll('[id^="material_total_"]').forEach(el=>{
+    total += Number(el.value || 0);
+  });
+
+  // ✅ ✅ EXPENSE (VERY IMPORTANT)
+  document.querySelectorAll('[name^="expense_amount_"]').forEach(el=>{
+    total += Number(el.value || 0);
+  });
+
+  // ===== UPDATE UI =====
+  const grand = document.getElementById("liveGrandTotal");
+  if (grand){
+    grand.innerText = "₹" + total.toLocaleString("en-IN");
+  }
+}
+
+/* auto triggers */
+document.addEventListener("input", updateLiveGrandTotal);
+document.addEventListener("DOMContentLoaded", updateLiveGrandTotal);
+
+
+/* ================= RESET MENU ================= */
+function toggleResetMenu(id) {
+  const menu = document.getElementById("resetMenu" + id);
+  document.querySelectorAll("[id^='resetMenu']").forEach(m => {
+    if (m !== menu) m.classList.add("hidden");
+  });
+  menu.classList.toggle("hidden");
+}
+
+/* ================= NAV ================= */
+function goToEdit(siteId) {
+  const date = document.getElementById("work_date").value;
+  if (!date) return alert("Please select a date");
+  window.location.href = `/site/${siteId}/?date=${encodeURIComponent(date)}`;
+}
+
+function switchSite() {
+  const siteId = document.getElementById("siteSwitcher").value;
+  const date = document.getElementById("work_date")?.value;
+  let url = `/site/${siteId}/`;
+  if (date) url += `?date=${date}`;
+  window.location.href = url;
+}
+
+/* ================= SMART COPY ================= */
+
+let currentSiteId = null;
+
+function openCopyModal(siteId){
+  currentSiteId = siteId;
+
+  const modal = document.getElementById("copyModal");
+  if (!modal) return;
+
+  modal.classList.remove("hidden");
+  modal.classList.add("flex");
+}
+
+/* ================= SMART COPY SELECTED ================= */
+function runSmartCopy() {
+  const date = document.getElementById("work_date")?.value;
+  if (!date) return alert("⚠️ Select date first");
+
+  const params = new URLSearchParams({
+    date: date,
+    civil: document.getElementById("copyCivil")?.checked ? 1 : 0,
+    dept: document.getElementById("copyDept")?.checked ? 1 : 0,
+    material: document.getElementById("copyMaterial")?.checked ? 1 : 0,
+    desc: document.getElementById("copyDesc")?.checked ? 1 : 0,
+    replace: document.getElementById("copyReplace")?.checked ? 1 : 0,
+  });
+
+  window.location.href =
+    `/site/${currentSiteId}/copy-previous/?${params.toString()}`;
+}
+
+
+function openDescModal(){
+  const modal = document.getElementById("descModal");
+  if (!modal) return;
+
+  // show modal
+  modal.classList.remove("hidden");
+  modal.classList.add("flex");
+
+  // load existing text
+  const hiddenVal = document.getElementById("daily_description_input")?.value || "";
+  const textarea = document.getElementById("daily_description_text");
+  if (textarea) textarea.value = hiddenVal;
+}
+function closeDescModal(){
+  const modal = document.getElementById("descModal");
+  if (!modal) return;
+
+  modal.classList.add("hidden");
+  modal.classList.remove("flex");
+}
+function saveDescription(){
+  const textarea = document.getElementById("daily_description_text");
+  const hiddenInput = document.getElementById("daily_description_input");
+  const preview = document.getElementById("descPreviewText");
+
+  if (!textarea || !hiddenInput) {
+    console.error("Description elements missing");
+    return;
+  }
+
+  const text = textarea.value.trim();
+
+  // ✅ update hidden input (THIS IS WHAT DJANGO SAVES)
+  hiddenInput.value = text;
+
+  // ✅ update preview UI
+  if (preview){
+    preview.innerText = text || "No description added for this day.";
+  }
+
+  // ✅ close modal
+  closeDescModal();
+}
+function closeCopyModal(){
+  const modal = document.getElementById("copyModal");
+  if (!modal) return;
+
+  modal.classList.add("hidden");
+  modal.classList.remove("flex");
+}
+document.addEventListener("click", function(e){
+  const modal = document.getElementById("copyModal");
+  if (!modal) return;
+
+  if (e.target === modal){
+    closeCopyModal();
+  }
+});
+let voice;
+
+function startVoiceNote(){
+
+  const SpeechRecognition =
+    window.SpeechRecognition || window.webkitSpeechRecognition;
+
+  if(!SpeechRecognition){
+    alert("Voice not supported in this browser");
+    return;
+  }
+
+  voice = new SpeechRecognition();
+  voice.lang = "en-IN";
+  voice.continuous = false;
+
+  voice.onresult = function(event){
+
+    const text = event.results[0][0].transcript;
+
+    // update preview
+    document.getElementById("descPreviewText").innerText = text;
+
+    // update hidden input (important for saving)
+    document.getElementById("daily_description_input").value = text;
+
+  };
+
+  voice.start();
+}
+
+
+/* ===== autocomplete ===== */
+// typed names get suggestions from /api/autocomplete/, one <datalist> per field
+const AUTOCOMPLETE_FIELDS = {
+  agent_name_: "agent",
+  material_name_: "material",
+  material_unit_: "unit",
+  expense_title_: "expense",
+};
+
+const autocompleteTimers = new WeakMap();
+
+function autocompleteField(input){
+  const prefix = Object.keys(AUTOCOMPLETE_FIELDS)
+    .find(p => (input.name || "").startsWith(p));
+  return prefix ? AUTOCOMPLETE_FIELDS[prefix] : null;
+}
+
+function suggest(event){
+
+  const input = event.target;
+  const field = autocompleteField(input);
+  if(!field) return;
+
+  let list = document.getElementById("autocomplete-" + field);
+  if(!list){
+    list = document.createElement("datalist");
+    list.id = "autocomplete-" + field;
+    document.body.appendChild(list);
+  }
+  input.setAttribute("list", list.id);
+  input.setAttribute("autocomplete", "off");
+
+  clearTimeout(autocompleteTimers.get(input));
+  autocompleteTimers.set(input, setTimeout(() => {
+    fetch(`/api/autocomplete/?field=${field}&q=${encodeURIComponent(input.value)}`)
+      .then(res => res.json())
+      .then(data => {
+        list.replaceChildren(...data.results.map(s => new Option(s.value)));
+      })
+      .catch(() => {});
+  }, 150));
+}
+
+document.addEventListener("input", suggest);
+document.addEventListener("focusin", suggest);
@@ -0,0 +1,77 @@
+// page values ride on the <script> tag's data-* attributes
+const SITE_ENTRY = document.currentScript.dataset;
+
+function openAddSiteModal(){
+document.getElementById("addSiteModal").style.display="flex";
+}
+
+function closeAddSiteModal(){
+document.getElementById("addSiteModal").style.display="none";
+}
+
+function openEditSiteModal(id,name){
+
+document.getElementById("editSiteId").value=id;
+document.getElementById("editSiteName").value=name;
+
+document.getElementById("editSiteModal").style.display="flex";
+
+}
+
+function closeEditSiteModal(){
+document.getElementById("editSiteModal").style.display="none";
+}
+
+
+function saveNewSite(){
+
+const name=document.getElementById("newSiteName").value;
+
+fetch("/add-site/",{
+method:"POST",
+headers:{
+"Content-Type":"application/json",
+"X-CSRFToken":SITE_ENTRY.csrfToken
+},
+body:JSON.stringify({name:name})
+})
+.then(r=>r.json())
+.then(data=>{
+location.reload();
+});
+
+}
+
+
+function saveEditSite(){
+
+const id=document.getElementById("editSiteId").value;
+const name=document.getElementById("editSiteName").value;
+
+fetch(`/edit-site/${id}/`,{
+method:"POST",
+headers:{
+"Content-Type":"application/json",
+"X-CSRFToken":SITE_ENTRY.csrfToken
+},
+body:JSON.stringify({name:name})
+})
+.then(()=>{
+location.reload();
+});
+
+}
+
+function filterSites(){
+
+const input=document.getElementById("siteSearch");
+const val=input.value.toLowerCase();
+
+document.querySelectorAll(".site-card").forEach(card=>{
+
+card.style.display =
+card.dataset.name.includes(val) ? "block" : "none";
+
+});
+
+}